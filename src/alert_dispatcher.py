@@ -0,0 +1,304 @@
+# alert_dispatcher.py - Non-blocking emergency alert delivery with an on-disk outbox
+import heapq
+import json
+import os
+import threading
+import time
+import urllib.request
+import uuid
+from collections import deque
+
+DEFAULT_SMS_BODY = "🚨 Alert: A fall has been detected. Please check in immediately."
+DEFAULT_CALL_TWIML = (
+    "<Response><Say>Emergency! A fall has been detected and the person is unresponsive. "
+    "Please assist immediately.</Say></Response>"
+)
+
+
+class AlertEvent:
+    __slots__ = ("event_id", "kind", "payload", "created_at", "attempts", "next_attempt_at", "last_error")
+
+    def __init__(self, kind, payload, event_id=None, created_at=None, attempts=0, next_attempt_at=None, last_error=None):
+        self.event_id = event_id or uuid.uuid4().hex
+        self.kind = kind
+        self.payload = payload
+        self.created_at = created_at if created_at is not None else time.time()
+        self.attempts = attempts
+        self.next_attempt_at = next_attempt_at if next_attempt_at is not None else self.created_at
+        self.last_error = last_error
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**{name: data.get(name) for name in cls.__slots__ if name in data})
+
+
+class AlertTransport:
+    """Delivers one alert event; raise on failure so the dispatcher retries"""
+
+    def send(self, event):
+        raise NotImplementedError
+
+
+class TwilioSMSTransport(AlertTransport):
+    def __init__(self, account_sid, auth_token, from_phone, to_phone):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.from_phone = from_phone
+        self.to_phone = to_phone
+
+    def _client(self):
+        from twilio.rest import Client
+
+        return Client(self.account_sid, self.auth_token)
+
+    def send(self, event):
+        message = self._client().messages.create(
+            body=event.payload.get("message", DEFAULT_SMS_BODY),
+            from_=self.from_phone,
+            to=event.payload.get("to", self.to_phone),
+        )
+        print("✅ Emergency SMS sent successfully! SID:", message.sid)
+        return message.sid
+
+
+class TwilioCallTransport(TwilioSMSTransport):
+    def send(self, event):
+        call = self._client().calls.create(
+            twiml=event.payload.get("twiml", DEFAULT_CALL_TWIML),
+            from_=self.from_phone,
+            to=event.payload.get("to", self.to_phone),
+        )
+        print(f"✅ Emergency call initiated on attempt {event.attempts + 1}! SID:", call.sid)
+        return call.sid
+
+
+class NullTransport(AlertTransport):
+    """Logs and drops the event - used by headless replay so archived footage never pages anyone"""
+
+    def send(self, event):
+        print(f"[headless] Suppressed {event.kind} alert: {event.payload}")
+        return "suppressed"
+
+
+class HTTPStubTransport(AlertTransport):
+    """POSTs the event as JSON to a local endpoint - used to exercise the pipeline without Twilio"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def send(self, event):
+        body = json.dumps(event.to_dict()).encode("utf-8")
+        request = urllib.request.Request(self.url, data=body, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            if response.status >= 300:
+                raise RuntimeError(f"Stub transport returned HTTP {response.status}")
+            return f"http-{response.status}"
+
+
+class AlertDispatcher:
+    """Queues alert events, persists them to an outbox and delivers them from background workers"""
+
+    def __init__(self, transports, outbox_dir=None, workers=2, max_attempts=3, base_backoff=5.0, max_backoff=60.0):
+        self.transports = dict(transports)
+        # Without an outbox directory events only live in memory and do not survive a restart
+        self.outbox_dir = outbox_dir
+        self.failed_dir = os.path.join(outbox_dir, "failed") if outbox_dir else None
+        self.num_workers = workers
+        self.max_attempts = max_attempts
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._condition = threading.Condition()
+        self._schedule = []
+        self._events = {}
+        self._in_flight = 0
+        self._order = 0
+        self._threads = []
+        self._running = False
+
+        self.enqueued = 0
+        self.delivered = 0
+        self.failed = 0
+        self.retries = 0
+        self.latencies = deque(maxlen=500)
+
+        if self.failed_dir:
+            os.makedirs(self.failed_dir, exist_ok=True)
+
+    def _event_path(self, event_id, directory=None):
+        return os.path.join(directory or self.outbox_dir, f"{event_id}.json")
+
+    def _persist(self, event):
+        if not self.outbox_dir:
+            return
+        path = self._event_path(event.event_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(event.to_dict(), f)
+        os.replace(tmp_path, path)
+
+    def _schedule_event(self, event):
+        # Caller holds self._condition
+        self._events[event.event_id] = event
+        self._order += 1
+        heapq.heappush(self._schedule, (event.next_attempt_at, self._order, event.event_id))
+        self._condition.notify()
+
+    def _load_outbox(self):
+        if not self.outbox_dir:
+            return
+        restored = 0
+        for name in sorted(os.listdir(self.outbox_dir)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.outbox_dir, name), encoding="utf-8") as f:
+                    event = AlertEvent.from_dict(json.load(f))
+            except Exception as e:
+                print(f"⚠️ Skipping unreadable outbox entry {name}: {e}")
+                continue
+            with self._condition:
+                if event.event_id not in self._events:
+                    self._schedule_event(event)
+                    restored += 1
+        if restored:
+            print(f"Restored {restored} pending alert(s) from outbox")
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._load_outbox()
+        for i in range(self.num_workers):
+            thread = threading.Thread(target=self._worker, name=f"alert-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=2.0):
+        with self._condition:
+            self._running = False
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def enqueue(self, kind, **payload):
+        if kind not in self.transports:
+            raise ValueError(f"No transport registered for alert kind '{kind}'")
+        event = AlertEvent(kind, payload)
+        try:
+            self._persist(event)
+        except Exception as e:
+            # Delivery still proceeds from memory; it just won't survive a restart
+            print(f"⚠️ Could not write alert {event.event_id} to outbox: {e}")
+        with self._condition:
+            self.enqueued += 1
+            self._schedule_event(event)
+        return event.event_id
+
+    def _next_due_event(self):
+        with self._condition:
+            while self._running:
+                if self._schedule:
+                    due_at, _, event_id = self._schedule[0]
+                    wait = due_at - time.time()
+                    if wait <= 0:
+                        heapq.heappop(self._schedule)
+                        self._in_flight += 1
+                        return self._events[event_id]
+                    self._condition.wait(timeout=wait)
+                else:
+                    self._condition.wait()
+            return None
+
+    def _backoff(self, attempts):
+        return min(self.max_backoff, self.base_backoff * (2 ** (attempts - 1)))
+
+    def _worker(self):
+        while True:
+            event = self._next_due_event()
+            if event is None:
+                return
+            try:
+                self.transports[event.kind].send(event)
+            except Exception as e:
+                self._handle_failure(event, e)
+            else:
+                self._handle_success(event)
+
+    def _handle_success(self, event):
+        latency = time.time() - event.created_at
+        if self.outbox_dir:
+            try:
+                os.remove(self._event_path(event.event_id))
+            except FileNotFoundError:
+                pass
+        with self._condition:
+            self._in_flight -= 1
+            self._events.pop(event.event_id, None)
+            self.delivered += 1
+            self.latencies.append(latency)
+
+    def _handle_failure(self, event, error):
+        event.attempts += 1
+        event.last_error = str(error)
+        print(f"❌ Failed to deliver {event.kind} alert on attempt {event.attempts}: {error}")
+
+        if event.attempts >= self.max_attempts:
+            print(f"❌ Giving up on {event.kind} alert after {event.attempts} attempts")
+            if self.outbox_dir:
+                try:
+                    self._persist(event)
+                    os.replace(self._event_path(event.event_id), self._event_path(event.event_id, self.failed_dir))
+                except Exception as e:
+                    print(f"⚠️ Could not move alert {event.event_id} to failed outbox: {e}")
+            with self._condition:
+                self._in_flight -= 1
+                self._events.pop(event.event_id, None)
+                self.failed += 1
+            return
+
+        delay = self._backoff(event.attempts)
+        print(f"Retrying {event.kind} alert in {delay:.1f} seconds...")
+        event.next_attempt_at = time.time() + delay
+        try:
+            self._persist(event)
+        except Exception as e:
+            print(f"⚠️ Could not update alert {event.event_id} in outbox: {e}")
+        with self._condition:
+            self._in_flight -= 1
+            self.retries += 1
+            self._schedule_event(event)
+
+    def stats(self):
+        with self._condition:
+            latencies = sorted(self.latencies)
+            queue_depth = len(self._schedule)
+            in_flight = self._in_flight
+            counters = {
+                "enqueued": self.enqueued,
+                "delivered": self.delivered,
+                "failed": self.failed,
+                "retries": self.retries,
+            }
+
+        def percentile(p):
+            if not latencies:
+                return None
+            index = min(len(latencies) - 1, int(round(p / 100 * (len(latencies) - 1))))
+            return round(latencies[index] * 1000, 1)
+
+        counters.update(
+            {
+                "queue_depth": queue_depth,
+                "in_flight": in_flight,
+                "latency_ms_p50": percentile(50),
+                "latency_ms_p95": percentile(95),
+                "latency_ms_max": percentile(100),
+            }
+        )
+        return counters
@@ -0,0 +1,173 @@
+# batch_processor.py - Re-scan archived footage for falls, split into chunks and spread over a process pool
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import cv2
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".m4v")
+
+
+class VideoChunk:
+    """Frames [start_frame, end_frame) of one video; frames from warmup_frame on are replayed first to prime state"""
+
+    __slots__ = ("path", "start_frame", "end_frame", "warmup_frame", "fps")
+
+    def __init__(self, path, start_frame, end_frame, warmup_frame, fps):
+        self.path = path
+        self.start_frame = start_frame
+        self.end_frame = end_frame
+        self.warmup_frame = warmup_frame
+        self.fps = fps
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+def find_videos(paths):
+    """Video files named directly plus every video under any directory given, in a stable order"""
+    videos = []
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                videos.extend(os.path.join(root, name) for name in files if name.lower().endswith(VIDEO_EXTENSIONS))
+        else:
+            videos.append(path)
+    return sorted(videos)
+
+
+def plan_chunks(path, chunk_seconds=60.0, warmup_seconds=3.0):
+    capture = cv2.VideoCapture(path)
+    try:
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    finally:
+        capture.release()
+    if frame_count <= 0:
+        return []
+    chunk_frames = max(1, int(chunk_seconds * fps))
+    warmup_frames = int(warmup_seconds * fps)
+    return [
+        VideoChunk(path, start, min(start + chunk_frames, frame_count), max(0, start - warmup_frames), fps)
+        for start in range(0, frame_count, chunk_frames)
+    ]
+
+
+# One detector per pool worker, built by the initializer and reused for every chunk that worker gets
+_worker_detector = None
+
+
+def _init_worker(estimator_options):
+    global _worker_detector
+    from clock import FrameClock
+    from fall_detector import FallDetector
+    from motion_gate import MotionGate
+    from pose_estimator import PoseEstimator
+
+    # Every frame goes through pose: offline results must not depend on how fast the box is
+    estimator = PoseEstimator(motion_gate=MotionGate(enabled=False), **estimator_options)
+    _worker_detector = FallDetector(headless=True, pose_estimator=estimator, clock=FrameClock())
+
+
+def process_chunk(chunk):
+    """Replay one chunk with frame timestamps as the clock; returns the falls confirmed inside it"""
+    from clock import frame_timestamp
+
+    detector = _worker_detector
+    # Chunks are independent: no track, history or cooldown may leak in from the previous chunk
+    detector.clear_tracking_state()
+    capture = cv2.VideoCapture(chunk.path)
+    events = []
+    frames = 0
+    start = time.perf_counter()
+    try:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, chunk.warmup_frame)
+        for frame_number in range(chunk.warmup_frame, chunk.end_frame):
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames += 1
+            timestamp = frame_timestamp(capture, frame_number, chunk.fps)
+            people = detector.pose_estimator.estimate(frame, force=True, now=timestamp)
+            seen = {person_id: len(falls) for person_id, falls in detector.falls_detected.items()}
+            _, fall_detected = detector.analyze_people(frame, people, frame_number, chunk.path, timestamp)
+            # Warm-up frames belong to the previous chunk, which reports its own falls
+            if fall_detected and frame_number >= chunk.start_frame:
+                for person_id, falls in detector.falls_detected.items():
+                    if len(falls) > seen.get(person_id, 0):
+                        events.append({
+                            "video": chunk.path,
+                            "frame": frame_number,
+                            "time_s": round(timestamp, 3),
+                            "person_id": person_id,
+                        })
+    finally:
+        capture.release()
+    return {"chunk": chunk.to_dict(), "frames": frames, "seconds": time.perf_counter() - start, "events": events}
+
+
+def merge_events(events, merge_seconds=2.0):
+    """Sort falls by video and time, folding together detections of one fall a tracker re-id split in two"""
+    merged = []
+    for event in sorted(events, key=lambda e: (e["video"], e["time_s"])):
+        last = merged[-1] if merged else None
+        if last is not None and last["video"] == event["video"] and event["time_s"] - last["time_s"] <= merge_seconds:
+            continue
+        merged.append(event)
+    return merged
+
+
+def run_batch(paths, workers=None, chunk_seconds=60.0, warmup_seconds=3.0, estimator_options=None, merge_seconds=2.0):
+    videos = find_videos(paths)
+    chunks = [chunk for video in videos for chunk in plan_chunks(video, chunk_seconds, warmup_seconds)]
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    # Longest chunks first so one big tail chunk doesn't leave the other workers idle at the end
+    ordered = sorted(chunks, key=lambda c: c.end_frame - c.warmup_frame, reverse=True)
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(estimator_options or {},)) as pool:
+        results = pool.map(process_chunk, ordered, chunksize=1)
+    elapsed = time.perf_counter() - start
+
+    frames = sum(result["frames"] for result in results)
+    return {
+        "videos": len(videos),
+        "chunks": len(chunks),
+        "workers": workers,
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        "events": merge_events([event for result in results for event in result["events"]], merge_seconds),
+    }
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Re-scan recorded video files for falls on a process pool")
+    parser.add_argument("paths", nargs="+", help="Video files and/or directories of them")
+    parser.add_argument("--workers", type=int, default=None, help="Pool size (default: CPU count)")
+    parser.add_argument("--chunk-seconds", type=float, default=60.0)
+    parser.add_argument("--warmup-seconds", type=float, default=3.0,
+                        help="Footage replayed before each chunk to prime the per-person histories")
+    parser.add_argument("--merge-seconds", type=float, default=2.0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = run_batch(args.paths, args.workers, args.chunk_seconds, args.warmup_seconds,
+                       merge_seconds=args.merge_seconds)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"{len(report['events'])} falls in {report['videos']} videos written to {args.output}")
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1222 @@
+# benchmarks.py - Load tests and micro-benchmarks for the fall detection stack
+import argparse
+import json
+import os
+import threading
+import time
+import urllib.request
+
+
+def _get_json(url, timeout=5):
+    with urllib.request.urlopen(url, timeout=timeout) as response:
+        return json.loads(response.read().decode("utf-8"))
+
+
+def _stream_client(url, stop_event, counters, index):
+    boundary = b"--frame"
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            tail = b""
+            while not stop_event.is_set():
+                chunk = response.read(65536)
+                if not chunk:
+                    break
+                data = tail + chunk
+                counters[index]["frames"] += data.count(boundary)
+                counters[index]["bytes"] += len(chunk)
+                # Keep enough bytes to catch a boundary split across two reads
+                tail = data[-(len(boundary) - 1):]
+    except Exception as e:
+        counters[index]["error"] = str(e)
+
+
+def run_video_feed_load(base_url, viewers, duration, warmup=2.0):
+    stop_event = threading.Event()
+    counters = [{"frames": 0, "bytes": 0, "error": None} for _ in range(viewers)]
+    threads = [
+        threading.Thread(
+            target=_stream_client,
+            args=(f"{base_url}/video_feed", stop_event, counters, i),
+            daemon=True,
+        )
+        for i in range(viewers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    time.sleep(warmup)
+    start_status = _get_json(f"{base_url}/status")
+    start_frames = [c["frames"] for c in counters]
+    start_time = time.time()
+    time.sleep(duration)
+    end_status = _get_json(f"{base_url}/status")
+    elapsed = time.time() - start_time
+    end_frames = [c["frames"] for c in counters]
+
+    stop_event.set()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    published = end_status["stream"]["frames_published"] - start_status["stream"]["frames_published"]
+    cpu_seconds = end_status["process_cpu_seconds"] - start_status["process_cpu_seconds"]
+    client_fps = [(end - begin) / elapsed for begin, end in zip(start_frames, end_frames)]
+    return {
+        "viewers": viewers,
+        "subscribers_seen": end_status["stream"]["subscribers"],
+        "detector_fps": published / elapsed,
+        "server_cpu_ms_per_frame": (cpu_seconds * 1000 / published) if published else None,
+        "client_fps_min": min(client_fps) if client_fps else 0.0,
+        "client_fps_mean": sum(client_fps) / len(client_fps) if client_fps else 0.0,
+        "client_errors": sum(1 for c in counters if c["error"]),
+    }
+
+
+def video_feed_command(args):
+    print(f"Load testing {args.url}/video_feed for {args.duration:.0f}s per run")
+    results = []
+    for viewers in args.viewers:
+        result = run_video_feed_load(args.url, viewers, args.duration)
+        results.append(result)
+        cpu = result["server_cpu_ms_per_frame"]
+        print(
+            f"viewers={viewers:3d}  detector_fps={result['detector_fps']:6.2f}  "
+            f"cpu/frame={cpu if cpu is None else round(cpu, 2)} ms  "
+            f"client_fps(min/mean)={result['client_fps_min']:.2f}/{result['client_fps_mean']:.2f}  "
+            f"errors={result['client_errors']}"
+        )
+
+    if len(results) > 1 and results[0]["detector_fps"] > 0:
+        ratio = results[-1]["detector_fps"] / results[0]["detector_fps"]
+        print(f"Detector FPS with {results[-1]['viewers']} viewers is {ratio:.2f}x the {results[0]['viewers']}-viewer rate")
+    return results
+
+
+def _replay_clip(path, gate_enabled):
+    import cv2
+    from fall_detector import FallDetector
+
+    detector = FallDetector(headless=True)
+    detector.motion_gate.enabled = gate_enabled
+    cap = cv2.VideoCapture(path)
+    fall_frames = []
+    frame_number = 0
+    cpu_start = time.process_time()
+    try:
+        while True:
+            ok, frame = cap.read()
+            if not ok:
+                break
+            _, fall_detected = detector.process_frame(frame, frame_number, path, show_display=False)
+            if fall_detected:
+                fall_frames.append(frame_number)
+            frame_number += 1
+    finally:
+        cap.release()
+        detector.alert_dispatcher.stop()
+    return {
+        "frames": frame_number,
+        "cpu_seconds": time.process_time() - cpu_start,
+        "fall_frames": fall_frames,
+        "gate": detector.motion_gate.stats(),
+    }
+
+
+def motion_gate_command(args):
+    rows = []
+    for path in args.clips:
+        baseline = _replay_clip(path, gate_enabled=False)
+        gated = _replay_clip(path, gate_enabled=True)
+        first_baseline = baseline["fall_frames"][0] if baseline["fall_frames"] else None
+        first_gated = gated["fall_frames"][0] if gated["fall_frames"] else None
+        latency_delta = (
+            first_gated - first_baseline if first_baseline is not None and first_gated is not None else None
+        )
+        rows.append((path, baseline, gated, latency_delta))
+        saved = 1 - gated["cpu_seconds"] / baseline["cpu_seconds"] if baseline["cpu_seconds"] else 0.0
+        print(f"{path}")
+        print(f"  frames={gated['frames']}  skip_ratio={gated['gate']['skip_ratio']:.1%}  cpu saved={saved:.1%}")
+        print(f"  first fall frame: ungated={first_baseline}  gated={first_gated}  delta={latency_delta} frames")
+
+    regressions = [
+        path for path, baseline, gated, delta in rows
+        if (delta is not None and delta > 0) or (baseline["fall_frames"] and not gated["fall_frames"])
+    ]
+    if regressions:
+        print(f"❌ Detection latency regressed on {len(regressions)} clip(s): {', '.join(regressions)}")
+    else:
+        print("✅ No detection latency regression on any clip")
+    return rows
+
+
+def _transport_consumer(mode, channel, ring_spec, results):
+    # Touches every frame the way the pose worker would, then reports its own CPU cost
+    import queue as queue_module
+    from shm_ring import SharedFrameRing
+
+    ring = SharedFrameRing.attach(*ring_spec) if mode == "ring" else None
+    received = 0
+    latency_total = 0.0
+    cpu_start = time.process_time()
+    while True:
+        try:
+            item = channel.get(timeout=5)
+        except queue_module.Empty:
+            break
+        if item is None:
+            break
+        if mode == "ring":
+            seq, sent_at = item
+            frame = ring.read(seq)
+            if frame is None:
+                continue
+        else:
+            frame, sent_at = item
+        frame[::64, ::64].mean()
+        latency_total += time.perf_counter() - sent_at
+        received += 1
+    results.put({
+        "received": received,
+        "consumer_cpu_ms": (time.process_time() - cpu_start) * 1000 / received if received else 0.0,
+        "latency_ms": latency_total * 1000 / received if received else 0.0,
+    })
+    if ring is not None:
+        ring.close()
+
+
+def run_transport_benchmark(mode, fps, seconds, shape=(480, 640, 3)):
+    import multiprocessing
+    import numpy as np
+    from shm_ring import SharedFrameRing
+
+    ctx = multiprocessing.get_context("spawn")
+    channel = ctx.Queue(8)
+    results = ctx.Queue()
+    frame = np.random.randint(0, 255, shape, dtype=np.uint8)
+    ring = SharedFrameRing(8, shape) if mode == "ring" else None
+    consumer = ctx.Process(
+        target=_transport_consumer,
+        args=(mode, channel, ring.spec() if ring else None, results),
+        daemon=True,
+    )
+    consumer.start()
+    time.sleep(1.0)
+
+    sent = 0
+    interval = 1.0 / fps if fps else 0.0
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    next_due = start
+    while time.perf_counter() - start < seconds:
+        if interval:
+            delay = next_due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            next_due += interval
+        if mode == "ring":
+            seq = ring.write(frame)
+            channel.put((seq, time.perf_counter()))
+        else:
+            channel.put((frame, time.perf_counter()))
+        sent += 1
+    elapsed = time.perf_counter() - start
+    producer_cpu = time.process_time() - cpu_start
+    channel.put(None)
+    result = results.get(timeout=30)
+    consumer.join(timeout=5)
+    if ring is not None:
+        ring.close()
+
+    result.update({
+        "mode": mode,
+        "target_fps": fps or "max",
+        "achieved_fps": result["received"] / elapsed,
+        "producer_cpu_ms": producer_cpu * 1000 / sent if sent else 0.0,
+    })
+    return result
+
+
+def shm_ring_command(args):
+    print(f"Frame transport benchmark, {args.seconds:.0f}s per run, 640x480x3 uint8 frames")
+    print(f"{'mode':6s} {'target':>7s} {'achieved':>9s} {'producer ms':>12s} {'consumer ms':>12s} {'latency ms':>11s}")
+    rows = []
+    for fps in args.fps:
+        for mode in ("queue", "ring"):
+            result = run_transport_benchmark(mode, fps, args.seconds)
+            rows.append(result)
+            print(
+                f"{mode:6s} {str(result['target_fps']):>7s} {result['achieved_fps']:9.1f} "
+                f"{result['producer_cpu_ms']:12.3f} {result['consumer_cpu_ms']:12.3f} {result['latency_ms']:11.3f}"
+            )
+    return rows
+
+
+class _Landmark:
+    __slots__ = ("x", "y", "z", "visibility")
+
+    def __init__(self, x, y, visibility=0.99):
+        self.x = x
+        self.y = y
+        self.z = 0.0
+        self.visibility = visibility
+
+
+# Normalised standing pose for the 33 MediaPipe landmarks (unused ones parked on the torso)
+_STANDING_POSE = {
+    0: (0.50, 0.15), 2: (0.48, 0.13), 5: (0.52, 0.13),
+    11: (0.44, 0.28), 12: (0.56, 0.28), 13: (0.42, 0.40), 14: (0.58, 0.40),
+    15: (0.41, 0.50), 16: (0.59, 0.50), 23: (0.46, 0.52), 24: (0.54, 0.52),
+    25: (0.46, 0.70), 26: (0.54, 0.70), 27: (0.46, 0.88), 28: (0.54, 0.88),
+}
+
+
+def synthetic_landmark_frames(frames, seed=0):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    base = np.array([_STANDING_POSE.get(i, (0.5, 0.4)) for i in range(33)])
+    sequence = []
+    for t in range(frames):
+        # Stand, then tip over onto the floor, then lie still - exercises every heuristic branch
+        phase = (t % 120) / 120
+        pose = base.copy()
+        if phase > 0.5:
+            tilt = min(1.0, (phase - 0.5) * 6)
+            pose[:, 1] = pose[:, 1] * (1 - tilt) + (0.85 + (pose[:, 0] - 0.5) * 0.1) * tilt
+            pose[:, 0] = 0.5 + (base[:, 1] - 0.5) * tilt + (pose[:, 0] - 0.5) * (1 - tilt)
+        pose += rng.normal(0, 0.003, pose.shape)
+        sequence.append([_Landmark(float(x), float(y)) for x, y in pose])
+    return sequence
+
+
+def heuristics_command(args):
+    from clock import FrameClock
+    from fall_detector import FallDetector
+
+    # Frame timestamps, not wall clock, so the event count is the same however fast this machine is
+    detector = FallDetector(headless=True, clock=FrameClock())
+    frames = synthetic_landmark_frames(args.frames)
+    for _ in range(args.repeat):
+        detector.person_fall_data = {}
+        detector.falls_detected = {}
+        detector.person_tracker.tracked_persons = {}
+        keypoint_ns = 0
+        heuristic_ns = 0
+        for frame_number, landmarks in enumerate(frames):
+            start = time.perf_counter_ns()
+            keypoints = detector.get_body_keypoints(landmarks)
+            middle = time.perf_counter_ns()
+            detector.analyze_people(None, [keypoints], frame_number, timestamp=frame_number / args.fps)
+            end = time.perf_counter_ns()
+            keypoint_ns += middle - start
+            heuristic_ns += end - middle
+    count = len(frames)
+    falls = sum(len(frames_list) for frames_list in detector.falls_detected.values())
+    print(f"{count} frames, 1 person, {falls} fall events")
+    print(f"  keypoint extraction: {keypoint_ns / count / 1000:8.1f} us/frame")
+    print(f"  tracker + heuristics: {heuristic_ns / count / 1000:8.1f} us/frame")
+    print(f"  total:               {(keypoint_ns + heuristic_ns) / count / 1000:8.1f} us/frame")
+    if args.trace_allocations:
+        shared_builds, shared_peak = traced_heuristic_allocations(detector, frames, shared=True)
+        own_builds, own_peak = traced_heuristic_allocations(detector, frames, shared=False)
+        ratio = own_builds / shared_builds
+        print(f"  body features built: {shared_builds:8.2f}/frame shared, {own_builds:.2f}/frame per detector "
+              f"({ratio:.1f}x)")
+        # The shared path's peak includes the BodyFeatures it keeps on the Keypoints; tracemalloc sees live
+        # memory only, so this is a high-water mark, not an allocation count
+        print(f"  heap peak per call:  {shared_peak:8.0f} bytes shared, {own_peak:.0f} bytes per detector")
+    detector.alert_dispatcher.stop()
+    if args.trace_allocations and ratio < args.min_feature_ratio:
+        raise SystemExit(f"Body features built {ratio:.1f}x less often with sharing, "
+                         f"expected at least {args.min_feature_ratio}x")
+    return keypoint_ns / count, heuristic_ns / count
+
+
+def traced_heuristic_allocations(detector, frames, shared=True):
+    """Per analyze_people call: BodyFeatures built, and the heap high-water mark above the starting level.
+
+    shared=False replays the path from before features were shared: every detector that needs the geometry
+    computes its own (fall_detector.features_for is swapped for an uncached BodyFeatures while this runs).
+    """
+    import tracemalloc
+
+    import fall_detector
+    from body_features import BodyFeatures, features_for
+
+    built = [0]
+
+    def shared_features(keypoints):
+        if keypoints.features is None:
+            built[0] += 1
+        return features_for(keypoints)
+
+    def per_detector_features(keypoints):
+        built[0] += 1
+        return BodyFeatures(keypoints)
+
+    detector.clear_tracking_state()
+    people = [[detector.get_body_keypoints(landmarks)] for landmarks in frames]
+    fall_detector.features_for = shared_features if shared else per_detector_features
+    tracemalloc.start()
+    total_peak = 0
+    try:
+        for frame_number, frame_people in enumerate(people):
+            before, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            detector.analyze_people(None, frame_people, frame_number, timestamp=frame_number / 30.0)
+            total_peak += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+        fall_detector.features_for = features_for
+    return built[0] / len(people), total_peak / len(people)
+
+
+def _person_state_as_dict(state):
+    # The string-keyed layout PersonFallState replaced, holding the same buffers and values
+    return {name: getattr(state, name) for name in type(state).__slots__}
+
+
+def _traced_bytes(factory, count):
+    import tracemalloc
+
+    tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        objects = [factory() for _ in range(count)]
+        after, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del objects
+    return (after - before) / count
+
+
+def person_state_command(args):
+    import sys
+    import timeit
+
+    from person_state import PersonFallState
+
+    state = PersonFallState()
+    as_dict = _person_state_as_dict(state)
+    slots_bytes = _traced_bytes(PersonFallState, args.people)
+    dict_bytes = _traced_bytes(lambda: _person_state_as_dict(PersonFallState()), args.people)
+    print(f"Memory per tracked person ({args.people} people, tracemalloc, buffers included):")
+    print(f"  slots: {slots_bytes:8.0f} bytes   (object itself {sys.getsizeof(state)} bytes)")
+    print(f"  dict:  {dict_bytes:8.0f} bytes   (dict itself {sys.getsizeof(as_dict)} bytes)")
+
+    # The per-frame read/write pattern of analyze_people on the counters and flags
+    slots_stmt = (
+        "s.fall_counter = max(0, s.fall_counter - 1); s.stable_counter += 1\n"
+        "if s.stable_counter >= 30 and s.fall_detected: pass\n"
+        "if s.fall_detected: s.last_position = s.last_position\n"
+        "x = s.emergency_active or s.sms_sent"
+    )
+    dict_stmt = (
+        "d['fall_counter'] = max(0, d.get('fall_counter', 0) - 1); d['stable_counter'] = d.get('stable_counter', 0) + 1\n"
+        "if d.get('stable_counter', 0) >= 30 and d.get('fall_detected', False): pass\n"
+        "if d.get('fall_detected', False): d['last_position'] = d['last_position']\n"
+        "x = d.get('emergency_active', False) or d['sms_sent']"
+    )
+    number = args.iterations
+    slots_ns = min(timeit.repeat(slots_stmt, globals={"s": state}, number=number, repeat=5)) / number * 1e9
+    dict_ns = min(timeit.repeat(dict_stmt, globals={"d": as_dict}, number=number, repeat=5)) / number * 1e9
+    print("Per-frame counter/flag access:")
+    print(f"  slots: {slots_ns:6.0f} ns")
+    print(f"  dict:  {dict_ns:6.0f} ns   ({dict_ns / slots_ns:.2f}x)")
+    return slots_bytes, dict_bytes, slots_ns, dict_ns
+
+
+def synthetic_crowd(people, frames, seed=0, speed=0.02):
+    """Keypoints for `people` small figures drifting around the unit square, one list per frame.
+
+    speed is the typical per-frame displacement as a fraction of a figure's size.
+    """
+    import numpy as np
+
+    from keypoints import NUM_KEYPOINTS, Keypoints
+
+    rng = np.random.default_rng(seed)
+    size = max(0.02, 0.8 / np.sqrt(people))
+    centres = rng.random((people, 2)) * (1 - size) + size / 2
+    velocity = rng.normal(0, size * speed, (people, 2))
+    shape = rng.random((people, NUM_KEYPOINTS, 2)) - 0.5
+    sequence = []
+    for _ in range(frames):
+        centres = centres + velocity + rng.normal(0, size * 0.01, centres.shape)
+        # Walk back in from the edges instead of sticking to them
+        low, high = size / 2, 1 - size / 2
+        bounced = (centres < low) | (centres > high)
+        velocity = np.where(bounced, -velocity, velocity)
+        centres = np.clip(centres, low, high)
+        xy = (centres[:, None, :] + shape * size).astype(np.float32)
+        sequence.append([Keypoints(person_xy) for person_xy in xy])
+    return sequence
+
+
+def tracker_command(args):
+    from fall_detector import PersonTracker
+    from tracking import iou_matrix
+
+    rows = []
+    print(f"{'detections':>10} {'pairwise IoU':>14} {'IoU matrix':>12} {'greedy update':>15} {'hungarian update':>18}")
+    for people in args.detections:
+        frames = synthetic_crowd(people, args.frames)
+        boxes = [[PersonTracker().get_person_bbox(k) for k in frame] for frame in frames]
+
+        reference = PersonTracker()
+        start = time.perf_counter()
+        for previous, current in zip(boxes, boxes[1:]):
+            for d_box in current:
+                for t_box in previous:
+                    reference.calculate_iou(d_box, t_box)
+        pairwise_ms = (time.perf_counter() - start) * 1000 / (len(boxes) - 1)
+
+        start = time.perf_counter()
+        for previous, current in zip(boxes, boxes[1:]):
+            iou_matrix(current, previous)
+        matrix_ms = (time.perf_counter() - start) * 1000 / (len(boxes) - 1)
+
+        update_ms = {}
+        for assignment in ("greedy", "hungarian"):
+            tracker = PersonTracker(assignment=assignment)
+            tracker.update(frames[0])
+            start = time.perf_counter()
+            for frame in frames[1:]:
+                tracker.update(frame)
+            update_ms[assignment] = (time.perf_counter() - start) * 1000 / (len(frames) - 1)
+
+        rows.append((people, pairwise_ms, matrix_ms, update_ms["greedy"], update_ms["hungarian"]))
+        print(f"{people:>10} {pairwise_ms:>11.3f} ms {matrix_ms:>9.3f} ms "
+              f"{update_ms['greedy']:>12.3f} ms {update_ms['hungarian']:>15.3f} ms")
+    return rows
+
+
+def synthetic_walkers(people, frames, seed=0, speed=0.02):
+    """People-sized figures walking back and forth in their own lanes; speed is in frame widths per frame"""
+    import numpy as np
+
+    from keypoints import NUM_KEYPOINTS, Keypoints
+
+    rng = np.random.default_rng(seed)
+    width, height = 0.08, 0.25
+    lanes = np.linspace(height / 2, 1 - height / 2, people) if people > 1 else np.array([0.5])
+    x = rng.random(people) * (1 - width) + width / 2
+    vx = rng.choice([-1.0, 1.0], people) * speed * rng.uniform(0.7, 1.3, people)
+    shape = (rng.random((people, NUM_KEYPOINTS, 2)) - 0.5) * np.array([width, height])
+    sequence = []
+    for _ in range(frames):
+        x = x + vx
+        bounced = (x < width / 2) | (x > 1 - width / 2)
+        vx = np.where(bounced, -vx, vx)
+        x = np.clip(x, width / 2, 1 - width / 2)
+        centres = np.stack([x, lanes], axis=1) + rng.normal(0, 0.002, (people, 2))
+        xy = (centres[:, None, :] + shape).astype(np.float32)
+        sequence.append([Keypoints(person_xy) for person_xy in xy])
+    return sequence
+
+
+def _track_identity_churn(tracker, frames, frame_numbers, blank_gaps=False):
+    """ID switches per ground-truth person and total tracks created while replaying the kept frames.
+
+    With blank_gaps the skipped frames still reach the tracker, as empty detection lists, the way
+    FallDetector.analyze_people passes on frames where pose found nobody.
+    """
+    kept = set(frame_numbers)
+    replay = range(frame_numbers[0], frame_numbers[-1] + 1) if blank_gaps else frame_numbers
+    assigned = {}
+    switches = 0
+    for frame_number in replay:
+        people = frames[frame_number] if frame_number in kept else []
+        tracker.update(people, frame_number)
+        person_index = {id(keypoints): index for index, keypoints in enumerate(people)}
+        for track_id, track in tracker.tracked_persons.items():
+            index = person_index.get(id(track["keypoints"]))
+            if index is None or track["last_seen"] != 0:
+                continue
+            if index in assigned and assigned[index] != track_id:
+                switches += 1
+            assigned[index] = track_id
+    return switches, tracker.next_id
+
+
+def tracker_drops_command(args):
+    from fall_detector import PersonTracker
+
+    frames = synthetic_walkers(args.people, args.frames, seed=args.seed, speed=args.speed)
+    every_frame = list(range(args.frames))
+    patterns = [("all frames", every_frame)]
+    for k in args.every:
+        patterns.append((f"drop 1 in {k}", [n for n in every_frame if n % k != k - 1]))
+    for k in args.every:
+        if k > 2:
+            # At k=2 keeping every other frame is the same as dropping every other frame
+            patterns.append((f"keep 1 in {k}", every_frame[::k]))
+    patterns = [(name, frame_numbers, False) for name, frame_numbers in patterns]
+    for k in args.every:
+        # Frames where pose found nobody: the tracker sees them, with no detections, instead of a gap
+        patterns.append((f"blank 1 in {k}", [n for n in every_frame if n % k != k - 1], True))
+
+    print(f"{args.people} people, {args.frames} frames, walking {args.speed} frame widths/frame")
+    print(f"{'pattern':>16} {'ID switches (last box)':>24} {'ID switches (kalman)':>22} {'tracks (last box / kalman)':>28}")
+    rows = []
+    for name, frame_numbers, blank_gaps in patterns:
+        plain_switches, plain_tracks = _track_identity_churn(
+            PersonTracker(motion_model="none"), frames, frame_numbers, blank_gaps
+        )
+        kalman_switches, kalman_tracks = _track_identity_churn(
+            PersonTracker(motion_model="kalman"), frames, frame_numbers, blank_gaps
+        )
+        rows.append((name, plain_switches, kalman_switches, plain_tracks, kalman_tracks))
+        print(f"{name:>16} {plain_switches:>24} {kalman_switches:>22} {plain_tracks:>16} / {kalman_tracks}")
+    failed = [name for name, _, kalman_switches, _, _ in rows if kalman_switches > args.max_switches]
+    if failed:
+        raise SystemExit(f"Kalman tracker switched IDs more than {args.max_switches} times with: {', '.join(failed)}")
+    return rows
+
+
+class _FixedBoxes:
+    """Stands in for the person detector so the benchmark controls exactly how many crops each frame gets"""
+
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+    def detect(self, image):
+        return [list(box) for box in self.boxes]
+
+
+def _person_grid(people, width, height):
+    columns = min(people, 3)
+    rows = (people + columns - 1) // columns
+    cell_w, cell_h = width // columns, height // rows
+    return [[c * cell_w, r * cell_h, (c + 1) * cell_w, (r + 1) * cell_h]
+            for r in range(rows) for c in range(columns)][:people]
+
+
+def multi_person_command(args):
+    import cv2
+    import numpy as np
+
+    from pose_estimator import PoseEstimator
+
+    if args.image:
+        person = cv2.imread(args.image)
+        if person is None:
+            raise SystemExit(f"Could not read {args.image}")
+    else:
+        # Noise costs the model the same as a person once the crop is fixed; only the keypoints differ
+        person = np.random.default_rng(0).integers(0, 255, (384, 256, 3), dtype=np.uint8)
+
+    rows = []
+    print(f"{'people':>6} {'crops':>6} {'frame ms':>10} {'FPS':>7} {'full-frame ms':>14}")
+    for people in args.people:
+        boxes = _person_grid(people, args.width, args.height)
+        frame = np.zeros((args.height, args.width, 3), dtype=np.uint8)
+        for x0, y0, x1, y1 in boxes:
+            frame[y0:y1, x0:x1] = cv2.resize(person, (x1 - x0, y1 - y0))
+
+        multi = PoseEstimator(multi_person=True, max_persons=people, pose_workers=args.workers,
+                              person_detector=_FixedBoxes(boxes), detect_interval=1)
+        single = PoseEstimator()
+        try:
+            timings = {}
+            for name, estimator in (("multi", multi), ("single", single)):
+                for _ in range(3):
+                    estimator.estimate(frame, force=True)
+                start = time.perf_counter()
+                for _ in range(args.frames):
+                    # Drop carried-over people so every frame gets exactly the fixed crops
+                    estimator.last_people = []
+                    estimator.estimate(frame, force=True)
+                timings[name] = (time.perf_counter() - start) * 1000 / args.frames
+            rows.append((people, multi.last_crop_count, timings["multi"], timings["single"]))
+            print(f"{people:>6} {multi.last_crop_count:>6} {timings['multi']:>7.1f} ms "
+                  f"{1000 / timings['multi']:>7.1f} {timings['single']:>11.1f} ms")
+        finally:
+            multi.close()
+            single.close()
+    return rows
+
+
+def _keypoint_agreement(reference, candidate, tolerance):
+    """Mean joint distance (frame-normalised) and the share of joints within tolerance of the reference"""
+    import numpy as np
+
+    distances = np.hypot(*(reference.xy - candidate.xy).T)
+    return float(distances.mean()), float((distances <= tolerance).mean())
+
+
+def roi_pose_command(args):
+    import cv2
+    import numpy as np
+
+    from pose_estimator import PoseEstimator
+
+    print(f"{'clip':>24} {'frames':>7} {'full ms':>9} {'roi ms':>8} {'roi share':>10} "
+          f"{'mean error':>11} {'PCK':>6} {'both found':>11}")
+    rows = []
+    for path in args.clips:
+        full = PoseEstimator()
+        roi = PoseEstimator(roi_tracking=True, redetect_interval=args.redetect_interval)
+        capture = cv2.VideoCapture(path)
+        full_s = roi_s = 0.0
+        frames = matched = 0
+        errors, pcks = [], []
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                frames += 1
+                start = time.perf_counter()
+                full_people = full.estimate(frame, force=True)
+                full_s += time.perf_counter() - start
+                start = time.perf_counter()
+                roi_people = roi.estimate(frame, force=True)
+                roi_s += time.perf_counter() - start
+                if full_people and roi_people:
+                    matched += 1
+                    error, pck = _keypoint_agreement(full_people[0], roi_people[0], args.tolerance)
+                    errors.append(error)
+                    pcks.append(pck)
+        finally:
+            capture.release()
+            full.close()
+            roi.close()
+        if not frames:
+            print(f"{path}: no frames read")
+            continue
+        roi_share = roi.roi_counts["roi"] / frames
+        mean_error = float(np.mean(errors)) if errors else float("nan")
+        mean_pck = float(np.mean(pcks)) if pcks else float("nan")
+        rows.append((path, frames, full_s * 1000 / frames, roi_s * 1000 / frames, roi_share, mean_error, mean_pck))
+        print(f"{os.path.basename(path)[-24:]:>24} {frames:>7} {full_s * 1000 / frames:>6.1f} ms "
+              f"{roi_s * 1000 / frames:>5.1f} ms {roi_share:>9.0%} {mean_error:>11.4f} {mean_pck:>6.0%} "
+              f"{matched:>6} / {frames}")
+    return rows
+
+
+def complexity_command(args):
+    import numpy as np
+
+    from complexity_controller import ComplexityController
+
+    rng = np.random.default_rng(args.seed)
+    tier_ms = dict(zip((0, 1, 2), args.tier_ms))
+    # The box slows down by --slowdown for the middle third (another process hogging the CPU)
+    third = args.frames // 3
+    controller = ComplexityController(target_fps=args.target_fps, initial_tier=1)
+    total_s = 0.0
+    tier_frames = {tier: 0 for tier in tier_ms}
+    over_budget = 0
+    for frame in range(args.frames):
+        controller.escalate(args.escalate_at <= frame < args.escalate_at + args.escalate_frames, now=frame)
+        load = args.slowdown if third <= frame < 2 * third else 1.0
+        seconds = tier_ms[controller.tier] * load * rng.lognormal(0.0, 0.1) / 1000
+        tier_frames[controller.tier] += 1
+        total_s += seconds
+        over_budget += seconds > controller.budget
+        controller.record(seconds, now=frame)
+
+    for event in controller.events:
+        print(f"frame {event['time']:>6.0f}: tier {event['from']} -> {event['to']} ({event['reason']})")
+    share = ", ".join(f"tier {tier}: {count / args.frames:.0%}" for tier, count in tier_frames.items())
+    print(f"Inference-bound FPS {args.frames / total_s:.1f} (target {args.target_fps}), "
+          f"{over_budget / args.frames:.1%} of frames over budget; {share}")
+    return controller.stats()
+
+
+def _clip_frames(path, limit):
+    import cv2
+
+    capture = cv2.VideoCapture(path)
+    frames = []
+    try:
+        while len(frames) < limit:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+    finally:
+        capture.release()
+    return frames
+
+
+def pose_backend_command(args):
+    import numpy as np
+
+    from pose_backends import MediaPipeBackend, OnnxPoseBackend, quantize_model
+
+    if args.clip:
+        frames = _clip_frames(args.clip, args.frames)
+        if not frames:
+            raise SystemExit(f"No frames read from {args.clip}")
+    else:
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(args.frames)]
+
+    backends = {"mediapipe": lambda: MediaPipeBackend(static_image_mode=False)}
+    if args.onnx:
+        backends["onnx"] = lambda: OnnxPoseBackend(args.onnx, coordinate_order=args.coordinate_order)
+        if args.int8:
+            # Static quantization calibrated on the first frames of the clip (or the noise frames)
+            int8_path = quantize_model(args.onnx, os.path.splitext(args.onnx)[0] + ".int8.onnx", frames[:16])
+            backends["onnx-int8"] = lambda: OnnxPoseBackend(int8_path, coordinate_order=args.coordinate_order)
+
+    reference = None
+    print(f"{'backend':>10} {'ms/frame':>9} " + " ".join(f"{f'batch {b} img/s':>14}" for b in args.batch)
+          + f" {'mean error':>11} {'PCK':>6}")
+    rows = []
+    for name, factory in backends.items():
+        backend = factory()
+        try:
+            backend.infer(frames[:1])
+            start = time.perf_counter()
+            results = [backend.infer([frame]) for frame in frames]
+            ms_per_frame = (time.perf_counter() - start) * 1000 / len(frames)
+
+            throughput = []
+            for batch in args.batch:
+                batches = [frames[i:i + batch] for i in range(0, len(frames) - batch + 1, batch)] or [frames]
+                start = time.perf_counter()
+                for images in batches:
+                    backend.infer(images)
+                throughput.append(sum(len(images) for images in batches) / (time.perf_counter() - start))
+        finally:
+            backend.close()
+
+        xy = np.concatenate([result[0] for result in results])
+        found = np.concatenate([result[2] for result in results])
+        if reference is None:
+            reference = (xy, found)
+        both = found & reference[1]
+        if both.any():
+            distances = np.hypot(*(xy[both] - reference[0][both]).transpose(2, 0, 1))
+            error, pck = float(distances.mean()), float((distances <= args.tolerance).mean())
+        else:
+            error = pck = float("nan")
+        rows.append((name, ms_per_frame, throughput, error, pck))
+        print(f"{name:>10} {ms_per_frame:>6.2f} ms " + " ".join(f"{t:>14.1f}" for t in throughput)
+              + f" {error:>11.4f} {pck:>6.0%}")
+    return rows
+
+
+def batch_scaling_command(args):
+    from batch_processor import run_batch
+
+    rows = []
+    print(f"{'workers':>7} {'chunks':>7} {'frames':>7} {'wall s':>8} {'FPS':>8} {'speedup':>8} {'falls':>6}")
+    baseline = None
+    for workers in args.workers:
+        report = run_batch(args.paths, workers, args.chunk_seconds, args.warmup_seconds)
+        baseline = baseline or report["seconds"]
+        rows.append((workers, report["seconds"], report["fps"], len(report["events"])))
+        print(f"{workers:>7} {report['chunks']:>7} {report['frames']:>7} {report['seconds']:>8.1f} "
+              f"{report['fps']:>8.1f} {baseline / report['seconds']:>7.2f}x {len(report['events']):>6}")
+    return rows
+
+
+def keypoint_cache_command(args):
+    import tempfile
+
+    from clock import FrameClock
+    from fall_detector import FallDetector
+    from keypoint_cache import KeypointSequence, replay, sequence_from_frames
+    from keypoints import Keypoints
+
+    base = [[Keypoints.from_mediapipe(landmarks)] for landmarks in synthetic_landmark_frames(2400)]
+    frames_people = [base[i % len(base)] for i in range(args.frames)]
+    timestamps = [i / 30.0 for i in range(args.frames)]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        start = time.perf_counter()
+        sequence_from_frames(frames_people, timestamps).save(cache_dir)
+        write_s = time.perf_counter() - start
+        size = sum(os.path.getsize(os.path.join(cache_dir, name)) for name in os.listdir(cache_dir))
+
+        start = time.perf_counter()
+        sequence = KeypointSequence.load(cache_dir)
+        load_s = time.perf_counter() - start
+
+        detector = FallDetector(headless=True, clock=FrameClock())
+        start = time.perf_counter()
+        events = replay(sequence, detector)
+        replay_s = time.perf_counter() - start
+        detector.alert_dispatcher.stop()
+        del sequence
+
+    hours = args.frames / 30.0 / 3600
+    print(f"{args.frames} frames ({hours:.2f} h at 30 fps), cache {size / 1e6:.1f} MB, written in {write_s:.2f} s")
+    print(f"  load (memmap):  {load_s * 1000:8.2f} ms")
+    print(f"  replay:         {replay_s:8.2f} s  ({args.frames / replay_s:,.0f} frames/s, {len(events)} fall events)")
+    return load_s, replay_s, len(events)
+
+
+def sweep_command(args):
+    import tempfile
+
+    from keypoint_cache import sequence_from_frames
+    from keypoints import Keypoints
+    from sweep import grid_configs, print_ranking, run_sweep
+
+    fall_clip = [[Keypoints.from_mediapipe(landmarks)] for landmarks in synthetic_landmark_frames(args.frames)]
+    # Each 120-frame cycle tips over from frame 60 and is flat ~20 frames later
+    falls = [((start + 60) / 30.0, (start + 80) / 30.0) for start in range(0, args.frames - 60, 120)]
+    # Negative clip: only the standing half of every cycle, so nothing should fire
+    standing = [people for i, people in enumerate(fall_clip) if i % 120 < 60]
+    space = {
+        "height_ratio_threshold": [0.3, 0.4, 0.5],
+        "velocity_threshold": [0.03, 0.05, 0.08],
+        "required_fall_frames": [3, 5, 8],
+        "fall_score_threshold": [5, 6, 8],
+    }
+    configs = grid_configs(space)
+    with tempfile.TemporaryDirectory() as root:
+        manifest = []
+        for name, clip, labels in (("fall", fall_clip, falls), ("standing", standing, [])):
+            cache_dir = os.path.join(root, f"{name}.keypoints")
+            sequence_from_frames(clip, [i / 30.0 for i in range(len(clip))]).save(cache_dir)
+            manifest.append({"cache": cache_dir, "falls": [list(interval) for interval in labels]})
+        manifest_path = os.path.join(root, "manifest.json")
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        output = os.path.join(root, "results.jsonl")
+        ranked, evaluated, elapsed = run_sweep(manifest_path, configs, output, args.workers)
+
+    frames = len(fall_clip) + len(standing)
+    print(f"{evaluated} configurations x {frames} frames on {args.workers or os.cpu_count()} worker(s): "
+          f"{elapsed:.1f} s, {evaluated / elapsed:.1f} configs/s, {evaluated * frames / elapsed:,.0f} frames/s")
+    print_ranking(ranked, args.top)
+    return ranked
+
+
+def profiler_command(args):
+    import numpy as np
+
+    from clock import FrameClock
+    from fall_detector import FallDetector
+    from profiler import StageProfiler
+
+    # Cost of one instrumented stage, off and on, net of the bare loop
+    start = time.perf_counter_ns()
+    for _ in range(args.iterations):
+        pass
+    loop_ns = (time.perf_counter_ns() - start) / args.iterations
+    for enabled in (False, True):
+        profiler = StageProfiler(enabled=enabled)
+        start = time.perf_counter_ns()
+        for _ in range(args.iterations):
+            with profiler.stage("stage"):
+                pass
+        per_call = (time.perf_counter_ns() - start) / args.iterations - loop_ns
+        print(f"stage() {'enabled ' if enabled else 'disabled'}: {per_call:6.0f} ns per stage")
+
+    # Fall logic on synthetic landmarks, profiling off versus on
+    frames = synthetic_landmark_frames(args.frames)
+    for enabled in (False, True):
+        detector = FallDetector(headless=True, clock=FrameClock(), profile=enabled)
+        people = [[detector.get_body_keypoints(landmarks)] for landmarks in frames]
+        start = time.perf_counter_ns()
+        for frame_number, frame_people in enumerate(people):
+            detector.analyze_people(None, frame_people, frame_number, timestamp=frame_number / 30.0)
+        per_frame = (time.perf_counter_ns() - start) / len(people) / 1000
+        print(f"analyze_people, profiling {'on ' if enabled else 'off'}: {per_frame:7.1f} us/frame")
+        detector.alert_dispatcher.stop()
+
+    # Full process_frame on a clip (or noise) with profiling on
+    detector = FallDetector(headless=True, clock=FrameClock(), profile=True)
+    detector.motion_gate.enabled = False
+    if args.clip:
+        images = _clip_frames(args.clip, args.video_frames)
+    else:
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8) for _ in range(args.video_frames)]
+    for frame_number, image in enumerate(images):
+        detector.process_frame(image, frame_number, show_display=True, timestamp=frame_number / 30.0)
+    print(f"\nprocess_frame stages over {len(images)} frames ({args.clip or '640x480 noise'}):")
+    detector.profiler.dump()
+    if args.trace:
+        detector.profiler.export_chrome_trace(args.trace)
+        print(f"Chrome trace written to {args.trace}")
+    detector.alert_dispatcher.stop()
+    detector.pose_estimator.close()
+
+
+def metrics_command(args):
+    from metrics import Counter, Histogram, MetricsRegistry
+
+    registry = MetricsRegistry()
+    counter = Counter("bench_total", "benchmark counter", registry=registry)
+    histogram = Histogram("bench_seconds", "benchmark histogram", registry=registry)
+    lock = threading.Lock()
+    locked = [0]
+
+    def locked_inc():
+        with lock:
+            locked[0] += 1
+
+    def observe():
+        histogram.observe(0.02)
+
+    for label, update in (("thread-local Counter.inc", counter.inc), ("Histogram.observe", observe),
+                          ("shared int under a Lock", locked_inc)):
+        for threads in args.threads:
+            def work():
+                for _ in range(args.iterations):
+                    update()
+
+            workers = [threading.Thread(target=work) for _ in range(threads)]
+            start = time.perf_counter()
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+            elapsed = time.perf_counter() - start
+            print(f"{label:<26} threads={threads:<3} {elapsed * 1e9 / (threads * args.iterations):7.0f} ns/update")
+
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"scrape: {(time.perf_counter() - start) * 1e6:.0f} us for {len(text)} bytes; "
+          f"counter={counter.value()} (expected {args.iterations * sum(args.threads)})")
+
+
+def synthetic_command(args):
+    from clock import FrameClock
+    from evaluation import score_clips
+    from fall_detector import FallDetector
+    from keypoint_cache import replay
+    from synthetic_keypoints import SCENARIOS, generate
+
+    print(f"{'scenario':<14} {'persons':>7} {'gen frames/s':>14} {'falls':>6} {'detected':>9}  first detection")
+    detector = FallDetector(headless=True, clock=FrameClock())
+    clip_results = []
+    for scenario in SCENARIOS:
+        generate(scenario, 1000)
+        start = time.perf_counter()
+        clip = generate(scenario, args.frames)
+        rate = args.frames / (time.perf_counter() - start)
+
+        # Replay a short clip of the same scenario through the real fall logic
+        sample = generate(scenario, args.replay_frames, seed=args.seed)
+        detector.clear_tracking_state()
+        detected = [event["time_s"] for event in replay(sample.to_sequence(), detector)]
+        clip_results.append((detected, sample.fall_intervals()))
+        first = f"{detected[0]:.2f} s" if detected else "-"
+        print(f"{scenario:<14} {clip.xy.shape[1]:>7} {rate:>14,.0f} {len(sample.falls):>6} {len(detected):>9}  {first}")
+    detector.alert_dispatcher.stop()
+    metrics = score_clips(clip_results)
+    print(f"Fall logic on one {args.replay_frames}-frame clip per scenario: TP={metrics['tp']} FP={metrics['fp']} "
+          f"TN={metrics['tn']} FN={metrics['fn']}")
+
+
+def fall_scoring_command(args):
+    import numpy as np
+
+    from clock import FrameClock
+    from fall_detector import FallDetector
+    from fall_scoring import params_from_detector, score_tracks
+    from keypoints import Keypoints
+    from synthetic_keypoints import generate
+
+    # One single-person track per seed, cycling through the scenarios with a random fall time
+    scenarios = ("walking", "floor_sitting", "lying_down", "fast_fall", "slow_fall")
+    rng = np.random.default_rng(args.seed)
+    seconds = args.frames / 30.0
+    tracks = []
+    for i in range(args.tracks):
+        scenario = scenarios[i % len(scenarios)]
+        params = {"fall_at": float(rng.uniform(0.2, 0.5) * seconds)} if scenario.endswith("fall") else {}
+        tracks.append(generate(scenario, args.frames, seed=args.seed + i, **params).xy[:, 0])
+    xy = np.stack(tracks)
+    timestamps = np.arange(args.frames) / 30.0
+
+    detector = FallDetector(headless=True, clock=FrameClock())
+    params = params_from_detector(detector)
+    for batch in args.batch:
+        start = time.perf_counter()
+        for first in range(0, len(xy), batch):
+            scores = score_tracks(xy[first:first + batch], timestamps, params)
+        elapsed = time.perf_counter() - start
+        print(f"score_tracks batch={batch:<5} {len(xy) / elapsed:10,.0f} tracks/s  "
+              f"{len(xy) * args.frames / elapsed:12,.0f} frames/s")
+
+    # The online path on the first --check tracks, frame by frame, against one batched call. Every per-frame
+    # flag, the combined score and both counters must match exactly, read from the frame's result and from
+    # the track's PersonFallState after the call
+    scores = score_tracks(xy[:args.check], timestamps, params)
+    fields = ("floor_sitting", "abnormal_posture", "lying_position", "sudden_movement", "unstable",
+              "combined_score", "fall_counter", "stable_counter", "fall_detected")
+    field_mismatches = dict.fromkeys(fields + ("events",), 0)
+    mismatched = 0
+    start = time.perf_counter()
+    for track in range(args.check):
+        detector.clear_tracking_state()
+        online = {name: [] for name in fields}
+        for frame, timestamp in enumerate(timestamps.tolist()):
+            results, _ = detector.analyze_people(None, [Keypoints(xy[track, frame])], frame, timestamp=timestamp)
+            result = results[0]
+            person_data = detector.person_fall_data[0]
+            online["floor_sitting"].append(result["context"] == "floor_sitting")
+            for name in ("abnormal_posture", "lying_position", "sudden_movement", "unstable"):
+                online[name].append(result[name])
+            online["combined_score"].append(person_data.current_detection["combined_score"])
+            online["fall_counter"].append(person_data.fall_counter)
+            online["stable_counter"].append(person_data.stable_counter)
+            online["fall_detected"].append(person_data.fall_detected)
+            if result["fall_detected"] != person_data.fall_detected:
+                field_mismatches["fall_detected"] += 1
+        track_scores = scores.track(track)
+        differs = [name for name in fields if online[name] != getattr(track_scores, name).tolist()]
+        if detector.falls_detected.get(0, []) != track_scores.events():
+            differs.append("events")
+        for name in differs:
+            field_mismatches[name] += 1
+        mismatched += bool(differs)
+    elapsed = time.perf_counter() - start
+    detector.alert_dispatcher.stop()
+    print(f"analyze_people (online)    {args.check / elapsed:10,.0f} tracks/s  {args.check * args.frames / elapsed:12,.0f} frames/s")
+    print(f"{args.check} tracks checked against the online path, {mismatched} mismatched; "
+          f"{len(scores.events())} fall events")
+    if mismatched:
+        differing = ", ".join(f"{name} ({count})" for name, count in field_mismatches.items() if count)
+        raise SystemExit(f"score_tracks differs from analyze_people in: {differing}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Fall detection benchmarks")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    video_feed = subparsers.add_parser("video-feed", help="Load test /video_feed with concurrent viewers")
+    video_feed.add_argument("--url", default="http://localhost:5000")
+    video_feed.add_argument("--viewers", type=int, nargs="+", default=[1, 20])
+    video_feed.add_argument("--duration", type=float, default=10.0)
+    video_feed.set_defaults(func=video_feed_command)
+
+    motion_gate = subparsers.add_parser("motion-gate", help="Replay clips with and without the motion gate")
+    motion_gate.add_argument("clips", nargs="+", help="Recorded video files containing falls")
+    motion_gate.set_defaults(func=motion_gate_command)
+
+    shm_ring = subparsers.add_parser("shm-ring", help="Compare multiprocessing.Queue pickling with the shared-memory ring")
+    shm_ring.add_argument("--fps", type=int, nargs="+", default=[30, 60, 0], help="Target FPS, 0 = unthrottled")
+    shm_ring.add_argument("--seconds", type=float, default=5.0)
+    shm_ring.set_defaults(func=shm_ring_command)
+
+    heuristics = subparsers.add_parser("heuristics", help="Per-frame keypoint + fall heuristic cost on synthetic landmarks")
+    heuristics.add_argument("--frames", type=int, default=2400)
+    heuristics.add_argument("--repeat", type=int, default=3)
+    heuristics.add_argument("--fps", type=float, default=30.0, help="Frame rate the synthetic frames are timed at")
+    heuristics.add_argument("--trace-allocations", action="store_true",
+                            help="Also compare shared and per-detector body features: builds per frame and "
+                                 "tracemalloc heap peak; fails below --min-feature-ratio")
+    heuristics.add_argument("--min-feature-ratio", type=float, default=5.0,
+                            help="Fewest times fewer BodyFeatures builds sharing must achieve")
+    heuristics.set_defaults(func=heuristics_command)
+
+    person_state = subparsers.add_parser("person-state", help="Memory and field access of PersonFallState vs a dict")
+    person_state.add_argument("--people", type=int, default=1000)
+    person_state.add_argument("--iterations", type=int, default=200000)
+    person_state.set_defaults(func=person_state_command)
+
+    tracker = subparsers.add_parser("tracker", help="PersonTracker IoU and assignment cost versus detection count")
+    tracker.add_argument("--detections", type=int, nargs="+", default=[1, 10, 50, 200])
+    tracker.add_argument("--frames", type=int, default=100)
+    tracker.set_defaults(func=tracker_command)
+
+    tracker_drops = subparsers.add_parser("tracker-drops", help="Track ID churn with dropped or skipped frames")
+    tracker_drops.add_argument("--people", type=int, default=5)
+    tracker_drops.add_argument("--frames", type=int, default=600)
+    tracker_drops.add_argument("--speed", type=float, default=0.01)
+    tracker_drops.add_argument("--every", type=int, nargs="+", default=[2, 3, 5])
+    tracker_drops.add_argument("--seed", type=int, default=0)
+    tracker_drops.add_argument("--max-switches", type=int, default=0,
+                               help="Fail if the Kalman tracker switches IDs more often than this in any pattern")
+    tracker_drops.set_defaults(func=tracker_drops_command)
+
+    multi_person = subparsers.add_parser("multi-person", help="Per-person crop pose cost and FPS versus people in frame")
+    multi_person.add_argument("--people", type=int, nargs="+", default=[1, 2, 3, 5])
+    multi_person.add_argument("--frames", type=int, default=30)
+    multi_person.add_argument("--workers", type=int, default=2)
+    multi_person.add_argument("--width", type=int, default=960)
+    multi_person.add_argument("--height", type=int, default=540)
+    multi_person.add_argument("--image", help="Image of one person to tile into the frame (default: noise)")
+    multi_person.set_defaults(func=multi_person_command)
+
+    roi_pose = subparsers.add_parser("roi-pose", help="Tracked-ROI pose versus full-frame pose on recorded clips")
+    roi_pose.add_argument("clips", nargs="+", help="Recorded video files with one person in view")
+    roi_pose.add_argument("--redetect-interval", type=int, default=30)
+    roi_pose.add_argument("--tolerance", type=float, default=0.02,
+                          help="Joint distance (fraction of the frame) counted as agreeing")
+    roi_pose.set_defaults(func=roi_pose_command)
+
+    complexity = subparsers.add_parser("complexity", help="Replay simulated per-tier latency through the complexity controller")
+    complexity.add_argument("--tier-ms", type=float, nargs=3, default=[9.0, 15.0, 45.0],
+                            help="Mean inference ms for model_complexity 0, 1 and 2 on the target box")
+    complexity.add_argument("--target-fps", type=float, default=10.0)
+    complexity.add_argument("--frames", type=int, default=900)
+    complexity.add_argument("--slowdown", type=float, default=8.0, help="Latency multiplier for the middle third")
+    complexity.add_argument("--escalate-at", type=int, default=750)
+    complexity.add_argument("--escalate-frames", type=int, default=60)
+    complexity.add_argument("--seed", type=int, default=0)
+    complexity.set_defaults(func=complexity_command)
+
+    pose_backend = subparsers.add_parser("pose-backend", help="Latency, batch throughput and agreement of pose backends")
+    pose_backend.add_argument("--clip", help="Reference clip; keypoints are compared against MediaPipe (default: noise)")
+    pose_backend.add_argument("--onnx", help="Single-person COCO-17 ONNX model (MoveNet-style output)")
+    pose_backend.add_argument("--coordinate-order", choices=["yx", "xy"], default="yx")
+    pose_backend.add_argument("--int8", action="store_true", help="Also benchmark an int8 dynamic-quantized copy")
+    pose_backend.add_argument("--batch", type=int, nargs="+", default=[1, 4, 8])
+    pose_backend.add_argument("--frames", type=int, default=64)
+    pose_backend.add_argument("--tolerance", type=float, default=0.02)
+    pose_backend.set_defaults(func=pose_backend_command)
+
+    batch_scaling = subparsers.add_parser("batch-scaling", help="Offline batch processing wall time versus pool size")
+    batch_scaling.add_argument("paths", nargs="+", help="Video files and/or directories of them")
+    batch_scaling.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    batch_scaling.add_argument("--chunk-seconds", type=float, default=10.0)
+    batch_scaling.add_argument("--warmup-seconds", type=float, default=3.0)
+    batch_scaling.set_defaults(func=batch_scaling_command)
+
+    keypoint_cache = subparsers.add_parser("keypoint-cache", help="Write, memory-map and replay a keypoint cache")
+    keypoint_cache.add_argument("--frames", type=int, default=108000, help="Default is one hour at 30 fps")
+    keypoint_cache.set_defaults(func=keypoint_cache_command)
+
+    sweep = subparsers.add_parser("sweep", help="Parameter sweep throughput and ranking on a labelled synthetic cache")
+    sweep.add_argument("--frames", type=int, default=2400)
+    sweep.add_argument("--workers", type=int, default=None)
+    sweep.add_argument("--top", type=int, default=5)
+    sweep.set_defaults(func=sweep_command)
+
+    profiler = subparsers.add_parser("profiler", help="Stage profiler overhead and a per-stage process_frame profile")
+    profiler.add_argument("--iterations", type=int, default=200000)
+    profiler.add_argument("--frames", type=int, default=2400, help="Synthetic landmark frames for the overhead run")
+    profiler.add_argument("--clip", help="Video to profile process_frame on (default: noise frames)")
+    profiler.add_argument("--video-frames", type=int, default=100)
+    profiler.add_argument("--trace", help="Also write the spans as Chrome trace JSON here")
+    profiler.set_defaults(func=profiler_command)
+
+    metrics = subparsers.add_parser("metrics", help="Update cost of /metrics counters and histograms across threads")
+    metrics.add_argument("--threads", type=int, nargs="+", default=[1, 4, 16])
+    metrics.add_argument("--iterations", type=int, default=200000)
+    metrics.set_defaults(func=metrics_command)
+
+    synthetic = subparsers.add_parser("synthetic", help="Synthetic keypoint generation rate and fall logic per scenario")
+    synthetic.add_argument("--frames", type=int, default=1000000)
+    synthetic.add_argument("--replay-frames", type=int, default=450)
+    synthetic.add_argument("--seed", type=int, default=0)
+    synthetic.set_defaults(func=synthetic_command)
+
+    fall_scoring = subparsers.add_parser("fall-scoring", help="Vectorised fall scoring throughput and identity with the online path")
+    fall_scoring.add_argument("--tracks", type=int, default=2000)
+    fall_scoring.add_argument("--frames", type=int, default=300)
+    fall_scoring.add_argument("--batch", type=int, nargs="+", default=[1, 64, 512])
+    fall_scoring.add_argument("--check", type=int, default=50, help="Tracks also replayed through analyze_people")
+    fall_scoring.add_argument("--seed", type=int, default=0)
+    fall_scoring.set_defaults(func=fall_scoring_command)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+# body_features.py - Per-person, per-frame geometry shared by every fall heuristic
+from keypoints import (
+    LEFT_ANKLE, LEFT_HIP, LEFT_KNEE, MID_HIP, RIGHT_ANKLE, RIGHT_HIP, RIGHT_KNEE,
+    joint_angle, joint_distance, spine_angles,
+)
+
+
+class BodyFeatures:
+    """Spine/knee angles, limb distances, bbox and the floor-sitting verdict for one Keypoints"""
+
+    __slots__ = (
+        "pts", "spine_vertical", "spine_horizontal", "left_knee_angle", "right_knee_angle",
+        "knee_distance", "hip_distance", "bbox", "floor_sitting_confidence", "floor_sitting",
+    )
+
+    def __init__(self, keypoints):
+        pts = keypoints.xy.tolist()
+        self.pts = pts
+        self.spine_vertical, self.spine_horizontal = spine_angles(pts)
+        self.left_knee_angle = joint_angle(pts, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+        self.right_knee_angle = joint_angle(pts, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
+        self.knee_distance = joint_distance(pts, LEFT_KNEE, RIGHT_KNEE)
+        self.hip_distance = joint_distance(pts, LEFT_HIP, RIGHT_HIP)
+
+        xs = [p[0] for p in pts]
+        ys = [p[1] for p in pts]
+        self.bbox = [min(xs), min(ys), max(xs), max(ys)]
+
+        knee_hip_ratio = self.knee_distance / self.hip_distance if self.hip_distance > 0 else 0
+        knees_wide = knee_hip_ratio > 1.2
+        ankles_near = (
+            joint_distance(pts, LEFT_ANKLE, MID_HIP) < 1.2 * joint_distance(pts, LEFT_KNEE, MID_HIP)
+            or joint_distance(pts, RIGHT_ANKLE, MID_HIP) < 1.2 * joint_distance(pts, RIGHT_KNEE, MID_HIP)
+        )
+        cross_legged = knees_wide and ankles_near
+
+        hips_low = pts[MID_HIP][1] > 0.65
+        upper_body_upright = self.spine_vertical > 150
+        knees_bent = self.left_knee_angle < 140 and self.right_knee_angle < 140
+        sitting_on_floor = hips_low and upper_body_upright and knees_bent
+
+        confidence_factors = [cross_legged * 0.8, sitting_on_floor * 0.7]
+        self.floor_sitting_confidence = min(1.0, sum(confidence_factors))
+        self.floor_sitting = self.floor_sitting_confidence > 0.6
+
+
+def features_for(keypoints):
+    # Memoised on the Keypoints object, so gated frames that reuse the last result skip this too
+    features = keypoints.features
+    if features is None:
+        features = keypoints.features = BodyFeatures(keypoints)
+    return features
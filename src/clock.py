@@ -0,0 +1,24 @@
+# clock.py - Time sources for the fall logic: wall clock live, frame timestamps for replayed footage
+import cv2
+
+
+class FrameClock:
+    """Reads the timestamp of the frame being processed, so replay speed never changes the timing math"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def advance_to(self, timestamp):
+        self.now = timestamp
+
+    def __call__(self):
+        return self.now
+
+
+def frame_timestamp(capture, frame_number, fps=None):
+    """Seconds into the stream for the frame just read: the container PTS when it has one, else frame_number / fps"""
+    position_ms = capture.get(cv2.CAP_PROP_POS_MSEC)
+    if position_ms > 0 or frame_number == 0:
+        return position_ms / 1000.0
+    fps = fps or capture.get(cv2.CAP_PROP_FPS) or 30.0
+    return frame_number / fps
@@ -0,0 +1,120 @@
+# complexity_controller.py - Picks the MediaPipe model_complexity tier that fits a per-frame latency budget
+import time
+from collections import deque
+
+from ring_buffer import RingBuffer
+
+# Rough latency of each tier relative to complexity 0; refined on this box every time the controller switches
+TIER_COST = {0: 1.0, 1: 1.6, 2: 4.5}
+
+
+class ComplexityController:
+    """Moves between pose model tiers from rolling inference latency, and pins the top tier during a fall.
+
+    A tier steps down when its mean latency breaks the budget and steps up when the next tier's expected
+    latency fits within upgrade_headroom of the budget. The expectation scales the current latency by the
+    relative tier cost rather than reusing old measurements, so a box that was busy when a tier last ran
+    isn't kept off that tier forever. Costs are re-learnt from the latencies either side of each switch.
+    min_dwell inferences between budget-driven switches stop it oscillating between two tiers.
+    """
+
+    def __init__(self, target_fps=10.0, tiers=(0, 1, 2), initial_tier=1, window=30, upgrade_headroom=0.7,
+                 min_dwell=30, max_events=20):
+        self.target_fps = target_fps
+        self.tiers = tuple(sorted(tiers))
+        self.upgrade_headroom = upgrade_headroom
+        self.min_dwell = min_dwell
+        self.latency = {tier: RingBuffer(window) for tier in self.tiers}
+        self.cost = {tier: TIER_COST.get(tier, 1.0) for tier in self.tiers}
+        self._before_switch = None
+        self.tier = initial_tier if initial_tier in self.tiers else self.tiers[0]
+        self.escalated = False
+        self._tier_before_escalation = self.tier
+        self._dwell = 0
+        self.switches = 0
+        self.events = deque(maxlen=max_events)
+
+    @property
+    def budget(self):
+        return 1.0 / self.target_fps if self.target_fps > 0 else float("inf")
+
+    def _switch(self, tier, reason, now=None):
+        if tier == self.tier:
+            return
+        previous = self.latency[self.tier]
+        self._before_switch = (self.tier, previous.mean()) if len(previous) else None
+        # Each buffer only holds the current stay, so a tier's mean never mixes in old load conditions
+        self.latency[tier].clear()
+        self.events.append({
+            "time": round(time.time() if now is None else now, 3),
+            "from": self.tier,
+            "to": tier,
+            "reason": reason,
+        })
+        self.tier = tier
+        self.switches += 1
+        self._dwell = 0
+
+    def _expected_latency(self, tier):
+        return self.latency[self.tier].mean() * self.cost[tier] / self.cost[self.tier]
+
+    def _learn_cost(self, mean):
+        previous_tier, previous_mean = self._before_switch
+        self._before_switch = None
+        if previous_tier in self.cost and previous_mean > 0:
+            self.cost[self.tier] = self.cost[previous_tier] * mean / previous_mean
+
+    def drop_tier(self, tier):
+        """Stop considering a tier whose model could not be loaded on this box"""
+        if tier not in self.tiers or len(self.tiers) == 1:
+            return
+        self.tiers = tuple(t for t in self.tiers if t != tier)
+        if self.tier == tier:
+            self.tier = min(self.tiers, key=lambda t: abs(t - tier))
+        if self._tier_before_escalation == tier:
+            self._tier_before_escalation = self.tier
+
+    def escalate(self, active, now=None):
+        """Hold the highest tier while a fall score is rising; go back to the budget tier once it settles"""
+        if active and not self.escalated:
+            self.escalated = True
+            self._tier_before_escalation = self.tier
+            self._switch(self.tiers[-1], "fall score rising", now)
+        elif not active and self.escalated:
+            self.escalated = False
+            self._switch(self._tier_before_escalation, "fall score settled", now)
+
+    def record(self, seconds, now=None):
+        """Add one inference latency at the current tier; returns the tier to use for the next inference"""
+        samples = self.latency[self.tier]
+        samples.append(seconds)
+        self._dwell += 1
+        if len(samples) < samples.capacity // 2:
+            return self.tier
+        mean = samples.mean()
+        if self._before_switch is not None:
+            self._learn_cost(mean)
+        if self.escalated or self._dwell < self.min_dwell:
+            return self.tier
+
+        index = self.tiers.index(self.tier)
+        if mean > self.budget and index > 0:
+            self._switch(self.tiers[index - 1], f"{mean * 1000:.0f} ms over {self.budget * 1000:.0f} ms budget", now)
+        elif index + 1 < len(self.tiers):
+            expected = self._expected_latency(self.tiers[index + 1])
+            if expected < self.budget * self.upgrade_headroom:
+                self._switch(self.tiers[index + 1], f"{expected * 1000:.0f} ms expected fits budget", now)
+        return self.tier
+
+    def stats(self):
+        return {
+            "tier": self.tier,
+            "target_fps": self.target_fps,
+            "escalated": self.escalated,
+            "switches": self.switches,
+            "relative_cost": {tier: round(cost, 2) for tier, cost in self.cost.items()},
+            "latency_ms": {
+                tier: round(samples.mean() * 1000, 2) for tier, samples in self.latency.items() if len(samples)
+            },
+            "events": list(self.events),
+        }
@@ -0,0 +1,271 @@
+# evaluation.py - Detection metrics, ground-truth matching and a labelled-video evaluation harness
+import argparse
+import json
+import multiprocessing
+import os
+import time
+
+import numpy as np
+
+
+def evaluate_fall_detection(true_positives, false_positives, true_negatives, false_negatives):
+    """Calculate accuracy metrics for fall detection (all as percentages)"""
+    # Sensitivity/Recall (True Positive Rate)
+    sensitivity = (
+        true_positives / (true_positives + false_negatives)
+        if (true_positives + false_negatives) > 0
+        else 0
+    )
+
+    # Specificity (True Negative Rate)
+    specificity = (
+        true_negatives / (true_negatives + false_positives)
+        if (true_negatives + false_positives) > 0
+        else 0
+    )
+
+    # Precision (Positive Predictive Value)
+    precision = (
+        true_positives / (true_positives + false_positives)
+        if (true_positives + false_positives) > 0
+        else 0
+    )
+
+    # F1 Score (harmonic mean of precision and recall)
+    f1_score = (
+        2 * (precision * sensitivity) / (precision + sensitivity)
+        if (precision + sensitivity) > 0
+        else 0
+    )
+
+    # Accuracy (overall correctness)
+    total = true_positives + true_negatives + false_positives + false_negatives
+    accuracy = (true_positives + true_negatives) / total if total > 0 else 0
+
+    return {
+        "sensitivity": sensitivity * 100,
+        "specificity": specificity * 100,
+        "precision": precision * 100,
+        "f1_score": f1_score * 100,
+        "accuracy": accuracy * 100,
+    }
+
+
+def match_falls(detected_times, fall_intervals, tolerance=2.0):
+    """Match detection times (s) to ground-truth (start, end) fall intervals.
+
+    A detection counts for a fall if it lands between start - tolerance and end + tolerance; each fall takes
+    the earliest unused detection. Returns (true positives, false positives, false negatives, latencies),
+    where a latency is detection time minus fall start.
+    """
+    detections = sorted(detected_times)
+    used = [False] * len(detections)
+    latencies = []
+    for start, end in sorted(fall_intervals):
+        for i, t in enumerate(detections):
+            if not used[i] and start - tolerance <= t <= end + tolerance:
+                used[i] = True
+                latencies.append(t - start)
+                break
+    true_positives = len(latencies)
+    return true_positives, used.count(False), len(fall_intervals) - true_positives, latencies
+
+
+def score_clips(clip_results, tolerance=2.0):
+    """Pool per-clip detections into one confusion matrix.
+
+    clip_results is an iterable of (detected_times, fall_intervals). Falls are scored by matching; a clip with
+    no labelled fall is one negative, a true negative if nothing fired in it and a false positive otherwise
+    (its spurious detections are not counted again as extra false positives).
+    """
+    tp = fp = tn = fn = 0
+    latencies = []
+    for detected_times, fall_intervals in clip_results:
+        if not fall_intervals:
+            if detected_times:
+                fp += 1
+            else:
+                tn += 1
+            continue
+        clip_tp, clip_fp, clip_fn, clip_latencies = match_falls(detected_times, fall_intervals, tolerance)
+        tp += clip_tp
+        fp += clip_fp
+        fn += clip_fn
+        latencies.extend(clip_latencies)
+
+    result = evaluate_fall_detection(tp, fp, tn, fn)
+    result.update({"tp": tp, "fp": fp, "tn": tn, "fn": fn})
+    result.update(latency_summary(latencies))
+    return result
+
+
+def latency_summary(latencies):
+    """Time-to-detect statistics in seconds (None when nothing was detected)"""
+    if not latencies:
+        return {"latency_mean_s": None, "latency_p50_s": None, "latency_p90_s": None, "latency_p95_s": None,
+                "latency_max_s": None}
+    values = np.asarray(latencies, dtype=np.float64)
+    return {
+        "latency_mean_s": round(float(values.mean()), 3),
+        "latency_p50_s": round(float(np.percentile(values, 50)), 3),
+        "latency_p90_s": round(float(np.percentile(values, 90)), 3),
+        "latency_p95_s": round(float(np.percentile(values, 95)), 3),
+        "latency_max_s": round(float(values.max()), 3),
+    }
+
+
+def load_manifest(path):
+    """Labelled clips: a JSON list of {"video" and/or "cache", "falls": [[start_s, end_s], ...]}.
+
+    Relative paths are taken relative to the manifest's own directory.
+    """
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    for entry in entries:
+        for key in ("video", "cache"):
+            if entry.get(key) and not os.path.isabs(entry[key]):
+                entry[key] = os.path.join(base, entry[key])
+        entry["falls"] = [tuple(interval) for interval in entry.get("falls", [])]
+    return entries
+
+
+# One detector per pool worker, built by the initializer and cleared between clips
+_worker_detector = None
+
+
+def _init_worker(estimator_options):
+    global _worker_detector
+    from clock import FrameClock
+    from fall_detector import FallDetector
+    from motion_gate import MotionGate
+    from pose_estimator import PoseEstimator
+
+    # Every frame goes through pose on a fixed model, timed by frame timestamps: the same clip gives the same
+    # detections on any box, however fast it is
+    options = dict(estimator_options)
+    options["adaptive_complexity"] = False
+    estimator = PoseEstimator(motion_gate=MotionGate(enabled=False), **options)
+    _worker_detector = FallDetector(headless=True, pose_estimator=estimator, clock=FrameClock())
+
+
+def _new_falls(detector, before):
+    return [person_id for person_id, falls in detector.falls_detected.items() if len(falls) > before.get(person_id, 0)]
+
+
+def evaluate_clip(entry):
+    """Run one labelled clip through the full detector; returns its detections and timing"""
+    import cv2
+
+    from clock import frame_timestamp
+
+    detector = _worker_detector
+    detector.clear_tracking_state()
+    detections = []
+    frames = 0
+    start = time.perf_counter()
+    if entry.get("video"):
+        capture = cv2.VideoCapture(entry["video"])
+        if not capture.isOpened():
+            return {**entry, "error": f"Could not open {entry['video']}"}
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                timestamp = frame_timestamp(capture, frames, fps)
+                before = {person_id: len(falls) for person_id, falls in detector.falls_detected.items()}
+                _, fall_detected = detector.process_frame(frame, frames, entry["video"], show_display=False,
+                                                          timestamp=timestamp)
+                if fall_detected:
+                    detections.extend(round(timestamp, 3) for _ in _new_falls(detector, before))
+                frames += 1
+        finally:
+            capture.release()
+    else:
+        # Already-extracted keypoints: same fall logic, no pose inference
+        from keypoint_cache import KeypointSequence, replay
+
+        sequence = KeypointSequence.load(entry["cache"])
+        detections = [event["time_s"] for event in replay(sequence, detector)]
+        frames = len(sequence)
+    return {**entry, "frames": frames, "seconds": round(time.perf_counter() - start, 3), "detections": detections}
+
+
+def run_evaluation(manifest_path, workers=None, tolerance=2.0, estimator_options=None):
+    """Evaluate every clip of a manifest on a process pool; returns the JSON-ready report"""
+    entries = load_manifest(manifest_path)
+    workers = min(workers or os.cpu_count() or 1, max(1, len(entries)))
+    start = time.perf_counter()
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(workers, initializer=_init_worker, initargs=(estimator_options or {},)) as pool:
+        clips = pool.map(evaluate_clip, entries, chunksize=1)
+    elapsed = time.perf_counter() - start
+
+    scored = [clip for clip in clips if "error" not in clip]
+    for clip in scored:
+        if clip["falls"]:
+            tp, fp, fn, latencies = match_falls(clip["detections"], clip["falls"], tolerance)
+        else:
+            # Same rule as score_clips: a fall-free clip is one negative, however many times it fired
+            tp, fp, fn, latencies = 0, 1 if clip["detections"] else 0, 0, []
+        clip.update({"tp": tp, "fp": fp, "fn": fn, "latencies_s": [round(t, 3) for t in latencies]})
+    frames = sum(clip["frames"] for clip in scored)
+    return {
+        "manifest": os.path.abspath(manifest_path),
+        "tolerance_s": tolerance,
+        "workers": workers,
+        "frames": frames,
+        "seconds": round(elapsed, 3),
+        "fps": round(frames / elapsed, 2) if elapsed > 0 else 0.0,
+        "metrics": score_clips(((clip["detections"], clip["falls"]) for clip in scored), tolerance),
+        "errors": [{"video": clip.get("video"), "error": clip["error"]} for clip in clips if "error" in clip],
+        "clips": clips,
+    }
+
+
+def print_summary(report):
+    print(f"{'clip':<40} {'falls':>5} {'det':>4} {'TP':>3} {'FP':>3} {'FN':>3} {'frames':>7}")
+    for clip in report["clips"]:
+        name = os.path.basename(clip.get("video") or clip.get("cache") or "?")
+        if "error" in clip:
+            print(f"{name:<40} {clip['error']}")
+            continue
+        print(f"{name:<40} {len(clip['falls']):>5} {len(clip['detections']):>4} {clip['tp']:>3} {clip['fp']:>3} "
+              f"{clip['fn']:>3} {clip['frames']:>7}")
+
+    metrics = report["metrics"]
+    print(f"\nTP={metrics['tp']} FP={metrics['fp']} TN={metrics['tn']} FN={metrics['fn']}  "
+          f"(tolerance {report['tolerance_s']} s, {report['frames']} frames at {report['fps']} FPS)")
+    for name in ("sensitivity", "specificity", "precision", "f1_score", "accuracy"):
+        print(f"  {name:<12} {metrics[name]:6.1f}%")
+    if metrics["latency_p50_s"] is not None:
+        print(f"  time to detect: mean {metrics['latency_mean_s']:.2f} s, p50 {metrics['latency_p50_s']:.2f} s, "
+              f"p90 {metrics['latency_p90_s']:.2f} s, p95 {metrics['latency_p95_s']:.2f} s, "
+              f"max {metrics['latency_max_s']:.2f} s")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Score the fall detector against labelled videos")
+    parser.add_argument("manifest", help='JSON list of {"video" or "cache": path, "falls": [[start_s, end_s], ...]}')
+    parser.add_argument("--workers", type=int, default=None, help="Clips evaluated in parallel (default: CPU count)")
+    parser.add_argument("--tolerance", type=float, default=2.0,
+                        help="Seconds before a fall's start or after its end a detection still counts")
+    parser.add_argument("--output", help="Also write the full JSON report here")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    report = run_evaluation(args.manifest, args.workers, args.tolerance)
+    print_summary(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    return report
+
+
+if __name__ == "__main__":
+    main()
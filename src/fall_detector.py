@@ -1,6 +1,5 @@
 # fall_detector.py - Enhanced Fall Detection System with Emergency Sequence
 import cv2
-import mediapipe as mp
 import numpy as np
 import os
 import time
@@ -8,7 +7,15 @@ from datetime import datetime
 import threading
 import pygame
 import speech_recognition as sr
-from twilio.rest import Client
+from pose_estimator import PoseEstimator
+from keypoints import (
+    LEFT_ANKLE, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, MID_HIP, MID_SHOULDER, NOSE,
+    RIGHT_ANKLE, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER,
+)
+from body_features import features_for
+from tracking import GATING_THRESHOLD, BoxKalmanFilter, greedy_match, hungarian_match, iou_matrix
+from person_state import ABNORMAL_POSTURE, LYING_POSITION, SUDDEN_MOVEMENT, PersonFallState
+from alert_dispatcher import AlertDispatcher, AlertEvent, NullTransport, TwilioCallTransport, TwilioSMSTransport
 
 # Twilio credentials
 TWILIO_ACCOUNT_SID = 'AC084d5387ee90e933a1ff023337cac58e'
@@ -16,56 +23,65 @@ TWILIO_AUTH_TOKEN = 'ebd99c6e9c2eef99880fd72d10439098'  # Replace with actual au
 TWILIO_PHONE_NUMBER = '+12186566943'
 EMERGENCY_CONTACT = '+919080557940'  # Replace with actual emergency contact number
 
+def _sms_transport():
+    return TwilioSMSTransport(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, EMERGENCY_CONTACT)
+
+def _call_transport():
+    return TwilioCallTransport(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE_NUMBER, EMERGENCY_CONTACT)
+
+def create_alert_dispatcher(outbox_dir=None, headless=False):
+    if headless:
+        return AlertDispatcher({"sms": NullTransport(), "call": NullTransport()}, workers=1)
+    # Retries for both SMS and calls (3 attempts, 5 s backoff) run on the dispatcher workers
+    if outbox_dir is None:
+        outbox_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "alert_outbox")
+    return AlertDispatcher(
+        {"sms": _sms_transport(), "call": _call_transport()},
+        outbox_dir,
+        max_attempts=3,
+        base_backoff=5.0,
+    )
+
 def send_emergency_sms():
     try:
-        client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-        message = client.messages.create(
-            body="🚨 Alert: A fall has been detected. Please check in immediately.",
-            from_=TWILIO_PHONE_NUMBER,
-            to=EMERGENCY_CONTACT
-        )
-        print("✅ Emergency SMS sent successfully! SID:", message.sid)
+        _sms_transport().send(AlertEvent("sms", {}))
         return True
     except Exception as e:
         print(f"❌ Failed to send emergency SMS: {e}")
         return False
 
 def make_emergency_call():
-    max_attempts = 3
-    for attempt in range(1, max_attempts + 1):
-        try:
-            client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-            call = client.calls.create(
-                twiml='<Response><Say>Emergency! A fall has been detected and the person is unresponsive. Please assist immediately.</Say></Response>',
-                from_=TWILIO_PHONE_NUMBER,
-                to=EMERGENCY_CONTACT
-            )
-            print(f"✅ Emergency call initiated on attempt {attempt}! SID:", call.sid)
-            return True
-        except Exception as e:
-            print(f"❌ Failed to initiate emergency call on attempt {attempt}: {e}")
-            if attempt < max_attempts:
-                print("Retrying in 5 seconds...")
-                time.sleep(5)
-    print(f"❌ Failed to make emergency call after {max_attempts} attempts")
-    return False
+    try:
+        _call_transport().send(AlertEvent("call", {}))
+        return True
+    except Exception as e:
+        print(f"❌ Failed to initiate emergency call: {e}")
+        return False
+
+
+_SKELETON_CONNECTIONS = (
+    (LEFT_SHOULDER, RIGHT_SHOULDER), (LEFT_SHOULDER, LEFT_HIP),
+    (RIGHT_SHOULDER, RIGHT_HIP), (LEFT_HIP, RIGHT_HIP),
+    (LEFT_HIP, LEFT_KNEE), (LEFT_KNEE, LEFT_ANKLE),
+    (RIGHT_HIP, RIGHT_KNEE), (RIGHT_KNEE, RIGHT_ANKLE),
+)
+_SKELETON_JOINTS = (NOSE, MID_SHOULDER, MID_HIP, LEFT_KNEE, RIGHT_KNEE, LEFT_ANKLE, RIGHT_ANKLE)
 
 class PersonTracker:
-    def __init__(self):
+    def __init__(self, assignment="greedy", motion_model="kalman"):
         self.next_id = 0
         self.tracked_persons = {}
         self.max_disappeared = 15
         self.iou_threshold = 0.25
         self.velocity_history = {}
+        # "greedy" matches highest IoU first; "hungarian" maximises total IoU across all pairs
+        self.assignment = assignment
+        # "kalman" matches detections against each track's predicted box; "none" uses the last observed box
+        self.motion_model = motion_model
+        self.last_frame_number = None
 
     def get_person_bbox(self, keypoints):
-        x_points = [p[0] for p in keypoints.values() if isinstance(p, list) and len(p) == 2]
-        y_points = [p[1] for p in keypoints.values() if isinstance(p, list) and len(p) == 2]
-        if not x_points or not y_points:
-            return None
-        min_x, max_x = min(x_points), max(x_points)
-        min_y, max_y = min(y_points), max(y_points)
-        return [min_x, min_y, max_x, max_y]
+        return features_for(keypoints).bbox
 
     def calculate_iou(self, box1, box2):
         x1_min, y1_min, x1_max, y1_max = box1
@@ -82,62 +98,96 @@ class PersonTracker:
         union_area = box1_area + box2_area - intersection_area
         return intersection_area / union_area if union_area > 0 else 0
 
-    def update(self, detected_persons_keypoints):
+    def _new_track(self, keypoints, bbox):
+        self.tracked_persons[self.next_id] = {
+            "keypoints": keypoints,
+            "last_seen": 0,
+            "bbox": bbox,
+            "consistent_count": 1,
+            "kalman": BoxKalmanFilter(bbox) if self.motion_model == "kalman" else None,
+        }
+        self.next_id += 1
+
+    def _frames_elapsed(self, frame_number):
+        # Frames since the previous update; gaps come from skipped inference or frames dropped upstream
+        elapsed = 1
+        if frame_number is not None and self.last_frame_number is not None and frame_number > self.last_frame_number:
+            elapsed = frame_number - self.last_frame_number
+        self.last_frame_number = frame_number
+        return elapsed
+
+    def _gating_distance(self, track_id, bbox):
+        track = self.tracked_persons[track_id]
+        return min(track["kalman"].gating_distance(bbox), track["kalman"].gating_distance(bbox, track["bbox"]))
+
+    def update(self, detected_persons_keypoints, frame_number=None):
+        elapsed = self._frames_elapsed(frame_number)
+        detection_bboxes = [self.get_person_bbox(keypoints) for keypoints in detected_persons_keypoints]
         if not self.tracked_persons:
-            for keypoints in detected_persons_keypoints:
-                self.tracked_persons[self.next_id] = {
-                    "keypoints": keypoints,
-                    "last_seen": 0,
-                    "bbox": self.get_person_bbox(keypoints),
-                    "consistent_count": 1,
-                }
-                self.next_id += 1
+            for keypoints, bbox in zip(detected_persons_keypoints, detection_bboxes):
+                self._new_track(keypoints, bbox)
             return {person_id: info["keypoints"] for person_id, info in self.tracked_persons.items()}
 
-        matches = []
-        unmatched_detections = list(range(len(detected_persons_keypoints)))
-        unmatched_trackers = list(self.tracked_persons.keys())
-
-        for d_idx, detection_keypoints in enumerate(detected_persons_keypoints):
-            d_bbox = self.get_person_bbox(detection_keypoints)
-            if not d_bbox:
-                continue
-            for t_id in self.tracked_persons.keys():
-                t_bbox = self.tracked_persons[t_id]["bbox"]
-                if not t_bbox:
-                    continue
-                iou = self.calculate_iou(d_bbox, t_bbox)
-                if iou > self.iou_threshold:
-                    matches.append((d_idx, t_id, iou))
-
-        matches.sort(key=lambda x: x[2], reverse=True)
+        # One IoU matrix for all detections x tracks instead of a pairwise Python loop
+        track_ids = list(self.tracked_persons.keys())
+        iou = iou_matrix(detection_bboxes, [self.tracked_persons[t_id]["bbox"] for t_id in track_ids])
+        if self.motion_model == "kalman":
+            # Coast every track over the elapsed frames and also score detections against where it should
+            # be now. Taking the better of the two keeps sudden stops and direction changes (a fall is one)
+            # matching on the last box, while gaps from skipped or dropped frames match on the prediction.
+            predicted = [self.tracked_persons[t_id]["kalman"].predict(elapsed) for t_id in track_ids]
+            iou = np.maximum(iou, iou_matrix(detection_bboxes, predicted))
+        if self.assignment == "hungarian":
+            matches = hungarian_match(iou, self.iou_threshold)
+        else:
+            matches = greedy_match(iou, self.iou_threshold)
+
         matched_detections = set()
         matched_trackers = set()
-
-        for d_idx, t_id, iou in matches:
-            if d_idx not in matched_detections and t_id not in matched_trackers:
-                self.tracked_persons[t_id]["keypoints"] = detected_persons_keypoints[d_idx]
-                self.tracked_persons[t_id]["last_seen"] = 0
-                self.tracked_persons[t_id]["bbox"] = self.get_person_bbox(detected_persons_keypoints[d_idx])
-                self.tracked_persons[t_id]["consistent_count"] = min(
-                    self.tracked_persons[t_id].get("consistent_count", 0) + 1, 30
-                )
-                matched_detections.add(d_idx)
-                matched_trackers.add(t_id)
+        for d_idx, t_idx in matches:
+            t_id = track_ids[t_idx]
+            track = self.tracked_persons[t_id]
+            track["keypoints"] = detected_persons_keypoints[d_idx]
+            track["last_seen"] = 0
+            track["bbox"] = detection_bboxes[d_idx]
+            if track["kalman"] is not None:
+                track["kalman"].update(detection_bboxes[d_idx])
+            track["consistent_count"] = min(track.get("consistent_count", 0) + 1, 30)
+            matched_detections.add(d_idx)
+            matched_trackers.add(t_id)
+
+        if self.motion_model == "kalman":
+            # Boxes that moved more than about half their width since the last match share too little area for
+            # the IoU gate: a young track whose velocity is still unknown, or a turn during dropped frames. Give
+            # those leftovers a second chance within the filter's own uncertainty before starting a new ID,
+            # again measured from both the prediction and the last box.
+            open_detections = [d_idx for d_idx in range(len(detected_persons_keypoints)) if d_idx not in matched_detections]
+            open_tracks = [t_idx for t_idx, t_id in enumerate(track_ids) if t_id not in matched_trackers]
+            if open_detections and open_tracks:
+                closeness = np.array([
+                    [GATING_THRESHOLD - self._gating_distance(track_ids[t_idx], detection_bboxes[d_idx])
+                     for t_idx in open_tracks]
+                    for d_idx in open_detections
+                ])
+                for row, col in greedy_match(closeness, 0.0):
+                    d_idx, t_id = open_detections[row], track_ids[open_tracks[col]]
+                    track = self.tracked_persons[t_id]
+                    track["keypoints"] = detected_persons_keypoints[d_idx]
+                    track["last_seen"] = 0
+                    track["bbox"] = detection_bboxes[d_idx]
+                    track["kalman"].update(detection_bboxes[d_idx])
+                    track["consistent_count"] = min(track.get("consistent_count", 0) + 1, 30)
+                    matched_detections.add(d_idx)
+                    matched_trackers.add(t_id)
 
         for d_idx in range(len(detected_persons_keypoints)):
             if d_idx not in matched_detections:
-                self.tracked_persons[self.next_id] = {
-                    "keypoints": detected_persons_keypoints[d_idx],
-                    "last_seen": 0,
-                    "bbox": self.get_person_bbox(detected_persons_keypoints[d_idx]),
-                    "consistent_count": 1,
-                }
-                self.next_id += 1
-
-        for t_id in list(self.tracked_persons.keys()):
+                self._new_track(detected_persons_keypoints[d_idx], detection_bboxes[d_idx])
+
+        # Only tracks that existed before this frame can have missed it; the ones just created were seen now
+        for t_id in track_ids:
             if t_id not in matched_trackers:
-                self.tracked_persons[t_id]["last_seen"] += 1
+                self.tracked_persons[t_id]["last_seen"] += elapsed
                 adjusted_max_disappeared = min(
                     self.max_disappeared + (self.tracked_persons[t_id].get("consistent_count", 0) // 2),
                     25,
@@ -154,23 +204,49 @@ class PersonTracker:
         return {person_id: info["keypoints"] for person_id, info in top_persons}
 
 class FallDetector:
-    def __init__(self):
-        self.mp_pose = mp.solutions.pose
-        self.pose = self.mp_pose.Pose(
+    def __init__(self, alert_dispatcher=None, headless=False, pose_estimator=None, multi_person=False,
+                 adaptive_complexity=False, target_fps=10.0, pose_backend="mediapipe", backend_options=None,
+                 clock=None, profile=False):
+        self.max_persons = 3
+        self.pose_estimator = pose_estimator if pose_estimator is not None else PoseEstimator(
             min_detection_confidence=0.6,
             min_tracking_confidence=0.6,
             model_complexity=1,
             smooth_landmarks=True,
+            multi_person=multi_person,
+            max_persons=self.max_persons,
+            adaptive_complexity=adaptive_complexity,
+            target_fps=target_fps,
+            backend=pose_backend,
+            backend_options=backend_options,
+            profile=profile,
         )
-        self.mp_drawing = mp.solutions.drawing_utils
+        # One profiler for the whole frame: pose stages and fall-logic stages land in the same summary/trace
+        self.profiler = self.pose_estimator.profiler
+        if profile:
+            self.profiler.enabled = True
+        self.mp_pose = self.pose_estimator.mp_pose
+        self.motion_gate = self.pose_estimator.motion_gate
+        # Headless detectors (offline replay, benchmarks) never touch audio, recording or emergency threads
+        self.headless = headless
+        # Drives every fall-timing decision; a clock.FrameClock makes replay run on frame timestamps instead
+        self.clock = clock or time.time
 
         self.height_ratio_threshold = 0.4
         self.velocity_threshold = 0.05
         self.stable_frames_threshold = 10
+        # Consecutive-ish frames (the counter decays by one per quiet frame) before a fall is confirmed
+        self.required_fall_frames = 5
+        # combined_fall_score weights and the score that alone confirms a fall frame; tunable by sweep.py
+        self.abnormal_posture_weight = 2
+        self.lying_position_weight = 3
+        self.sudden_movement_weight = 1
+        self.unstable_weight = 2
+        self.fall_sequence_weight = 3
+        self.fall_score_threshold = 6
 
         self.person_tracker = PersonTracker()
         self.person_fall_data = {}
-        self.max_persons = 3
 
         self.is_recording = False
         self.record_start_time = None
@@ -190,6 +266,24 @@ class FallDetector:
         self.audio_response_thread = None
         self.audio_stop_flag = False
         
+        self.audio_base_path = r"C:\ALL folder in dexstop\PycharmProjects\cctv_web_app_firebase_1\cctv_web_app\src\Alert"
+        self.are_you_ok_audio = os.path.join(self.audio_base_path, "Are-u-ok.mp3")
+        self.emergency_audio = os.path.join(self.audio_base_path, "Emergency.mp3")
+        self.backup_audio_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio")
+        if not headless:
+            self._init_audio()
+
+        self.last_sms_time = 0
+        self.sms_cooldown = 300
+        self.alert_dispatcher = alert_dispatcher or create_alert_dispatcher(headless=headless)
+        self.alert_dispatcher.start()
+
+        self.recognizer = sr.Recognizer()
+        self.recognizer.dynamic_energy_threshold = True
+        self.recognizer.energy_threshold = 400
+        self.emergency_threads = {}
+
+    def _init_audio(self):
         try:
             pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=512)
             print("✅ Audio system initialized successfully")
@@ -201,11 +295,6 @@ class FallDetector:
             except:
                 print("❌ Critical: Could not initialize audio system")
         
-        self.audio_base_path = r"C:\ALL folder in dexstop\PycharmProjects\cctv_web_app_firebase_1\cctv_web_app\src\Alert"
-        self.are_you_ok_audio = os.path.join(self.audio_base_path, "Are-u-ok.mp3")
-        self.emergency_audio = os.path.join(self.audio_base_path, "Emergency.mp3")
-        
-        self.backup_audio_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio")
         if not os.path.exists(self.backup_audio_path):
             try:
                 os.makedirs(self.backup_audio_path)
@@ -214,14 +303,6 @@ class FallDetector:
                 print(f"Failed to create backup audio folder: {e}")
         
         self._verify_audio_files()
-        
-        self.last_sms_time = 0
-        self.sms_cooldown = 300
-        
-        self.recognizer = sr.Recognizer()
-        self.recognizer.dynamic_energy_threshold = True
-        self.recognizer.energy_threshold = 400
-        self.emergency_threads = {}
 
     def _verify_audio_files(self):
         audio_files_exist = True
@@ -267,91 +348,58 @@ class FallDetector:
             if thread and thread.is_alive():
                 print(f"Stopping emergency sequence for person {thread_id}")
                 if thread_id in self.person_fall_data:
-                    self.person_fall_data[thread_id]["emergency_active"] = False
+                    self.person_fall_data[thread_id].emergency_active = False
         
         self.emergency_threads = {}
         self.last_sms_time = 0
-        pygame.mixer.stop()
+        self.pose_estimator.reset()
+        if not self.headless:
+            pygame.mixer.stop()
         print("Reset complete")
 
+    def clear_tracking_state(self):
+        """Forget every track, per-person history and alert cooldown without touching recording or audio"""
+        self.person_tracker = PersonTracker(self.person_tracker.assignment, self.person_tracker.motion_model)
+        self.person_fall_data = {}
+        self.falls_detected = {}
+        self.last_sms_time = 0
+        self.pose_estimator.reset()
+
     def _get_person_fall_data(self, person_id):
         if person_id not in self.person_fall_data:
-            self.person_fall_data[person_id] = {
-                "height_history": [],
-                "time_history": [],
-                "mid_hip_history": [],
-                "mid_shoulder_history": [],
-                "nose_history": [],
-                "fall_counter": 0,
-                "stable_counter": 0,
-                "fall_detected": False,
-                "recovery_counter": 0,
-                "context_history": [],
-                "last_detected_state": "unknown",
-                "movement_after_fall": False,
-                "last_position": None,
-                "fall_time": None,
-                "no_movement_start_time": None,
-                "audio_triggered": False,
-                "sms_sent": False,
-                "emergency_active": False,
-            }
+            self.person_fall_data[person_id] = PersonFallState()
         return self.person_fall_data[person_id]
 
     def calculate_angle(self, a, b, c):
-        a = np.array(a)
-        b = np.array(b)
-        c = np.array(c)
-        ba = a - b
-        bc = c - b
+        ba = np.subtract(a, b)
+        bc = np.subtract(c, b)
         cosine_angle = np.dot(ba, bc) / (np.linalg.norm(ba) * np.linalg.norm(bc))
         angle = np.arccos(np.clip(cosine_angle, -1.0, 1.0))
         return np.degrees(angle)
 
     def calculate_distance(self, point1, point2):
-        return np.sqrt((point1[0] - point2[0]) ** 2 + (point1[1] - point2[1]) ** 2)
+        dx = point1[0] - point2[0]
+        dy = point1[1] - point2[1]
+        return np.sqrt(dx * dx + dy * dy)
 
     def get_body_keypoints(self, landmarks):
-        keypoints = {
-            "nose": [landmarks[self.mp_pose.PoseLandmark.NOSE].x, landmarks[self.mp_pose.PoseLandmark.NOSE].y],
-            "left_eye": [landmarks[self.mp_pose.PoseLandmark.LEFT_EYE].x, landmarks[self.mp_pose.PoseLandmark.LEFT_EYE].y],
-            "right_eye": [landmarks[self.mp_pose.PoseLandmark.RIGHT_EYE].x, landmarks[self.mp_pose.PoseLandmark.RIGHT_EYE].y],
-            "left_shoulder": [landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER].x, landmarks[self.mp_pose.PoseLandmark.LEFT_SHOULDER].y],
-            "right_shoulder": [landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER].x, landmarks[self.mp_pose.PoseLandmark.RIGHT_SHOULDER].y],
-            "left_hip": [landmarks[self.mp_pose.PoseLandmark.LEFT_HIP].x, landmarks[self.mp_pose.PoseLandmark.LEFT_HIP].y],
-            "right_hip": [landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP].x, landmarks[self.mp_pose.PoseLandmark.RIGHT_HIP].y],
-            "left_knee": [landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE].x, landmarks[self.mp_pose.PoseLandmark.LEFT_KNEE].y],
-            "right_knee": [landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE].x, landmarks[self.mp_pose.PoseLandmark.RIGHT_KNEE].y],
-            "left_ankle": [landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE].x, landmarks[self.mp_pose.PoseLandmark.LEFT_ANKLE].y],
-            "right_ankle": [landmarks[self.mp_pose.PoseLandmark.RIGHT_ANKLE].x, landmarks[self.mp_pose.PoseLandmark.RIGHT_ANKLE].y],
-            "left_wrist": [landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST].x, landmarks[self.mp_pose.PoseLandmark.LEFT_WRIST].y],
-            "right_wrist": [landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST].x, landmarks[self.mp_pose.PoseLandmark.RIGHT_WRIST].y],
-        }
-        keypoints["mid_shoulder"] = [
-            (keypoints["left_shoulder"][0] + keypoints["right_shoulder"][0]) / 2,
-            (keypoints["left_shoulder"][1] + keypoints["right_shoulder"][1]) / 2,
-        ]
-        keypoints["mid_hip"] = [
-            (keypoints["left_hip"][0] + keypoints["right_hip"][0]) / 2,
-            (keypoints["left_hip"][1] + keypoints["right_hip"][1]) / 2,
-        ]
-        return keypoints
+        return self.pose_estimator.get_body_keypoints(landmarks)
 
     def check_movement_after_fall(self, keypoints, person_data):
-        current_position = keypoints["mid_hip"]
-        if person_data["last_position"] is None:
-            person_data["last_position"] = current_position
+        current_position = features_for(keypoints).pts[MID_HIP]
+        if person_data.last_position is None:
+            person_data.last_position = current_position
             return False
-        movement = self.calculate_distance(person_data["last_position"], current_position)
-        person_data["last_position"] = current_position
+        movement = self.calculate_distance(person_data.last_position, current_position)
+        person_data.last_position = current_position
         return movement > 0.05
 
     def emergency_sequence(self, person_id):
         person_data = self.person_fall_data[person_id]
-        if person_data["emergency_active"]:
+        if person_data.emergency_active:
             return
 
-        person_data["emergency_active"] = True
+        person_data.emergency_active = True
         print(f"Starting emergency sequence for person {person_id}")
         
         def play_sound(sound_file):
@@ -387,7 +435,7 @@ class FallDetector:
                 self.recognizer.adjust_for_ambient_noise(source, duration=1)
                 print(f"Listening for response from person {person_id}...")
                 
-                while time.time() - start_time < response_timeout and person_data["emergency_active"]:
+                while time.time() - start_time < response_timeout and person_data.emergency_active:
                     current_time = time.time()
                     if current_time - last_prompt_time >= prompt_interval:
                         play_sound(self.are_you_ok_audio)
@@ -401,8 +449,8 @@ class FallDetector:
                         
                         if any(word in response for word in positive_responses):
                             print(f"✅ Positive response detected from person {person_id}. Stopping emergency sequence.")
-                            person_data["emergency_active"] = False
-                            person_data["fall_detected"] = False
+                            person_data.emergency_active = False
+                            person_data.fall_detected = False
                             return
                         elif any(word in response for word in negative_responses):
                             print(f"⚠️ Negative response ('{response}') detected from person {person_id}. Escalating to emergency.")
@@ -419,7 +467,7 @@ class FallDetector:
         except Exception as e:
             print(f"Critical error in emergency sequence: {e}")
 
-        if person_data["emergency_active"]:
+        if person_data.emergency_active:
             print(f"⚠️ No response from person {person_id} after {response_timeout} seconds. Escalating to emergency.")
             self.escalate_emergency(person_id)
 
@@ -439,44 +487,25 @@ class FallDetector:
         except Exception as e:
             print(f"Error playing emergency sound: {e}")
 
-        call_thread = threading.Thread(target=make_emergency_call)
-        call_thread.daemon = True
-        call_thread.start()
+        self.alert_dispatcher.enqueue("call", person_id=person_id)
         
-        person_data["emergency_active"] = False
+        person_data.emergency_active = False
 
     def detect_abnormal_posture(self, keypoints, person_data):
-        try:
-            spine_angle = self.calculate_angle(
-                keypoints["mid_shoulder"],
-                keypoints["mid_hip"],
-                [keypoints["mid_hip"][0], keypoints["mid_hip"][1] + 0.1],
-            )
-        except:
-            spine_angle = 180
-
-        try:
-            left_leg_angle = self.calculate_angle(
-                keypoints["left_hip"], keypoints["left_knee"], keypoints["left_ankle"]
-            )
-        except:
-            left_leg_angle = 180
-
-        try:
-            right_leg_angle = self.calculate_angle(
-                keypoints["right_hip"], keypoints["right_knee"], keypoints["right_ankle"]
-            )
-        except:
-            right_leg_angle = 180
+        features = features_for(keypoints)
+        pts = features.pts
+        spine_angle = features.spine_vertical
+        left_leg_angle = features.left_knee_angle
+        right_leg_angle = features.right_knee_angle
 
         is_horizontal = abs(90 - spine_angle) < 30
-        hip_height_ratio = keypoints["mid_hip"][1]
+        hip_height_ratio = pts[MID_HIP][1]
         left_leg_bent = left_leg_angle < 130
         right_leg_bent = right_leg_angle < 130
         legs_bent = left_leg_bent or right_leg_bent
-        shoulder_hip_alignment = abs(keypoints["mid_shoulder"][1] - keypoints["mid_hip"][1]) < 0.2
+        shoulder_hip_alignment = abs(pts[MID_SHOULDER][1] - pts[MID_HIP][1]) < 0.2
         is_on_floor = hip_height_ratio > 0.65
-        is_floor_sitting = self._detect_floor_sitting_improved(keypoints)
+        is_floor_sitting = features.floor_sitting
 
         confidence_factors = [
             is_horizontal * 1.0,
@@ -485,37 +514,29 @@ class FallDetector:
         ]
         confidence = min(1.0, sum(confidence_factors))
 
-        if "posture_confidence" not in person_data:
-            person_data["posture_confidence"] = []
-        person_data["posture_confidence"].append(confidence)
-        if len(person_data["posture_confidence"]) > 10:
-            person_data["posture_confidence"].pop(0)
+        person_data.posture_confidence.append(confidence)
 
         return confidence > 0.5 and not is_floor_sitting
 
     def detect_lying_position(self, keypoints, person_data):
+        features = features_for(keypoints)
+        pts = features.pts
         try:
-            head_y = keypoints["nose"][1]
-            feet_y = max(keypoints["left_ankle"][1], keypoints["right_ankle"][1])
+            head_y = pts[NOSE][1]
+            feet_y = max(pts[LEFT_ANKLE][1], pts[RIGHT_ANKLE][1])
             body_height_ratio = feet_y - head_y
-            leftmost_x = min(keypoints["left_shoulder"][0], keypoints["left_hip"][0])
-            rightmost_x = max(keypoints["right_shoulder"][0], keypoints["right_hip"][0])
+            leftmost_x = min(pts[LEFT_SHOULDER][0], pts[LEFT_HIP][0])
+            rightmost_x = max(pts[RIGHT_SHOULDER][0], pts[RIGHT_HIP][0])
             body_width_ratio = rightmost_x - leftmost_x
             width_height_ratio = body_width_ratio / (body_height_ratio if body_height_ratio > 0.1 else 0.1)
 
-            person_data["height_history"].append(body_height_ratio)
-            if len(person_data["height_history"]) > 20:
-                person_data["height_history"].pop(0)
+            person_data.height_history.append(body_height_ratio)
 
-            spine_angle = self.calculate_angle(
-                keypoints["mid_shoulder"],
-                keypoints["mid_hip"],
-                [keypoints["mid_hip"][0] + 0.1, keypoints["mid_hip"][1]],
-            )
+            spine_angle = features.spine_horizontal
             is_spine_horizontal = abs(90 - spine_angle) < 30
-            avg_height_ratio = sum(person_data["height_history"]) / max(len(person_data["height_history"]), 1)
-            head_hip_height_similar = abs(keypoints["nose"][1] - keypoints["mid_hip"][1]) < 0.2
-            is_floor_sitting = self._detect_floor_sitting_improved(keypoints)
+            avg_height_ratio = person_data.height_history.mean()
+            head_hip_height_similar = abs(pts[NOSE][1] - pts[MID_HIP][1]) < 0.2
+            is_floor_sitting = features.floor_sitting
 
             lying_confidence = 0.0
             if is_spine_horizontal:
@@ -527,42 +548,37 @@ class FallDetector:
             if head_hip_height_similar:
                 lying_confidence += 0.1
 
-            if "lying_confidence" not in person_data:
-                person_data["lying_confidence"] = []
-            person_data["lying_confidence"].append(lying_confidence)
-            if len(person_data["lying_confidence"]) > 10:
-                person_data["lying_confidence"].pop(0)
+            person_data.lying_confidence.append(lying_confidence)
 
             return lying_confidence > 0.5 and not is_floor_sitting
         except Exception:
             return False
 
-    def detect_sudden_movement(self, keypoints, person_data):
+    def detect_sudden_movement(self, keypoints, person_data, now=None):
         velocities = {}
-        current_time = time.time()
-        for point in ["mid_hip", "mid_shoulder", "nose"]:
-            if point in keypoints:
-                if f"{point}_history" not in person_data:
-                    person_data[f"{point}_history"] = []
-                    person_data["time_history"] = []
-                person_data[f"{point}_history"].append((keypoints[point][0], keypoints[point][1]))
-                person_data["time_history"].append(current_time)
-                max_history = 10
-                if len(person_data[f"{point}_history"]) > max_history:
-                    person_data[f"{point}_history"].pop(0)
-                    person_data["time_history"].pop(0)
-                if len(person_data[f"{point}_history"]) >= 3:
-                    start_point = person_data[f"{point}_history"][-3]
-                    end_point = person_data[f"{point}_history"][-1]
-                    time_diff = person_data["time_history"][-1] - person_data["time_history"][-3]
-                    if time_diff < 0.001:
-                        time_diff = 0.001
-                    dx = end_point[0] - start_point[0]
-                    dy = end_point[1] - start_point[1]
-                    vx = dx / time_diff
-                    vy = dy / time_diff
-                    v_total = np.sqrt(vx**2 + vy**2)
-                    velocities[point] = {"vx": vx, "vy": vy, "v_total": v_total, "vertical_dominant": abs(vy) > abs(vx)}
+        current_time = self.clock() if now is None else now
+        pts = features_for(keypoints).pts
+        # One timestamp per frame, shared by all three point histories
+        time_history = person_data.time_history
+        time_history.append(current_time)
+        for point, index, history in (
+            ("mid_hip", MID_HIP, person_data.mid_hip_history),
+            ("mid_shoulder", MID_SHOULDER, person_data.mid_shoulder_history),
+            ("nose", NOSE, person_data.nose_history),
+        ):
+            history.append(pts[index])
+            if len(history) >= 3:
+                start_point = history[-3]
+                end_point = history[-1]
+                time_diff = time_history[-1] - time_history[-3]
+                if time_diff < 0.001:
+                    time_diff = 0.001
+                dx = end_point[0] - start_point[0]
+                dy = end_point[1] - start_point[1]
+                vx = dx / time_diff
+                vy = dy / time_diff
+                v_total = np.sqrt(vx**2 + vy**2)
+                velocities[point] = {"vx": vx, "vy": vy, "v_total": v_total, "vertical_dominant": abs(vy) > abs(vx)}
 
         movement_confidence = 0.0
         if len(velocities) >= 2:
@@ -587,155 +603,102 @@ class FallDetector:
             if vertical_dominant_count >= 2:
                 movement_confidence += 0.2
 
-            if "mid_hip" in velocities and len(person_data["mid_hip_history"]) >= 5:
-                recent_positions = person_data["mid_hip_history"]
+            if "mid_hip" in velocities and len(person_data.mid_hip_history) >= 5:
+                recent_positions = person_data.mid_hip_history.last(5).tolist()
                 early_dx = recent_positions[-3][0] - recent_positions[-5][0]
                 early_dy = recent_positions[-3][1] - recent_positions[-5][1]
-                early_time_diff = person_data["time_history"][-3] - person_data["time_history"][-5]
+                early_time_diff = time_history[-3] - time_history[-5]
                 early_v = np.sqrt(early_dx**2 + early_dy**2) / (early_time_diff if early_time_diff > 0.1 else 0.1)
                 recent_dx = recent_positions[-1][0] - recent_positions[-3][0]
                 recent_dy = recent_positions[-1][1] - recent_positions[-3][1]
-                recent_time_diff = person_data["time_history"][-1] - person_data["time_history"][-3]
+                recent_time_diff = time_history[-1] - time_history[-3]
                 recent_v = np.sqrt(recent_dx**2 + recent_dy**2) / (recent_time_diff if recent_time_diff > 0.1 else 0.1)
                 acceleration = recent_v - early_v
                 if acceleration > self.velocity_threshold:
                     movement_confidence += 0.2
 
-            if "movement_confidence" not in person_data:
-                person_data["movement_confidence"] = []
-            person_data["movement_confidence"].append(movement_confidence)
-            if len(person_data["movement_confidence"]) > 10:
-                person_data["movement_confidence"].pop(0)
+            person_data.movement_confidence.append(movement_confidence)
 
             return movement_confidence > 0.4
         return False
 
-    def check_all_fall_conditions(self, abnormal_posture, lying_position, sudden_movement, person_data):
-        if "detection_results" not in person_data:
-            person_data["detection_results"] = []
+    def check_all_fall_conditions(self, abnormal_posture, lying_position, sudden_movement, person_data, now=None):
         current_detection = {
             "abnormal_posture": abnormal_posture,
             "lying_position": lying_position,
             "sudden_movement": sudden_movement,
-            "timestamp": time.time(),
+            "timestamp": self.clock() if now is None else now,
         }
-        person_data["detection_results"].append(current_detection)
-        if len(person_data["detection_results"]) > 30:
-            person_data["detection_results"].pop(0)
+        detection_results = person_data.detection_results
+        detection_results.append((abnormal_posture, lying_position, sudden_movement))
+
+        # One copy of the newest rows serves both the stability and the fall-sequence checks
+        history = detection_results.last(10).tolist()
 
         unstable = False
-        if len(person_data["detection_results"]) >= 5:
-            recent_results = person_data["detection_results"][-5:]
+        if len(history) >= 5:
+            recent_results = history[-5:]
             posture_transitions = sum(
                 1 for i in range(1, len(recent_results))
-                if recent_results[i]["abnormal_posture"] != recent_results[i - 1]["abnormal_posture"]
+                if recent_results[i][ABNORMAL_POSTURE] != recent_results[i - 1][ABNORMAL_POSTURE]
             )
             lying_transitions = sum(
                 1 for i in range(1, len(recent_results))
-                if recent_results[i]["lying_position"] != recent_results[i - 1]["lying_position"]
+                if recent_results[i][LYING_POSITION] != recent_results[i - 1][LYING_POSITION]
             )
             unstable = (posture_transitions >= 1 or lying_transitions >= 1) and any(
-                r["sudden_movement"] for r in recent_results[-3:]
+                r[SUDDEN_MOVEMENT] for r in recent_results[-3:]
             )
 
         current_detection["unstable"] = unstable
         
         combined_fall_score = 0
         if abnormal_posture:
-            combined_fall_score += 2
+            combined_fall_score += self.abnormal_posture_weight
         if lying_position:
-            combined_fall_score += 3
+            combined_fall_score += self.lying_position_weight
         if sudden_movement:
-            combined_fall_score += 1
+            combined_fall_score += self.sudden_movement_weight
         if unstable:
-            combined_fall_score += 2
+            combined_fall_score += self.unstable_weight
 
         fall_sequence_detected = False
-        if len(person_data["detection_results"]) >= 10:
-            recent_results = person_data["detection_results"][-10:]
-            had_movement = any(r["sudden_movement"] for r in recent_results[:5])
-            had_abnormal = any(r["abnormal_posture"] for r in recent_results[3:])
-            had_lying = any(r["lying_position"] for r in recent_results[5:])
+        if len(history) >= 10:
+            had_movement = any(r[SUDDEN_MOVEMENT] for r in history[:5])
+            had_abnormal = any(r[ABNORMAL_POSTURE] for r in history[3:])
+            had_lying = any(r[LYING_POSITION] for r in history[5:])
             fall_sequence_detected = had_movement and had_abnormal and had_lying
             if fall_sequence_detected:
-                combined_fall_score += 3
+                combined_fall_score += self.fall_sequence_weight
 
         current_detection["combined_score"] = combined_fall_score
-        person_data["current_detection"] = current_detection
+        person_data.current_detection = current_detection
         
         all_conditions_met = abnormal_posture and lying_position and (sudden_movement or unstable)
-        high_confidence = combined_fall_score >= 6
+        high_confidence = combined_fall_score >= self.fall_score_threshold
         
         return all_conditions_met or high_confidence, current_detection
 
     def _detect_floor_sitting_improved(self, keypoints):
-        try:
-            spine_angle = self.calculate_angle(
-                keypoints["mid_shoulder"],
-                keypoints["mid_hip"],
-                [keypoints["mid_hip"][0], keypoints["mid_hip"][1] + 0.1],
-            )
-        except:
-            spine_angle = 180
-
-        try:
-            knee_distance = self.calculate_distance(keypoints["left_knee"], keypoints["right_knee"])
-            hip_distance = self.calculate_distance(keypoints["left_hip"], keypoints["right_hip"])
-            knee_hip_ratio = knee_distance / hip_distance if hip_distance > 0 else 0
-            knees_wide = knee_hip_ratio > 1.2
-            ankles_near = (
-                self.calculate_distance(keypoints["left_ankle"], keypoints["mid_hip"]) < 1.2 *
-                self.calculate_distance(keypoints["left_knee"], keypoints["mid_hip"])
-            ) or (
-                self.calculate_distance(keypoints["right_ankle"], keypoints["mid_hip"]) < 1.2 *
-                self.calculate_distance(keypoints["right_knee"], keypoints["mid_hip"])
-            )
-            cross_legged = knees_wide and ankles_near
-        except:
-            cross_legged = False
-
-        try:
-            hips_low = keypoints["mid_hip"][1] > 0.65
-            upper_body_upright = spine_angle > 150
-            left_knee_angle = self.calculate_angle(keypoints["left_hip"], keypoints["left_knee"], keypoints["left_ankle"])
-            right_knee_angle = self.calculate_angle(keypoints["right_hip"], keypoints["right_knee"], keypoints["right_ankle"])
-            knees_bent = left_knee_angle < 140 and right_knee_angle < 140
-            sitting_on_floor = hips_low and upper_body_upright and knees_bent
-        except:
-            sitting_on_floor = False
-
-        confidence_factors = [cross_legged * 0.8, sitting_on_floor * 0.7]
-        sitting_confidence = min(1.0, sum(confidence_factors))
-        return sitting_confidence > 0.6
+        return features_for(keypoints).floor_sitting
 
     def _draw_skeleton(self, image_out, keypoints, person_data):
         h, w = image_out.shape[:2]
-        connections = [
-            ("left_shoulder", "right_shoulder"), ("left_shoulder", "left_hip"),
-            ("right_shoulder", "right_hip"), ("left_hip", "right_hip"),
-            ("left_hip", "left_knee"), ("left_knee", "left_ankle"),
-            ("right_hip", "right_knee"), ("right_knee", "right_ankle"),
-        ]
-        for start_point, end_point in connections:
-            if start_point in keypoints and end_point in keypoints:
-                cv2.line(
-                    image_out,
-                    (int(keypoints[start_point][0] * w), int(keypoints[start_point][1] * h)),
-                    (int(keypoints[end_point][0] * w), int(keypoints[end_point][1] * h)),
-                    (0, 255, 0), 2,
-                )
+        # Scale every joint to pixels in one step instead of per-point lookups
+        pixels = (keypoints.xy * np.array([w, h], dtype=np.float32)).astype(np.int32).tolist()
+        for start_point, end_point in _SKELETON_CONNECTIONS:
+            cv2.line(image_out, tuple(pixels[start_point]), tuple(pixels[end_point]), (0, 255, 0), 2)
                 
-        for key in ["nose", "mid_shoulder", "mid_hip", "left_knee", "right_knee", "left_ankle", "right_ankle"]:
-            if key in keypoints:
-                cv2.circle(image_out, (int(keypoints[key][0] * w), int(keypoints[key][1] * h)), 5, (0, 0, 255), -1)
+        for index in _SKELETON_JOINTS:
+            cv2.circle(image_out, tuple(pixels[index]), 5, (0, 0, 255), -1)
 
-        if person_data.get("fall_detected", False):
-            text_position = (int(keypoints["mid_shoulder"][0] * w) - 70, int(keypoints["mid_shoulder"][1] * h) - 30)
+        if person_data.fall_detected:
+            text_position = (pixels[MID_SHOULDER][0] - 70, pixels[MID_SHOULDER][1] - 30)
             cv2.putText(image_out, "FALL DETECTED!", text_position, cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 4)
             cv2.putText(image_out, "FALL DETECTED!", text_position, cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
 
     def start_recording(self, frame, video_path=None):
-        if self.is_recording:
+        if self.is_recording or self.headless:
             return
             
         output_dir = r"C:\Users\siddh\Downloads\fall Ai"
@@ -803,7 +766,7 @@ class FallDetector:
             time.sleep(1)
 
     def add_frame_to_recording(self, frame):
-        with self.recording_lock:
+        with self.profiler.stage("add_frame_to_recording"), self.recording_lock:
             if self.is_recording and self.output_video:
                 try:
                     if self.recording_resolution:
@@ -818,9 +781,9 @@ class FallDetector:
     def force_fall_detection(self, person_id=0):
         print(f"🚨 Forcing fall detection for person {person_id}")
         person_data = self._get_person_fall_data(person_id)
-        person_data["fall_detected"] = True
-        person_data["fall_time"] = time.time()
-        person_data["fall_counter"] = 5
+        person_data.fall_detected = True
+        person_data.fall_time = self.clock()
+        person_data.fall_counter = 5
         
         if person_id not in self.falls_detected:
             self.falls_detected[person_id] = []
@@ -829,33 +792,126 @@ class FallDetector:
         if not self.is_recording and self.last_frame is not None:
             self.start_recording(self.last_frame)
         
-        current_time = time.time()
+        current_time = self.clock()
         if current_time - self.last_sms_time >= self.sms_cooldown:
-            success = send_emergency_sms()
-            if success:
-                self.last_sms_time = current_time
-                person_data["sms_sent"] = True
+            self.alert_dispatcher.enqueue("sms", person_id=person_id, frame_number=0)
+            self.last_sms_time = current_time
+            person_data.sms_sent = True
 
-    def _process_frame_internal(self, image, frame_number, video_path=None, show_display=True):
-        self.last_frame = image.copy()
-        
-        h, w = image.shape[:2]
-        max_width = 960
-        if w > max_width:
-            scale = max_width / w
-            new_width = int(w * scale)
-            new_height = int(h * scale)
-            image_small = cv2.resize(image, (new_width, new_height))
-            process_image = image_small
-        else:
-            process_image = image
+    def fall_in_progress(self):
+        return any(data.fall_counter > 0 for data in self.person_fall_data.values())
 
-        rgb_image = cv2.cvtColor(process_image, cv2.COLOR_BGR2RGB)
-        result = self.pose.process(rgb_image)
-        
-        image_out = image.copy()
+    def analyze_people(self, image, detected_people, frame_number, video_path=None, timestamp=None):
+        """timestamp is the frame's capture time in seconds (PTS or frame_number / fps); defaults to the clock"""
+        if timestamp is None:
+            now = self.clock()
+        else:
+            now = timestamp
+            if hasattr(self.clock, "advance_to"):
+                self.clock.advance_to(timestamp)
         frame_fall_detected = False
         person_results = {}
+        profiler = self.profiler
+        with profiler.stage("tracker.update"):
+            # Empty frames still go through the tracker so its predictions coast across the gap and
+            # last_seen ages; only the per-person fall logic is skipped, as there is nothing new to score
+            person_id_to_keypoints = self.person_tracker.update(detected_people, frame_number)
+        if not detected_people:
+            return person_results, frame_fall_detected
+
+        for person_id, keypoints in person_id_to_keypoints.items():
+            person_data = self._get_person_fall_data(person_id)
+            
+            with profiler.stage("detect_floor_sitting"):
+                is_floor_sitting = self._detect_floor_sitting_improved(keypoints)
+            current_context = "floor_sitting" if is_floor_sitting else "standing"
+            person_data.context_history.append(is_floor_sitting)
+
+            with profiler.stage("detect_abnormal_posture"):
+                abnormal_posture = self.detect_abnormal_posture(keypoints, person_data)
+            with profiler.stage("detect_lying_position"):
+                lying_position = self.detect_lying_position(keypoints, person_data)
+            with profiler.stage("detect_sudden_movement"):
+                sudden_movement = self.detect_sudden_movement(keypoints, person_data, now)
+            
+            with profiler.stage("check_all_fall_conditions"):
+                fall_detected, detection_state = self.check_all_fall_conditions(
+                    abnormal_posture, lying_position, sudden_movement, person_data, now
+                )
+
+            if fall_detected:
+                person_data.fall_counter += 1
+                person_data.stable_counter = 0
+            else:
+                person_data.fall_counter = max(0, person_data.fall_counter - 1)
+                person_data.stable_counter += 1
+
+            if person_data.fall_counter >= self.required_fall_frames and not person_data.fall_detected:
+                person_data.fall_detected = True
+                person_data.fall_time = now
+                if person_id not in self.falls_detected:
+                    self.falls_detected[person_id] = []
+                self.falls_detected[person_id].append(frame_number)
+                
+                if not self.is_recording:
+                    self.start_recording(image, video_path)
+                
+                current_time = now
+                if current_time - self.last_sms_time >= self.sms_cooldown:
+                    # Queued, never sent inline: a slow Twilio round-trip must not stall the frame loop
+                    print(f"🚨 FALL DETECTED at frame {frame_number} - Queuing SMS")
+                    self.alert_dispatcher.enqueue("sms", person_id=person_id, frame_number=frame_number)
+                    self.last_sms_time = current_time
+                    person_data.sms_sent = True
+                
+                frame_fall_detected = True
+
+            if person_data.fall_detected:
+                with profiler.stage("check_movement_after_fall"):
+                    has_moved = self.check_movement_after_fall(keypoints, person_data)
+                current_time = now
+                
+                if has_moved:
+                    person_data.movement_after_fall = True
+                    person_data.no_movement_start_time = None
+                    if person_data.emergency_active:
+                        person_data.emergency_active = False
+                        print(f"Person {person_id} moved after fall. Cancelling emergency sequence.")
+                else:
+                    if person_data.no_movement_start_time is None:
+                        person_data.no_movement_start_time = current_time
+                    elif current_time - person_data.no_movement_start_time >= 30 and not self.headless:
+                        if person_id not in self.emergency_threads or not self.emergency_threads[person_id].is_alive():
+                            print(f"No movement detected for 30 seconds for person {person_id}. Starting emergency sequence.")
+                            self.emergency_threads[person_id] = threading.Thread(
+                                target=self.emergency_sequence, args=(person_id,)
+                            )
+                            self.emergency_threads[person_id].daemon = True
+                            self.emergency_threads[person_id].start()
+
+            if person_data.stable_counter >= self.stable_frames_threshold and person_data.fall_detected:
+                if person_data.recover():
+                    print(f"Person {person_id} stabilized. Cancelling emergency sequence.")
+
+            person_results[person_id] = {
+                "keypoints": keypoints,
+                "fall_detected": person_data.fall_detected,
+                "context": current_context,
+                "abnormal_posture": abnormal_posture,
+                "lying_position": lying_position,
+                "sudden_movement": sudden_movement,
+                "unstable": detection_state["unstable"],
+            }
+
+        return person_results, frame_fall_detected
+
+    def render_overlay(self, image, person_results, show_display=True):
+        with self.profiler.stage("render_overlay"):
+            return self._render_overlay(image, person_results, show_display)
+
+    def _render_overlay(self, image, person_results, show_display):
+        image_out = image.copy()
+        h, w = image_out.shape[:2]
 
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         cv2.putText(image_out, timestamp, (10, 30), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
@@ -870,120 +926,26 @@ class FallDetector:
                 cv2.putText(image_out, rec_time, (image_out.shape[1] - 50, 45), 
                            cv2.FONT_HERSHEY_SIMPLEX, 0.4, (0, 0, 255), 1)
 
-        if result.pose_landmarks:
-            landmarks = result.pose_landmarks.landmark
-            first_person_keypoints = self.get_body_keypoints(landmarks)
-            all_detected_people = [first_person_keypoints]
-            person_id_to_keypoints = self.person_tracker.update(all_detected_people)
-
-            for person_id, keypoints in person_id_to_keypoints.items():
-                person_data = self._get_person_fall_data(person_id)
-                
-                is_floor_sitting = self._detect_floor_sitting_improved(keypoints)
-                current_context = "floor_sitting" if is_floor_sitting else "standing"
-
-                if "context_history" not in person_data:
-                    person_data["context_history"] = []
-                person_data["context_history"].append(current_context)
-                if len(person_data["context_history"]) > 30:
-                    person_data["context_history"].pop(0)
-
-                abnormal_posture = self.detect_abnormal_posture(keypoints, person_data)
-                lying_position = self.detect_lying_position(keypoints, person_data)
-                sudden_movement = self.detect_sudden_movement(keypoints, person_data)
-                
-                fall_detected, detection_state = self.check_all_fall_conditions(
-                    abnormal_posture, lying_position, sudden_movement, person_data
-                )
-
-                if fall_detected:
-                    person_data["fall_counter"] = person_data.get("fall_counter", 0) + 1
-                    person_data["stable_counter"] = 0
-                else:
-                    person_data["fall_counter"] = max(0, person_data.get("fall_counter", 0) - 1)
-                    person_data["stable_counter"] = person_data.get("stable_counter", 0) + 1
-
-                required_fall_frames = 5
-                if person_data["fall_counter"] >= required_fall_frames and not person_data.get("fall_detected", False):
-                    person_data["fall_detected"] = True
-                    person_data["fall_time"] = time.time()
-                    if person_id not in self.falls_detected:
-                        self.falls_detected[person_id] = []
-                    self.falls_detected[person_id].append(frame_number)
-                    
-                    if not self.is_recording:
-                        self.start_recording(image_out, video_path)
-                    
-                    current_time = time.time()
-                    if current_time - self.last_sms_time >= self.sms_cooldown:
-                        print(f"🚨 FALL DETECTED at frame {frame_number} - Sending SMS")
-                        success = send_emergency_sms()
-                        if success:
-                            self.last_sms_time = current_time
-                            person_data["sms_sent"] = True
-                    
-                    frame_fall_detected = True
-
-                if person_data.get("fall_detected", False):
-                    has_moved = self.check_movement_after_fall(keypoints, person_data)
-                    current_time = time.time()
-                    
-                    if has_moved:
-                        person_data["movement_after_fall"] = True
-                        person_data["no_movement_start_time"] = None
-                        if person_data.get("emergency_active", False):
-                            person_data["emergency_active"] = False
-                            print(f"Person {person_id} moved after fall. Cancelling emergency sequence.")
-                    else:
-                        if person_data["no_movement_start_time"] is None:
-                            person_data["no_movement_start_time"] = current_time
-                        elif current_time - person_data["no_movement_start_time"] >= 30:
-                            if person_id not in self.emergency_threads or not self.emergency_threads[person_id].is_alive():
-                                print(f"No movement detected for 30 seconds for person {person_id}. Starting emergency sequence.")
-                                self.emergency_threads[person_id] = threading.Thread(
-                                    target=self.emergency_sequence, args=(person_id,)
-                                )
-                                self.emergency_threads[person_id].daemon = True
-                                self.emergency_threads[person_id].start()
-
-                if person_data.get("stable_counter", 0) >= self.stable_frames_threshold and person_data.get("fall_detected", False):
-                    person_data["fall_detected"] = False
-                    person_data["sms_sent"] = False
-                    person_data["fall_time"] = None
-                    person_data["no_movement_start_time"] = None
-                    person_data["movement_after_fall"] = False
-                    if person_data.get("emergency_active", False):
-                        person_data["emergency_active"] = False
-                        print(f"Person {person_id} stabilized. Cancelling emergency sequence.")
-
-                person_results[person_id] = {
-                    "keypoints": keypoints,
-                    "fall_detected": person_data.get("fall_detected", False),
-                    "context": current_context,
-                    "abnormal_posture": abnormal_posture,
-                    "lying_position": lying_position,
-                    "sudden_movement": sudden_movement,
-                    "unstable": detection_state["unstable"],
-                }
-                
+        if person_results:
             if show_display or self.always_show_skeleton:
                 for person_id, result_data in person_results.items():
                     self._draw_skeleton(image_out, result_data["keypoints"], self.person_fall_data[person_id])
                     
                     # display fall conditions
                     
-                    y_offset = int(result_data["keypoints"]["mid_shoulder"][1] * h) + 20
+                    label_x = int(result_data["keypoints"].xy[MID_SHOULDER, 0] * w) - 70
+                    y_offset = int(result_data["keypoints"].xy[MID_SHOULDER, 1] * h) + 20
                     cv2.putText(image_out, f"Abnormal: {result_data['abnormal_posture']}", 
-                                (int(result_data["keypoints"]["mid_shoulder"][0] * w) - 70, y_offset), 
+                                (label_x, y_offset), 
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
                     cv2.putText(image_out, f"Lying: {result_data['lying_position']}", 
-                                (int(result_data["keypoints"]["mid_shoulder"][0] * w) - 70, y_offset + 20), 
+                                (label_x, y_offset + 20), 
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
                     cv2.putText(image_out, f"Sudden: {result_data['sudden_movement']}", 
-                                (int(result_data["keypoints"]["mid_shoulder"][0] * w) - 70, y_offset + 40), 
+                                (label_x, y_offset + 40), 
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
                     cv2.putText(image_out, f"Unstable: {result_data['unstable']}", 
-                                (int(result_data["keypoints"]["mid_shoulder"][0] * w) - 70, y_offset + 60), 
+                                (label_x, y_offset + 60), 
                                 cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 0), 1)
                     
         else:
@@ -991,14 +953,31 @@ class FallDetector:
                 cv2.putText(image_out, "No person detected", (int(image_out.shape[1] / 2) - 100, 50),
                             cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 0, 255), 2)
                 
-        if self.is_recording:
-            self.add_frame_to_recording(image_out)
-            
+        return image_out
+
+    def _process_frame_internal(self, image, frame_number, video_path=None, show_display=True, timestamp=None):
+        with self.profiler.stage("frame"):
+            self.last_frame = image.copy()
+
+            # Keep inferring every frame, on the best model, while any fall is being counted
+            falling = self.fall_in_progress()
+            now = self.clock() if timestamp is None else timestamp
+            with self.profiler.stage("pose_estimate"):
+                detected_people = self.pose_estimator.estimate(image, force=falling, escalate=falling, now=now)
+            with self.profiler.stage("analyze_people"):
+                person_results, frame_fall_detected = self.analyze_people(
+                    image, detected_people, frame_number, video_path, timestamp
+                )
+            image_out = self.render_overlay(image, person_results, show_display)
+
+            if self.is_recording:
+                self.add_frame_to_recording(image_out)
+
         return image_out, frame_fall_detected
 
-    def process_frame(self, frame, frame_number, video_path=None, show_display=True):
+    def process_frame(self, frame, frame_number, video_path=None, show_display=True, timestamp=None):
         try:
-            return self._process_frame_internal(frame, frame_number, video_path, show_display)
+            return self._process_frame_internal(frame, frame_number, video_path, show_display, timestamp)
         except Exception as e:
             print(f"Error processing frame: {e}")
             return frame, False
@@ -1072,7 +1051,7 @@ def main():
                     print(f"Error testing audio: {e}")
             elif key == ord('c'):
                 print("Testing emergency call...")
-                threading.Thread(target=make_emergency_call, daemon=True).start()
+                fall_detector.alert_dispatcher.enqueue("call", person_id=0)
             elif key == ord('r'):
                 print("Resetting fall detection system...")
                 fall_detector.reset()
@@ -1084,6 +1063,7 @@ def main():
         cap.release()
         cv2.destroyAllWindows()
         fall_detector.reset()
+        fall_detector.alert_dispatcher.stop()
         pygame.mixer.quit()
         print("Fall detection system stopped.")
 
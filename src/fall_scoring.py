@@ -0,0 +1,347 @@
+# fall_scoring.py - Stateless, vectorised fall scoring over whole keypoint tracks (offline twin of the online logic)
+import numpy as np
+
+from keypoints import (
+    LEFT_ANKLE, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, MID_HIP, MID_SHOULDER, NOSE, RIGHT_ANKLE, RIGHT_HIP,
+    RIGHT_KNEE, RIGHT_SHOULDER, joint_angle, joint_distance, spine_angles,
+)
+from person_state import HEIGHT_HISTORY
+
+# FallDetector's defaults for every parameter the scoring reads (the names are FallDetector attributes)
+DEFAULT_PARAMS = {
+    "height_ratio_threshold": 0.4,
+    "velocity_threshold": 0.05,
+    "stable_frames_threshold": 10,
+    "required_fall_frames": 5,
+    "abnormal_posture_weight": 2,
+    "lying_position_weight": 3,
+    "sudden_movement_weight": 1,
+    "unstable_weight": 2,
+    "fall_sequence_weight": 3,
+    "fall_score_threshold": 6,
+}
+
+# NumPy's hypot/arccos/power are not the same last-bit implementations as math.hypot, math.acos and float
+# **2 that the online path uses. Those values only ever meet a threshold, so a value this close (relative) to
+# one is recomputed with the scalar code; everything else is already exact IEEE arithmetic.
+_GUARD = 1e-9
+
+
+def params_from_detector(detector):
+    """The scoring parameters a FallDetector is currently running with"""
+    return {name: getattr(detector, name) for name in DEFAULT_PARAMS}
+
+
+def _near(a, b):
+    return np.abs(a - b) <= _GUARD * (np.abs(a) + np.abs(b))
+
+
+def _degrees_acos(cosine):
+    return np.degrees(np.arccos(np.clip(cosine, -1.0, 1.0)))
+
+
+def _joint_angle(joints, a, b, c):
+    ba = joints[a] - joints[b]
+    bc = joints[c] - joints[b]
+    norms = np.hypot(ba[0], ba[1]) * np.hypot(bc[0], bc[1])
+    dot = ba[0] * bc[0] + ba[1] * bc[1]
+    return np.where(norms == 0, np.nan, _degrees_acos(dot / norms)), norms
+
+
+def _distance(joints, a, b):
+    d = joints[a] - joints[b]
+    return np.hypot(d[0], d[1])
+
+
+def _body_features(joints):
+    """BodyFeatures for every frame at once: spine/knee angles and the floor-sitting verdict, (N, T) each"""
+    spine = joints[MID_SHOULDER] - joints[MID_HIP]
+    length = np.hypot(spine[0], spine[1])
+    spine_vertical = np.where(length == 0, np.nan, _degrees_acos(spine[1] / length))
+    spine_horizontal = np.where(length == 0, np.nan, _degrees_acos(spine[0] / length))
+    left_knee, left_norms = _joint_angle(joints, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+    right_knee, right_norms = _joint_angle(joints, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
+    knee_distance = _distance(joints, LEFT_KNEE, RIGHT_KNEE)
+    hip_distance = _distance(joints, LEFT_HIP, RIGHT_HIP)
+    left_reach = _distance(joints, LEFT_ANKLE, MID_HIP), 1.2 * _distance(joints, LEFT_KNEE, MID_HIP)
+    right_reach = _distance(joints, RIGHT_ANKLE, MID_HIP), 1.2 * _distance(joints, RIGHT_KNEE, MID_HIP)
+    knee_hip_ratio = np.divide(knee_distance, hip_distance, out=np.zeros_like(knee_distance), where=hip_distance > 0)
+
+    # Frames where a last-bit difference could flip a comparison, or a zero test could go the other way
+    tiny = np.finfo(np.float64).tiny ** 0.5
+    ambiguous = (length < tiny) | (left_norms < tiny) | (right_norms < tiny) | (hip_distance < tiny)
+    for angle, thresholds in ((spine_vertical, (60, 120, 150)), (spine_horizontal, (60, 120)),
+                              (left_knee, (130, 140)), (right_knee, (130, 140))):
+        for threshold in thresholds:
+            ambiguous |= _near(angle, threshold)
+    ambiguous |= _near(knee_hip_ratio, 1.2) | _near(*left_reach) | _near(*right_reach)
+
+    # Recompute those frames exactly as body_features.BodyFeatures does
+    for index in zip(*np.nonzero(ambiguous)):
+        pts = joints[:, :, index[0], index[1]].tolist()
+        spine_vertical[index], spine_horizontal[index] = spine_angles(pts)
+        left_knee[index] = joint_angle(pts, LEFT_HIP, LEFT_KNEE, LEFT_ANKLE)
+        right_knee[index] = joint_angle(pts, RIGHT_HIP, RIGHT_KNEE, RIGHT_ANKLE)
+        knee = joint_distance(pts, LEFT_KNEE, RIGHT_KNEE)
+        hip = joint_distance(pts, LEFT_HIP, RIGHT_HIP)
+        knee_hip_ratio[index] = knee / hip if hip > 0 else 0
+        left_reach[0][index] = joint_distance(pts, LEFT_ANKLE, MID_HIP)
+        left_reach[1][index] = 1.2 * joint_distance(pts, LEFT_KNEE, MID_HIP)
+        right_reach[0][index] = joint_distance(pts, RIGHT_ANKLE, MID_HIP)
+        right_reach[1][index] = 1.2 * joint_distance(pts, RIGHT_KNEE, MID_HIP)
+
+    cross_legged = (knee_hip_ratio > 1.2) & ((left_reach[0] < left_reach[1]) | (right_reach[0] < right_reach[1]))
+    sitting_on_floor = (joints[MID_HIP, 1] > 0.65) & (spine_vertical > 150) & (left_knee < 140) & (right_knee < 140)
+    floor_sitting_confidence = np.minimum(1.0, cross_legged * 0.8 + sitting_on_floor * 0.7)
+    return spine_vertical, spine_horizontal, left_knee, right_knee, floor_sitting_confidence > 0.6
+
+
+def _running_mean(values, capacity):
+    """RingBuffer(capacity).mean() after each append, reproducing its running sum float for float.
+
+    The buffer adds while filling, then adds (new - evicted) per append and resyncs to data.sum() every time
+    the write position wraps, so each lap restarts from a pairwise sum of the lap's values.
+    """
+    n, frames = values.shape
+    laps = -(-frames // capacity)
+    padded = np.zeros((n, laps * capacity))
+    padded[:, :frames] = values
+    blocks = padded.reshape(n, laps, capacity)
+    means = np.empty((n, laps, capacity))
+    filling = np.cumsum(blocks[:, 0, :-1], axis=-1)
+    means[:, 0, :-1] = filling / np.arange(1, capacity)
+    resync = blocks.sum(axis=-1)
+    means[:, :, -1] = resync / capacity
+    if laps > 1:
+        running = np.empty((n, laps - 1, capacity))
+        running[:, :, 0] = resync[:, :-1]
+        running[:, :, 1:] = blocks[:, 1:, :-1] - blocks[:, :-1, :-1]
+        means[:, 1:, :-1] = np.add.accumulate(running, axis=-1)[:, :, 1:] / capacity
+    return means.reshape(n, -1)[:, :frames]
+
+
+def _speed(dx, dy, scale):
+    return np.sqrt(np.square(dx) + np.square(dy)) / scale
+
+
+def _exact_speed(dx, dy, scale):
+    # The online expression on Python floats, for the elements _speed may round differently
+    return float(np.sqrt(float(dx) ** 2 + float(dy) ** 2) / float(scale))
+
+
+def _window_any(flags, start, stop):
+    """For every frame t: any(flags[t + start : t + stop]), offsets relative to t; False where out of range"""
+    n, frames = flags.shape
+    counts = np.zeros((n, frames + 1), dtype=np.int64)
+    np.cumsum(flags, axis=-1, out=counts[:, 1:])
+    t = np.arange(frames)
+    lo = t + start
+    hi = t + stop
+    valid = (lo >= 0) & (hi <= frames)
+    lo = np.clip(lo, 0, frames)
+    hi = np.clip(hi, 0, frames)
+    return ((counts[:, hi] - counts[:, lo]) > 0) & valid
+
+
+def _sudden_movement(points, timestamps, velocity_threshold):
+    """detect_sudden_movement for every frame: (flags, movement_confidence with NaN where none is recorded)"""
+    hip, shoulder, nose = points
+    n, frames = timestamps.shape
+    sudden = np.zeros((n, frames), dtype=bool)
+    confidence = np.full((n, frames), np.nan)
+    if frames < 3:
+        return sudden, confidence
+    current = slice(2, None)
+    back2 = slice(None, -2)
+    time_diff = timestamps[:, current] - timestamps[:, back2]
+    time_diff = np.where(time_diff < 0.001, 0.001, time_diff)
+
+    velocities = []
+    for p in (hip, shoulder, nose):
+        vx = (p[0, :, current] - p[0, :, back2]) / time_diff
+        vy = (p[1, :, current] - p[1, :, back2]) / time_diff
+        velocities.append([vx, vy, _speed(vx, vy, 1.0)])
+
+    # Two-frame-back and four-frame-back hip speeds, for the acceleration term (frames 4 onward)
+    early_v = recent_v = None
+    if frames >= 5:
+        early_dt = timestamps[:, 2:-2] - timestamps[:, :-4]
+        recent_dt = timestamps[:, 4:] - timestamps[:, 2:-2]
+        early_dt = np.where(early_dt > 0.1, early_dt, 0.1)
+        recent_dt = np.where(recent_dt > 0.1, recent_dt, 0.1)
+        early_d = hip[:, :, 2:-2] - hip[:, :, :-4]
+        recent_d = hip[:, :, 4:] - hip[:, :, 2:-2]
+        early_v = _speed(early_d[0], early_d[1], early_dt)
+        recent_v = _speed(recent_d[0], recent_d[1], recent_dt)
+
+    # Patch the few values that sit on a threshold with the online path's scalar arithmetic
+    half = velocity_threshold * 0.5
+    for vx, vy, v_total in velocities:
+        for index in zip(*np.nonzero(_near(v_total, half))):
+            v_total[index] = _exact_speed(vx[index], vy[index], 1.0)
+    if early_v is not None:
+        margin = _GUARD * (np.abs(recent_v) + np.abs(early_v) + abs(velocity_threshold))
+        for index in zip(*np.nonzero(np.abs(recent_v - early_v - velocity_threshold) <= margin)):
+            early_v[index] = _exact_speed(early_d[0][index], early_d[1][index], early_dt[index])
+            recent_v[index] = _exact_speed(recent_d[0][index], recent_d[1][index], recent_dt[index])
+
+    hip_vy = velocities[0][1]
+    score = np.zeros((n, frames - 2))
+    score += np.where((hip_vy > 0) & (hip_vy > velocity_threshold),
+                      np.minimum(0.5, hip_vy / (velocity_threshold * 5)), 0.0)
+
+    # Direction consistency: every fast-enough point within 45 degrees of the first fast-enough one
+    moving = [v_total > half for _, _, v_total in velocities]
+    directions = [np.arctan2(vy, vx) for vx, vy, _ in velocities]
+    reference = np.where(moving[0], directions[0], np.where(moving[1], directions[1], directions[2]))
+    consistent = moving[0] | moving[1] | moving[2]
+    for is_moving, direction in zip(moving, directions):
+        consistent &= ~(is_moving & (np.abs(direction - reference) > np.pi / 4))
+    score += np.where(consistent, 0.2, 0.0)
+
+    vertical = sum((np.abs(vy) > np.abs(vx)).astype(np.int64) for vx, vy, _ in velocities)
+    score += np.where(vertical >= 2, 0.2, 0.0)
+
+    if early_v is not None:
+        score[:, 2:] += np.where(recent_v - early_v > velocity_threshold, 0.2, 0.0)
+
+    confidence[:, current] = score
+    sudden[:, current] = score > 0.4
+    return sudden, confidence
+
+
+def _fall_state(fall_frame, required_fall_frames, stable_frames_threshold):
+    """The per-person fall counter, stable counter and fall_detected flag, without a per-frame loop.
+
+    fall_counter is a +1/-1 walk floored at zero, i.e. the cumulative sum minus its running minimum; the
+    stable counter is the distance to the last fall frame. A fall is latched on the last frame the counter
+    reached required_fall_frames and cleared on the last frame the stable counter reached its threshold;
+    whichever happened later (the clear wins a tie, as it runs second online) is the current state.
+    """
+    n, frames = fall_frame.shape
+    t = np.arange(frames)
+    walk = np.cumsum(np.where(fall_frame, 1, -1), axis=-1)
+    fall_counter = walk - np.minimum(np.minimum.accumulate(walk, axis=-1), 0)
+    last_fall = np.maximum.accumulate(np.where(fall_frame, t, -1), axis=-1)
+    stable_counter = t - last_fall
+    latch = fall_counter >= required_fall_frames
+    last_latch = np.maximum.accumulate(np.where(latch, t, -1), axis=-1)
+    last_clear = np.maximum.accumulate(np.where(stable_counter >= stable_frames_threshold, t, -1), axis=-1)
+    fall_detected = last_latch > last_clear
+    previous = np.zeros_like(fall_detected)
+    previous[:, 1:] = fall_detected[:, :-1]
+    return fall_counter, stable_counter, fall_detected, latch & ~previous
+
+
+class FallScores:
+    """Per-frame output of score_tracks, every array (tracks, frames).
+
+    The flags, combined_score, counters and fall_detected are what FallDetector.analyze_people computes for
+    one tracked person fed the same keypoints and timestamps from a fresh state. posture/lying/movement
+    confidence are the values the online path appends to its history buffers (movement is NaN for the first
+    two frames, where it records none). fall_event marks the frames where a fall is confirmed.
+    """
+
+    __slots__ = (
+        "floor_sitting", "abnormal_posture", "lying_position", "sudden_movement", "unstable", "combined_score",
+        "fall_frame", "fall_counter", "stable_counter", "fall_detected", "fall_event",
+        "posture_confidence", "lying_confidence", "movement_confidence",
+    )
+
+    def __init__(self, **arrays):
+        for name in self.__slots__:
+            setattr(self, name, arrays[name])
+
+    def events(self):
+        """(track, frame) for every confirmed fall, in frame order within each track; just frames for one track"""
+        if self.fall_event.ndim == 1:
+            return np.flatnonzero(self.fall_event).tolist()
+        return [(int(track), int(frame)) for track, frame in zip(*np.nonzero(self.fall_event))]
+
+    def track(self, index):
+        """A FallScores holding only one track's (frames,) arrays"""
+        return FallScores(**{name: getattr(self, name)[index] for name in self.__slots__})
+
+
+def score_tracks(xy, timestamps, params=None):
+    """Score a batch of person tracks in one pass.
+
+    xy is (tracks, frames, NUM_KEYPOINTS, 2) normalised coordinates, one tracked person per row with no gaps;
+    they are rounded to float32 first, as every Keypoints is. timestamps is (frames,) or (tracks, frames) in
+    seconds. params overrides DEFAULT_PARAMS (see params_from_detector). Returns a FallScores.
+    """
+    params = {**DEFAULT_PARAMS, **(params or {})}
+    xy = np.asarray(xy, dtype=np.float32)
+    if xy.ndim != 4 or xy.shape[-1] != 2:
+        raise ValueError(f"Expected (tracks, frames, joints, 2) keypoints, got shape {xy.shape}")
+    if np.isnan(xy).any():
+        raise ValueError("Tracks must be complete: NaN keypoints (absent frames) cannot be scored")
+    n, frames = xy.shape[:2]
+    # Joint-major (joints, 2, tracks, frames): every coordinate of every joint is one contiguous plane
+    joints = np.ascontiguousarray(xy.transpose(2, 3, 0, 1), dtype=np.float64)
+    timestamps = np.broadcast_to(np.asarray(timestamps, dtype=np.float64), (n, frames))
+
+    # Zero-length limbs give 0/0 here and NaN angles online; the NaN compares False either way
+    with np.errstate(invalid="ignore", divide="ignore"):
+        spine_vertical, spine_horizontal, left_knee, right_knee, floor_sitting = _body_features(joints)
+    hip_y = joints[MID_HIP, 1]
+    nose_y = joints[NOSE, 1]
+
+    # detect_abnormal_posture
+    on_floor = hip_y > 0.65
+    legs_bent = (left_knee < 130) | (right_knee < 130)
+    aligned = np.abs(joints[MID_SHOULDER, 1] - hip_y) < 0.2
+    posture_confidence = np.minimum(
+        1.0, (np.abs(90 - spine_vertical) < 30) * 1.0 + (legs_bent & on_floor) * 0.8 + (aligned & on_floor) * 0.7
+    )
+    abnormal_posture = (posture_confidence > 0.5) & ~floor_sitting
+
+    # detect_lying_position
+    body_height = np.maximum(joints[LEFT_ANKLE, 1], joints[RIGHT_ANKLE, 1]) - nose_y
+    body_width = (np.maximum(joints[RIGHT_SHOULDER, 0], joints[RIGHT_HIP, 0])
+                  - np.minimum(joints[LEFT_SHOULDER, 0], joints[LEFT_HIP, 0]))
+    width_height_ratio = body_width / np.where(body_height > 0.1, body_height, 0.1)
+    average_height = _running_mean(body_height, HEIGHT_HISTORY)
+    lying_confidence = np.zeros((n, frames))
+    lying_confidence += np.where(np.abs(90 - spine_horizontal) < 30, 0.4, 0.0)
+    lying_confidence += np.where(average_height < params["height_ratio_threshold"], 0.3, 0.0)
+    lying_confidence += np.where(width_height_ratio > 1.5, 0.2, 0.0)
+    lying_confidence += np.where(np.abs(nose_y - hip_y) < 0.2, 0.1, 0.0)
+    lying_position = (lying_confidence > 0.5) & ~floor_sitting
+
+    sudden_movement, movement_confidence = _sudden_movement(
+        (joints[MID_HIP], joints[MID_SHOULDER], joints[NOSE]), timestamps, params["velocity_threshold"]
+    )
+
+    # check_all_fall_conditions over its 10-frame history: transitions in the last 5, sudden in the last 3
+    changed = np.zeros((n, frames), dtype=bool)
+    changed[:, 1:] = (abnormal_posture[:, 1:] != abnormal_posture[:, :-1]) | (lying_position[:, 1:] != lying_position[:, :-1])
+    unstable = _window_any(changed, -3, 1) & _window_any(sudden_movement, -2, 1)
+    unstable[:, :4] = False
+    fall_sequence = (_window_any(sudden_movement, -9, -4) & _window_any(abnormal_posture, -6, 1)
+                     & _window_any(lying_position, -4, 1))
+
+    combined_score = 0
+    for flags, weight in ((abnormal_posture, "abnormal_posture_weight"), (lying_position, "lying_position_weight"),
+                          (sudden_movement, "sudden_movement_weight"), (unstable, "unstable_weight"),
+                          (fall_sequence, "fall_sequence_weight")):
+        combined_score = combined_score + np.where(flags, params[weight], 0)
+    fall_frame = ((abnormal_posture & lying_position & (sudden_movement | unstable))
+                  | (combined_score >= params["fall_score_threshold"]))
+
+    fall_counter, stable_counter, fall_detected, fall_event = _fall_state(
+        fall_frame, params["required_fall_frames"], params["stable_frames_threshold"]
+    )
+    return FallScores(
+        floor_sitting=floor_sitting, abnormal_posture=abnormal_posture, lying_position=lying_position,
+        sudden_movement=sudden_movement, unstable=unstable, combined_score=combined_score, fall_frame=fall_frame,
+        fall_counter=fall_counter, stable_counter=stable_counter, fall_detected=fall_detected,
+        fall_event=fall_event, posture_confidence=posture_confidence, lying_confidence=lying_confidence,
+        movement_confidence=movement_confidence,
+    )
+
+
+def score_track(xy, timestamps, params=None):
+    """score_tracks for a single (frames, NUM_KEYPOINTS, 2) track; the FallScores arrays are (frames,)"""
+    xy = np.asarray(xy)
+    return score_tracks(xy[np.newaxis], timestamps, params).track(0)
@@ -0,0 +1,156 @@
+# frame_hub.py - Single-producer broadcast hub for processed camera frames
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+from metrics import Histogram
+
+MULTIPART_HEADER = b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n"
+
+JPEG_ENCODE_SECONDS = Histogram("fall_jpeg_encode_seconds", "Time to JPEG-encode one published frame")
+
+
+class FrameHub:
+    """Latest-frame broadcast: one capture worker publishes, any number of clients subscribe"""
+
+    def __init__(self, fps_smoothing=0.9):
+        self._condition = threading.Condition()
+        self._seq = 0
+        self._payload = None
+        self._closed = False
+        self.subscriber_count = 0
+        self.frames_published = 0
+        self.last_publish_time = None
+        self.fps = 0.0
+        self.fps_smoothing = fps_smoothing
+
+    def publish(self, payload):
+        now = time.time()
+        with self._condition:
+            if self.last_publish_time is not None:
+                interval = now - self.last_publish_time
+                if interval > 0:
+                    self.fps = self.fps_smoothing * self.fps + (1 - self.fps_smoothing) * (1.0 / interval)
+            self.last_publish_time = now
+            self._seq += 1
+            self._payload = payload
+            self.frames_published += 1
+            self._condition.notify_all()
+            return self._seq
+
+    def latest(self):
+        with self._condition:
+            return self._seq, self._payload
+
+    def wait_for_frame(self, after_seq, timeout=1.0):
+        # Slow clients never queue up old frames, they simply skip to the newest one
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > after_seq or self._closed, timeout)
+            if self._seq > after_seq:
+                return self._seq, self._payload
+            return after_seq, None
+
+    def subscribe(self, timeout=1.0):
+        with self._condition:
+            self.subscriber_count += 1
+        last_seq = 0
+        try:
+            while not self._closed:
+                seq, payload = self.wait_for_frame(last_seq, timeout)
+                if payload is None:
+                    continue
+                last_seq = seq
+                yield seq, payload
+        finally:
+            with self._condition:
+                self.subscriber_count -= 1
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "sequence": self._seq,
+                "frames_published": self.frames_published,
+                "subscribers": self.subscriber_count,
+                "detector_fps": round(self.fps, 2),
+            }
+
+
+class EncodedFrame:
+    __slots__ = ("seq", "jpeg", "part")
+
+    def __init__(self, seq, jpeg):
+        self.seq = seq
+        self.jpeg = jpeg
+        # Multipart chunk ready to write to any /video_feed response
+        self.part = MULTIPART_HEADER + jpeg + b"\r\n"
+
+
+class EncodedFrameCache:
+    """JPEG-encodes each published frame at most once, on first demand, keyed by sequence number"""
+
+    def __init__(self, capacity=4, jpeg_quality=95):
+        self.capacity = capacity
+        self.encode_params = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._encode_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.encode_failures = 0
+        self.encode_seconds = 0.0
+
+    def _lookup(self, seq):
+        with self._lock:
+            entry = self._entries.get(seq)
+            if entry is not None:
+                self.hits += 1
+            return entry
+
+    def get(self, seq, frame):
+        entry = self._lookup(seq)
+        if entry is not None:
+            return entry
+
+        # Serialise encoders so concurrent clients asking for the same frame encode it once
+        with self._encode_lock:
+            with self._lock:
+                entry = self._entries.get(seq)
+                if entry is not None:
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+
+            start = time.perf_counter()
+            ret, buffer = cv2.imencode(".jpg", frame, self.encode_params)
+            elapsed = time.perf_counter() - start
+            JPEG_ENCODE_SECONDS.observe(elapsed)
+            if not ret:
+                with self._lock:
+                    self.encode_failures += 1
+                return None
+
+            entry = EncodedFrame(seq, buffer.tobytes())
+            with self._lock:
+                self.encode_seconds += elapsed
+                self._entries[seq] = entry
+                while len(self._entries) > self.capacity:
+                    self._entries.popitem(last=False)
+            return entry
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "encode_failures": self.encode_failures,
+                "avg_encode_ms": round(self.encode_seconds * 1000 / self.misses, 2) if self.misses else 0.0,
+            }
@@ -0,0 +1,199 @@
+# keypoint_cache.py - Pose keypoints extracted once per video, replayed from memory-mapped .npy files
+import argparse
+import hashlib
+import json
+import os
+import time
+
+import numpy as np
+
+from keypoints import KEYPOINT_NAMES, NUM_KEYPOINTS, Keypoints
+
+CACHE_VERSION = 1
+CACHE_SUFFIX = ".keypoints"
+KEYPOINTS_FILE = "keypoints.npy"
+TIMESTAMPS_FILE = "timestamps.npy"
+HEADER_FILE = "header.json"
+
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def default_cache_dir(video_path):
+    return os.path.splitext(video_path)[0] + CACHE_SUFFIX
+
+
+class KeypointSequence:
+    """A cached clip: keypoints (frames, persons, NUM_KEYPOINTS, 3) as x, y, confidence, plus timestamps (frames,).
+
+    Absent persons are NaN rows. Both arrays are opened with mmap_mode="r", so loading costs nothing up front
+    and the Keypoints handed out are views into the mapped file rather than copies.
+    """
+
+    def __init__(self, keypoints, timestamps, header):
+        self.keypoints = keypoints
+        self.timestamps = timestamps
+        self.header = header
+
+    @classmethod
+    def load(cls, cache_dir):
+        with open(os.path.join(cache_dir, HEADER_FILE), encoding="utf-8") as f:
+            header = json.load(f)
+        if header.get("version") != CACHE_VERSION:
+            raise ValueError(f"{cache_dir}: cache version {header.get('version')}, expected {CACHE_VERSION}")
+        # np.asarray drops the np.memmap subclass but keeps the mapped buffer: same zero-copy data, and
+        # indexing skips memmap's per-access Python overhead, which dominates a per-frame replay loop
+        keypoints = np.asarray(np.load(os.path.join(cache_dir, KEYPOINTS_FILE), mmap_mode="r"))
+        timestamps = np.asarray(np.load(os.path.join(cache_dir, TIMESTAMPS_FILE), mmap_mode="r"))
+        return cls(keypoints, timestamps, header)
+
+    def save(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        np.save(os.path.join(cache_dir, KEYPOINTS_FILE), np.ascontiguousarray(self.keypoints, dtype=np.float32))
+        np.save(os.path.join(cache_dir, TIMESTAMPS_FILE), np.ascontiguousarray(self.timestamps, dtype=np.float64))
+        # Header last, so a cache interrupted mid-write never looks complete
+        with open(os.path.join(cache_dir, HEADER_FILE), "w", encoding="utf-8") as f:
+            json.dump(self.header, f, indent=2)
+        return cache_dir
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def people(self, frame, slots=None):
+        if slots is None:
+            slots = np.flatnonzero(~np.isnan(self.keypoints[frame, :, 0, 0])).tolist()
+        frame_keypoints = self.keypoints[frame]
+        return [Keypoints(frame_keypoints[slot, :, :2], frame_keypoints[slot, :, 2]) for slot in slots]
+
+    def frames(self):
+        """(frame_number, timestamp, [Keypoints]) for every frame, in order"""
+        # Which person slots are filled, for all frames in one vectorised pass instead of a check per person
+        present = ~np.isnan(self.keypoints[:, :, 0, 0])
+        slots = [np.flatnonzero(row).tolist() for row in present]
+        for frame, timestamp in enumerate(self.timestamps.tolist()):
+            yield frame, timestamp, self.people(frame, slots[frame])
+
+    def is_current(self, video_path):
+        """False if the video changed since extraction (different content hash)"""
+        return self.header.get("source_sha256") == file_sha256(video_path)
+
+
+def sequence_from_frames(frames_people, timestamps, max_persons=3, header=None):
+    """Pack per-frame lists of Keypoints into a KeypointSequence (for extraction and synthetic footage)"""
+    packed = np.full((len(frames_people), max_persons, NUM_KEYPOINTS, 3), np.nan, dtype=np.float32)
+    for frame, people in enumerate(frames_people):
+        for slot, keypoints in enumerate(people[:max_persons]):
+            packed[frame, slot, :, :2] = keypoints.xy
+            packed[frame, slot, :, 2] = 1.0 if keypoints.confidence is None else keypoints.confidence
+    header = dict(header or {})
+    header.update({
+        "version": CACHE_VERSION,
+        "frames": len(frames_people),
+        "max_persons": max_persons,
+        "joints": list(KEYPOINT_NAMES),
+        "channels": ["x", "y", "confidence"],
+    })
+    return KeypointSequence(packed, np.asarray(timestamps, dtype=np.float64), header)
+
+
+def extract(video_path, cache_dir=None, estimator_options=None, max_persons=3):
+    """Run pose over every frame of a video once and write its keypoint cache; returns the cache directory"""
+    import cv2
+
+    from clock import frame_timestamp
+    from motion_gate import MotionGate
+    from pose_estimator import PoseEstimator
+
+    options = dict(estimator_options or {})
+    estimator = PoseEstimator(motion_gate=MotionGate(enabled=False), **options)
+    capture = cv2.VideoCapture(video_path)
+    if not capture.isOpened():
+        raise IOError(f"Could not open {video_path}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    frames_people, timestamps = [], []
+    width = height = None
+    try:
+        while True:
+            ok, frame = capture.read()
+            if not ok:
+                break
+            height, width = frame.shape[:2]
+            timestamps.append(frame_timestamp(capture, len(timestamps), fps))
+            frames_people.append(estimator.estimate(frame, force=True, now=timestamps[-1]))
+    finally:
+        capture.release()
+        estimator.close()
+
+    header = {
+        "source": os.path.abspath(video_path),
+        "source_sha256": file_sha256(video_path),
+        "fps": fps,
+        "width": width,
+        "height": height,
+        "estimator": options,
+        "created_at": time.time(),
+    }
+    sequence = sequence_from_frames(frames_people, timestamps, max_persons, header)
+    return sequence.save(cache_dir or default_cache_dir(video_path))
+
+
+def load_or_extract(video_path, cache_dir=None, estimator_options=None):
+    """The cached sequence for a video, re-extracting only if it is missing or the video has changed"""
+    cache_dir = cache_dir or default_cache_dir(video_path)
+    if os.path.exists(os.path.join(cache_dir, HEADER_FILE)):
+        sequence = KeypointSequence.load(cache_dir)
+        if sequence.is_current(video_path):
+            return sequence
+    extract(video_path, cache_dir, estimator_options)
+    return KeypointSequence.load(cache_dir)
+
+
+def replay(sequence, detector):
+    """Feed a cached sequence through a (headless) FallDetector's fall logic; returns the fall events"""
+    events = []
+    for frame, timestamp, people in sequence.frames():
+        before = {person_id: len(falls) for person_id, falls in detector.falls_detected.items()}
+        _, fall_detected = detector.analyze_people(None, people, frame, timestamp=timestamp)
+        if fall_detected:
+            for person_id, falls in detector.falls_detected.items():
+                if len(falls) > before.get(person_id, 0):
+                    events.append({"frame": frame, "time_s": round(timestamp, 3), "person_id": person_id})
+    return events
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Extract and inspect keypoint caches")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    extract_parser = subparsers.add_parser("extract", help="Run pose once per video and write <video>.keypoints/")
+    extract_parser.add_argument("videos", nargs="+")
+    extract_parser.add_argument("--force", action="store_true", help="Re-extract even if the cache is current")
+    info_parser = subparsers.add_parser("info", help="Print a cache's header and shape")
+    info_parser.add_argument("caches", nargs="+")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.command == "extract":
+        for video in args.videos:
+            start = time.perf_counter()
+            if args.force:
+                cache_dir = extract(video)
+            else:
+                cache_dir = default_cache_dir(video)
+                load_or_extract(video, cache_dir)
+            print(f"{video} -> {cache_dir} ({time.perf_counter() - start:.1f} s)")
+    else:
+        for cache_dir in args.caches:
+            sequence = KeypointSequence.load(cache_dir)
+            print(f"{cache_dir}: {sequence.keypoints.shape} keypoints, {len(sequence)} timestamps")
+            print(json.dumps(sequence.header, indent=2))
+
+
+if __name__ == "__main__":
+    main()
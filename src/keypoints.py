@@ -0,0 +1,140 @@
+# keypoints.py - Compact array-backed body keypoints shared by the pose, tracking and fall logic code
+import math
+
+import numpy as np
+
+# Row indices into Keypoints.xy
+NOSE = 0
+LEFT_EYE = 1
+RIGHT_EYE = 2
+LEFT_SHOULDER = 3
+RIGHT_SHOULDER = 4
+LEFT_HIP = 5
+RIGHT_HIP = 6
+LEFT_KNEE = 7
+RIGHT_KNEE = 8
+LEFT_ANKLE = 9
+RIGHT_ANKLE = 10
+LEFT_WRIST = 11
+RIGHT_WRIST = 12
+MID_SHOULDER = 13
+MID_HIP = 14
+NUM_KEYPOINTS = 15
+
+KEYPOINT_NAMES = (
+    "nose", "left_eye", "right_eye", "left_shoulder", "right_shoulder",
+    "left_hip", "right_hip", "left_knee", "right_knee", "left_ankle",
+    "right_ankle", "left_wrist", "right_wrist", "mid_shoulder", "mid_hip",
+)
+
+# MediaPipe Pose landmark index for every joint that is read directly (the mid points are derived)
+MEDIAPIPE_INDICES = np.array([0, 2, 5, 11, 12, 23, 24, 25, 26, 27, 28, 15, 16])
+NUM_MEDIAPIPE_LANDMARKS = 33
+_MEDIAPIPE_INDEX_LIST = MEDIAPIPE_INDICES.tolist()
+# Same joints in the 17-keypoint COCO order used by MoveNet, RTMPose and most ONNX pose models
+COCO_INDICES = np.array([0, 1, 2, 5, 6, 11, 12, 13, 14, 15, 16, 9, 10])
+NUM_COCO_KEYPOINTS = 17
+
+
+class Keypoints:
+    """One person's joints as a single (NUM_KEYPOINTS, 2) float32 array of normalised x, y"""
+
+    __slots__ = ("xy", "confidence", "features")
+
+    def __init__(self, xy, confidence=None):
+        self.xy = xy
+        self.confidence = confidence
+        # BodyFeatures cache, filled on first use by body_features.features_for
+        self.features = None
+
+    @classmethod
+    def from_mediapipe(cls, landmarks):
+        # Read only the 13 joints we use and derive the mid points in plain floats; one array allocation
+        rows = [(lm.x, lm.y, lm.visibility) for lm in map(landmarks.__getitem__, _MEDIAPIPE_INDEX_LIST)]
+        ls, rs, lh, rh = rows[LEFT_SHOULDER], rows[RIGHT_SHOULDER], rows[LEFT_HIP], rows[RIGHT_HIP]
+        rows.append(((ls[0] + rs[0]) / 2, (ls[1] + rs[1]) / 2, min(ls[2], rs[2])))
+        rows.append(((lh[0] + rh[0]) / 2, (lh[1] + rh[1]) / 2, min(lh[2], rh[2])))
+        raw = np.array(rows, dtype=np.float32)
+        return cls(np.ascontiguousarray(raw[:, :2]), raw[:, 2].copy())
+
+    @classmethod
+    def from_landmark_array(cls, raw):
+        # raw is (33, 2) or (33, 3) in MediaPipe order; the third column, if present, is visibility
+        xy = np.empty((NUM_KEYPOINTS, 2), dtype=np.float32)
+        xy[:MID_SHOULDER] = raw[MEDIAPIPE_INDICES, :2]
+        xy[MID_SHOULDER] = (xy[LEFT_SHOULDER] + xy[RIGHT_SHOULDER]) / 2
+        xy[MID_HIP] = (xy[LEFT_HIP] + xy[RIGHT_HIP]) / 2
+
+        confidence = None
+        if raw.shape[1] > 2:
+            confidence = np.empty(NUM_KEYPOINTS, dtype=np.float32)
+            confidence[:MID_SHOULDER] = raw[MEDIAPIPE_INDICES, 2]
+            confidence[MID_SHOULDER] = min(confidence[LEFT_SHOULDER], confidence[RIGHT_SHOULDER])
+            confidence[MID_HIP] = min(confidence[LEFT_HIP], confidence[RIGHT_HIP])
+        return cls(xy, confidence)
+
+    @classmethod
+    def from_dict(cls, keypoints):
+        xy = np.array([keypoints[name] for name in KEYPOINT_NAMES], dtype=np.float32)
+        return cls(xy)
+
+    def to_dict(self):
+        return {name: [float(x), float(y)] for name, (x, y) in zip(KEYPOINT_NAMES, self.xy)}
+
+    def to_frame(self, crop_box, frame_width, frame_height):
+        """Keypoints normalised to a crop, re-expressed in the full frame's normalised coordinates"""
+        x0, y0, x1, y1 = crop_box
+        scale = np.array([(x1 - x0) / frame_width, (y1 - y0) / frame_height], dtype=np.float32)
+        offset = np.array([x0 / frame_width, y0 / frame_height], dtype=np.float32)
+        return Keypoints(self.xy * scale + offset, self.confidence)
+
+    def __getitem__(self, index):
+        return self.xy[index]
+
+    def bbox(self):
+        mins = self.xy.min(axis=0)
+        maxs = self.xy.max(axis=0)
+        return [float(mins[0]), float(mins[1]), float(maxs[0]), float(maxs[1])]
+
+    def __repr__(self):
+        return f"Keypoints({self.xy.tolist()})"
+
+
+def coco_to_keypoint_arrays(xy, scores):
+    """Batched COCO-17 (B, 17, 2) coordinates and (B, 17) scores to our (B, NUM_KEYPOINTS, 2) / (B, NUM_KEYPOINTS)"""
+    out_xy = np.empty((xy.shape[0], NUM_KEYPOINTS, 2), dtype=np.float32)
+    out_xy[:, :MID_SHOULDER] = xy[:, COCO_INDICES]
+    out_xy[:, MID_SHOULDER] = (out_xy[:, LEFT_SHOULDER] + out_xy[:, RIGHT_SHOULDER]) / 2
+    out_xy[:, MID_HIP] = (out_xy[:, LEFT_HIP] + out_xy[:, RIGHT_HIP]) / 2
+    out_scores = np.empty((xy.shape[0], NUM_KEYPOINTS), dtype=np.float32)
+    out_scores[:, :MID_SHOULDER] = scores[:, COCO_INDICES]
+    out_scores[:, MID_SHOULDER] = np.minimum(out_scores[:, LEFT_SHOULDER], out_scores[:, RIGHT_SHOULDER])
+    out_scores[:, MID_HIP] = np.minimum(out_scores[:, LEFT_HIP], out_scores[:, RIGHT_HIP])
+    return out_xy, out_scores
+
+
+def joint_angle(pts, a, b, c):
+    """Angle in degrees at joint b; pts is Keypoints.xy.tolist() so this stays in plain float math"""
+    bax, bay = pts[a][0] - pts[b][0], pts[a][1] - pts[b][1]
+    bcx, bcy = pts[c][0] - pts[b][0], pts[c][1] - pts[b][1]
+    norms = math.hypot(bax, bay) * math.hypot(bcx, bcy)
+    if norms == 0:
+        return math.nan
+    return math.degrees(math.acos(max(-1.0, min(1.0, (bax * bcx + bay * bcy) / norms))))
+
+
+def joint_distance(pts, a, b):
+    return math.hypot(pts[a][0] - pts[b][0], pts[a][1] - pts[b][1])
+
+
+def spine_angles(pts):
+    """Angles in degrees between the hip->shoulder line and the downward vertical / rightward horizontal"""
+    dx = pts[MID_SHOULDER][0] - pts[MID_HIP][0]
+    dy = pts[MID_SHOULDER][1] - pts[MID_HIP][1]
+    length = math.hypot(dx, dy)
+    if length == 0:
+        return math.nan, math.nan
+    return (
+        math.degrees(math.acos(max(-1.0, min(1.0, dy / length)))),
+        math.degrees(math.acos(max(-1.0, min(1.0, dx / length)))),
+    )
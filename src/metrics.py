@@ -0,0 +1,169 @@
+# metrics.py - Lock-light Prometheus metrics: per-thread counters/histograms merged only when scraped
+import bisect
+import threading
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; covers a 1 ms JPEG encode up to a multi-second stalled inference
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.25, 0.5, 1.0, 2.5)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if any(existing.name == metric.name for existing in self._metrics):
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics.append(metric)
+        return metric
+
+    def unregister(self, name):
+        with self._lock:
+            self._metrics = [metric for metric in self._metrics if metric.name != name]
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, (bool, int)):
+        return str(int(value))
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value))
+
+
+class _ThreadCells:
+    """One mutable cell per writing thread. A thread only ever touches its own cell, so updates need no lock;
+    the shared list is locked once per thread (first write) and once per scrape.
+    """
+
+    def __init__(self, size):
+        self._size = size
+        self._local = threading.local()
+        self._cells = []
+        self._lock = threading.Lock()
+
+    def cell(self):
+        try:
+            return self._local.cell
+        except AttributeError:
+            cell = self._local.cell = [0] * self._size
+            with self._lock:
+                self._cells.append(cell)
+            return cell
+
+    def merged(self):
+        with self._lock:
+            cells = list(self._cells)
+        # Cells of finished threads stay: counters must never go backwards
+        return [sum(values) for values in zip(*cells)] if cells else [0] * self._size
+
+
+class Counter:
+    type = "counter"
+
+    def __init__(self, name, help, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self._cells = _ThreadCells(1)
+        if registry is not None:
+            registry.register(self)
+
+    def inc(self, amount=1):
+        self._cells.cell()[0] += amount
+
+    def value(self):
+        return self._cells.merged()[0]
+
+    def samples(self):
+        return [f"{self.name} {_format_value(self.value())}"]
+
+
+class Histogram:
+    type = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # Per thread: one slot per bucket plus +Inf, then the running sum and count
+        self._cells = _ThreadCells(len(self.buckets) + 3)
+        if registry is not None:
+            registry.register(self)
+
+    def observe(self, value):
+        cell = self._cells.cell()
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-2] += value
+        cell[-1] += 1
+
+    def samples(self):
+        merged = self._cells.merged()
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), merged):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format_value(float(bound))}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format_value(float(merged[-2]))}")
+        lines.append(f"{self.name}_count {merged[-1]}")
+        return lines
+
+
+class CallbackMetric:
+    """A gauge or counter read from existing state at scrape time, so the hot path does nothing for it.
+
+    callback returns a number, None (no sample), or a list of (labels dict, number) for labelled series.
+    """
+
+    def __init__(self, name, help, callback, type="gauge", registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.type = type
+        self.callback = callback
+        if registry is not None:
+            registry.register(self)
+
+    def samples(self):
+        try:
+            value = self.callback()
+        except Exception:
+            # A half-initialised component must not break the whole scrape
+            return []
+        if value is None:
+            return []
+        if isinstance(value, list):
+            return [f"{self.name}{_format_labels(labels)} {_format_value(v)}" for labels, v in value]
+        return [f"{self.name} {_format_value(value)}"]
+
+
+def gauge(name, help, callback, registry=REGISTRY):
+    return CallbackMetric(name, help, callback, "gauge", registry)
+
+
+def counter_from(name, help, callback, registry=REGISTRY):
+    return CallbackMetric(name, help, callback, "counter", registry)
@@ -0,0 +1,88 @@
+# motion_gate.py - Cheap frame-differencing pre-filter that decides when pose inference is needed
+import time
+
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """Compares a tiny grayscale copy of each frame against the one last sent to pose inference"""
+
+    def __init__(self, enabled=True, width=64, pixel_threshold=18, motion_threshold=0.01, min_inference_fps=2.0):
+        self.enabled = enabled
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.motion_threshold = motion_threshold
+        self.min_inference_fps = min_inference_fps
+
+        self.reference = None
+        self.last_inference_time = None
+        self.last_motion_ratio = 0.0
+
+        self.frames = 0
+        self.inferences = 0
+        self.skipped = 0
+        self.gate_seconds = 0.0
+        self.inference_seconds = 0.0
+
+    def _downscale(self, image):
+        h, w = image.shape[:2]
+        height = max(1, int(h * self.width / w))
+        small = cv2.resize(image, (self.width, height), interpolation=cv2.INTER_AREA)
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(small, (3, 3), 0)
+
+    def should_infer(self, image, force=False, now=None):
+        now = time.time() if now is None else now
+        self.frames += 1
+        if not self.enabled:
+            self.inferences += 1
+            return True
+
+        start = time.perf_counter()
+        small = self._downscale(image)
+        if self.reference is None or self.reference.shape != small.shape:
+            motion_ratio = 1.0
+        else:
+            # Diff against the last inferred frame, not the previous one, so slow drifts still add up
+            diff = cv2.absdiff(small, self.reference)
+            motion_ratio = np.count_nonzero(diff > self.pixel_threshold) / diff.size
+        self.last_motion_ratio = motion_ratio
+
+        overdue = (
+            self.last_inference_time is None
+            or self.min_inference_fps <= 0
+            or now - self.last_inference_time >= 1.0 / self.min_inference_fps
+        )
+        infer = force or overdue or motion_ratio >= self.motion_threshold
+        if infer:
+            self.reference = small
+            self.last_inference_time = now
+            self.inferences += 1
+        else:
+            self.skipped += 1
+        self.gate_seconds += time.perf_counter() - start
+        return infer
+
+    def record_inference_time(self, seconds):
+        self.inference_seconds += seconds
+
+    def reset(self):
+        self.reference = None
+        self.last_inference_time = None
+
+    def stats(self):
+        avg_inference = self.inference_seconds / self.inferences if self.inferences else 0.0
+        return {
+            "enabled": self.enabled,
+            "frames": self.frames,
+            "inferences": self.inferences,
+            "skipped": self.skipped,
+            "skip_ratio": round(self.skipped / self.frames, 3) if self.frames else 0.0,
+            "last_motion_ratio": round(float(self.last_motion_ratio), 4),
+            "avg_inference_ms": round(avg_inference * 1000, 2),
+            "gate_overhead_ms": round(self.gate_seconds * 1000 / self.frames, 3) if self.frames else 0.0,
+            # Skipped inferences at the average observed cost, minus what the gate itself spent
+            "cpu_saved_seconds": round(self.skipped * avg_inference - self.gate_seconds, 2),
+        }
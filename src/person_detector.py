@@ -0,0 +1,44 @@
+# person_detector.py - Person bounding boxes for multi-person pose (one crop per person)
+import cv2
+import numpy as np
+
+from tracking import iou_matrix
+
+
+def non_max_suppression(boxes, scores, iou_threshold=0.5):
+    """Indices of the boxes to keep, best score first, dropping any that overlap a kept box too much"""
+    if not boxes:
+        return []
+    order = np.argsort(-np.asarray(scores, dtype=np.float64), kind="stable").tolist()
+    overlaps = iou_matrix(boxes, boxes)
+    keep = []
+    for index in order:
+        if all(overlaps[index, kept] <= iou_threshold for kept in keep):
+            keep.append(index)
+    return keep
+
+
+class PersonDetector:
+    """OpenCV HOG pedestrian detector run on a downscaled copy of the frame; boxes come back in frame pixels"""
+
+    def __init__(self, width=320, hit_threshold=0.0, nms_iou=0.5, max_persons=3):
+        self.width = width
+        self.hit_threshold = hit_threshold
+        self.nms_iou = nms_iou
+        self.max_persons = max_persons
+        self.hog = cv2.HOGDescriptor()
+        self.hog.setSVMDetector(cv2.HOGDescriptor_getDefaultPeopleDetector())
+
+    def detect(self, image):
+        h, w = image.shape[:2]
+        scale = min(1.0, self.width / w)
+        small = cv2.resize(image, (int(w * scale), int(h * scale))) if scale < 1.0 else image
+        rects, weights = self.hog.detectMultiScale(
+            small, hitThreshold=self.hit_threshold, winStride=(8, 8), padding=(8, 8), scale=1.05
+        )
+        if len(rects) == 0:
+            return []
+        boxes = [[x / scale, y / scale, (x + bw) / scale, (y + bh) / scale] for x, y, bw, bh in rects.tolist()]
+        scores = np.asarray(weights, dtype=np.float64).reshape(-1).tolist()
+        keep = non_max_suppression(boxes, scores, self.nms_iou)
+        return [boxes[i] for i in keep[:self.max_persons]]
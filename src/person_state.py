@@ -0,0 +1,61 @@
+# person_state.py - Per-person fall detection state with every field and history buffer allocated up front
+from ring_buffer import RingBuffer
+
+# Per-person history lengths (frames)
+POSITION_HISTORY = 10
+HEIGHT_HISTORY = 20
+CONFIDENCE_HISTORY = 10
+DETECTION_HISTORY = 30
+# Columns of the detection_results buffer
+ABNORMAL_POSTURE, LYING_POSITION, SUDDEN_MOVEMENT = range(3)
+
+
+class PersonFallState:
+    """Everything the detector tracks for one person id; slots keep it compact and attribute access cheap"""
+
+    __slots__ = (
+        "height_history", "time_history", "mid_hip_history", "mid_shoulder_history", "nose_history",
+        "posture_confidence", "lying_confidence", "movement_confidence", "detection_results",
+        "context_history", "current_detection",
+        "fall_counter", "stable_counter", "recovery_counter", "fall_detected", "fall_time",
+        "last_detected_state", "movement_after_fall", "last_position", "no_movement_start_time",
+        "audio_triggered", "sms_sent", "emergency_active",
+    )
+
+    def __init__(self):
+        self.height_history = RingBuffer(HEIGHT_HISTORY)
+        self.time_history = RingBuffer(POSITION_HISTORY)
+        self.mid_hip_history = RingBuffer(POSITION_HISTORY, width=2)
+        self.mid_shoulder_history = RingBuffer(POSITION_HISTORY, width=2)
+        self.nose_history = RingBuffer(POSITION_HISTORY, width=2)
+        self.posture_confidence = RingBuffer(CONFIDENCE_HISTORY)
+        self.lying_confidence = RingBuffer(CONFIDENCE_HISTORY)
+        self.movement_confidence = RingBuffer(CONFIDENCE_HISTORY)
+        self.detection_results = RingBuffer(DETECTION_HISTORY, width=3, dtype=bool)
+        # True for frames where the person looked floor-sitting rather than standing
+        self.context_history = RingBuffer(DETECTION_HISTORY, dtype=bool)
+        self.current_detection = None
+
+        self.fall_counter = 0
+        self.stable_counter = 0
+        self.recovery_counter = 0
+        self.fall_detected = False
+        self.fall_time = None
+        self.last_detected_state = "unknown"
+        self.movement_after_fall = False
+        self.last_position = None
+        self.no_movement_start_time = None
+        self.audio_triggered = False
+        self.sms_sent = False
+        self.emergency_active = False
+
+    def recover(self):
+        """Clear the fall once the person is stable again; returns True if an emergency was cancelled"""
+        was_emergency = self.emergency_active
+        self.fall_detected = False
+        self.sms_sent = False
+        self.fall_time = None
+        self.no_movement_start_time = None
+        self.movement_after_fall = False
+        self.emergency_active = False
+        return was_emergency
@@ -0,0 +1,381 @@
+# pipeline.py - Staged capture -> pose -> fall logic -> overlay -> recording pipeline
+import multiprocessing
+import queue
+import threading
+import time
+from collections import deque
+
+from metrics import Counter, Histogram
+from shm_ring import SharedFrameRing
+
+FRAMES_CAPTURED = Counter("fall_frames_captured_total", "Frames read from the camera into the pipeline")
+POSE_INFERENCE_SECONDS = Histogram("fall_pose_inference_seconds", "Pose worker time per frame, inference included")
+
+
+class DropOldestQueue:
+    """Bounded in-process queue that evicts the oldest item instead of blocking the producer"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._items = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self.dropped = 0
+
+    def put(self, item):
+        with self._condition:
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._condition.notify()
+
+    def get(self, timeout=0.5):
+        with self._condition:
+            if not self._condition.wait_for(lambda: self._items or self._closed, timeout):
+                raise queue.Empty
+            if not self._items:
+                raise queue.Empty
+            return self._items.popleft()
+
+    def qsize(self):
+        with self._condition:
+            return len(self._items)
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+
+class ProcessDropOldestQueue:
+    """Same drop-oldest policy over a multiprocessing.Queue so a slow pose process never backs up capture"""
+
+    def __init__(self, ctx, maxsize):
+        self.mp_queue = ctx.Queue(maxsize)
+        self.dropped = 0
+
+    def put(self, item):
+        while True:
+            try:
+                self.mp_queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.mp_queue.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=0.5):
+        return self.mp_queue.get(timeout=timeout)
+
+    def qsize(self):
+        try:
+            return self.mp_queue.qsize()
+        except NotImplementedError:
+            return -1
+
+    def close(self):
+        self.mp_queue.close()
+        self.mp_queue.cancel_join_thread()
+
+
+class StageStats:
+    def __init__(self, name, smoothing=0.9):
+        self.name = name
+        self.smoothing = smoothing
+        self.processed = 0
+        self.errors = 0
+        self.service_time_ms = 0.0
+        self.last_service_time_ms = 0.0
+
+    def record(self, seconds):
+        elapsed_ms = seconds * 1000
+        self.last_service_time_ms = elapsed_ms
+        if self.processed == 0:
+            self.service_time_ms = elapsed_ms
+        else:
+            self.service_time_ms = self.smoothing * self.service_time_ms + (1 - self.smoothing) * elapsed_ms
+        self.processed += 1
+
+    def to_dict(self, input_queue=None):
+        stats = {
+            "processed": self.processed,
+            "errors": self.errors,
+            "service_time_ms": round(self.service_time_ms, 2),
+            "last_service_time_ms": round(self.last_service_time_ms, 2),
+        }
+        if input_queue is not None:
+            stats["queue_depth"] = input_queue.qsize()
+            stats["dropped"] = input_queue.dropped
+        return stats
+
+
+def pose_worker_main(input_queue, output_queue, stop_event, fall_in_progress, estimator_options):
+    # Runs in its own process: MediaPipe inference no longer competes with the server threads for the GIL.
+    # Only (seq, ring spec) arrives on the queue; pixels are read in place from the shared-memory ring.
+    from pose_estimator import PoseEstimator
+
+    estimator = PoseEstimator(**estimator_options)
+    ring = None
+    frames = 0
+    reported_switches = 0
+    try:
+        while not stop_event.is_set():
+            try:
+                item = input_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+            seq, ring_spec = item
+            if ring is None or ring.name != ring_spec[0]:
+                if ring is not None:
+                    ring.close()
+                    ring = None
+                try:
+                    ring = SharedFrameRing.attach(*ring_spec)
+                except FileNotFoundError:
+                    # Ring was replaced after a resolution change; newer frames carry the new spec
+                    continue
+
+            frame = ring.read(seq)
+            if frame is None:
+                # The writer lapped us; this frame is gone
+                continue
+            start = time.perf_counter()
+            try:
+                falling = bool(fall_in_progress.value)
+                people = estimator.estimate(frame, force=falling, escalate=falling)
+                error = None
+            except Exception as e:
+                people, error = [], str(e)
+            elapsed = time.perf_counter() - start
+            if not ring.is_current(seq):
+                # Slot was overwritten mid-inference, so the result may come from a torn frame
+                continue
+            ring.mark_read(seq)
+            frames += 1
+            switches = estimator.complexity.switches if estimator.complexity is not None else 0
+            # Tier switches are reported straight away; everything else rides along every 30 frames
+            worker_stats = estimator.stats() if frames % 30 == 0 or switches != reported_switches else None
+            reported_switches = switches
+            try:
+                output_queue.put((seq, people, elapsed, error, worker_stats), timeout=0.5)
+            except queue.Full:
+                pass
+    finally:
+        estimator.close()
+        if ring is not None:
+            ring.close()
+
+
+class FramePipeline:
+    """Runs each stage on its own worker with bounded drop-oldest queues so latency stays bounded under load"""
+
+    def __init__(self, fall_detector, frame_hub, read_frame, frame_interval=None, on_fall=None,
+                 queue_size=2, estimator_options=None, fps_smoothing=0.9):
+        self.fall_detector = fall_detector
+        self.frame_hub = frame_hub
+        self.read_frame = read_frame
+        self.frame_interval = frame_interval or (lambda: 0.0)
+        self.on_fall = on_fall
+        self.estimator_options = estimator_options or {}
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._stop_event = self._ctx.Event()
+        self._fall_in_progress = self._ctx.Value("b", 0)
+        self.pose_queue = ProcessDropOldestQueue(self._ctx, queue_size)
+        self.result_queue = ProcessDropOldestQueue(self._ctx, queue_size * 4)
+        self.render_queue = DropOldestQueue(queue_size)
+        self.record_queue = DropOldestQueue(queue_size * 15)
+
+        # Frames stay in this process while only the pose worker sees a copy; matched back by sequence number
+        self._pending_frames = {}
+        self._pending_lock = threading.Lock()
+        self.max_pending = queue_size * 8
+        # Capture writes pixels here; the pose process reads them in place, so frames are never pickled
+        self.ring = None
+        self.ring_slots = queue_size + 4
+
+        self.stats = {name: StageStats(name) for name in ("capture", "pose", "fall_logic", "render", "record")}
+        self.pose_worker_stats = None
+        self._threads = []
+        self._pose_process = None
+        self._running = False
+        self.frames_captured = 0
+        self.capture_fps = 0.0
+        self.fps_smoothing = fps_smoothing
+        self._last_capture_time = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._stop_event.clear()
+        self._pose_process = self._ctx.Process(
+            target=pose_worker_main,
+            args=(self.pose_queue.mp_queue, self.result_queue.mp_queue, self._stop_event,
+                  self._fall_in_progress, self.estimator_options),
+            daemon=True,
+        )
+        self._pose_process.start()
+        for name, target in (
+            ("capture", self._capture_loop),
+            ("fall_logic", self._fall_logic_loop),
+            ("render", self._render_loop),
+            ("record", self._record_loop),
+        ):
+            thread = threading.Thread(target=target, name=f"pipeline-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        print("✅ Frame pipeline started")
+
+    def stop(self, timeout=2.0):
+        self._running = False
+        self._stop_event.set()
+        self.render_queue.close()
+        self.record_queue.close()
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+        if self._pose_process is not None:
+            self._pose_process.join(timeout=timeout)
+            if self._pose_process.is_alive():
+                self._pose_process.terminate()
+            self._pose_process = None
+        self.pose_queue.close()
+        self.result_queue.close()
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
+        print("Frame pipeline stopped")
+
+    def _capture_loop(self):
+        last_frame_time = 0.0
+        while self._running:
+            interval = self.frame_interval()
+            now = time.time()
+            if interval and now - last_frame_time < interval:
+                time.sleep(0.01)
+                continue
+            last_frame_time = now
+
+            start = time.perf_counter()
+            frame = self.read_frame()
+            if frame is None:
+                continue
+            if self.ring is None or self.ring.shape != frame.shape:
+                # First frame or the camera came back at a different resolution
+                old_ring = self.ring
+                self.ring = SharedFrameRing(self.ring_slots, frame.shape, frame.dtype)
+                if old_ring is not None:
+                    old_ring.close()
+            captured_at = time.time()
+            seq = self.ring.write(frame)
+            self.frames_captured += 1
+            FRAMES_CAPTURED.inc()
+            if self._last_capture_time is not None and captured_at > self._last_capture_time:
+                rate = 1.0 / (captured_at - self._last_capture_time)
+                self.capture_fps = self.fps_smoothing * self.capture_fps + (1 - self.fps_smoothing) * rate
+            self._last_capture_time = captured_at
+            with self._pending_lock:
+                self._pending_frames[seq] = (frame, captured_at)
+                stale = [s for s in self._pending_frames if s <= seq - self.max_pending]
+                for s in stale:
+                    del self._pending_frames[s]
+            self.pose_queue.put((seq, self.ring.spec()))
+            self.stats["capture"].record(time.perf_counter() - start)
+
+    def _fall_logic_loop(self):
+        detector = self.fall_detector
+        while self._running:
+            try:
+                seq, people, pose_seconds, error, worker_stats = self.result_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            self.stats["pose"].record(pose_seconds)
+            POSE_INFERENCE_SECONDS.observe(pose_seconds)
+            if error:
+                self.stats["pose"].errors += 1
+                print(f"Error in pose worker: {error}")
+            if worker_stats is not None:
+                self.pose_worker_stats = worker_stats
+
+            with self._pending_lock:
+                pending = self._pending_frames.pop(seq, None)
+                # Anything older than this result was dropped upstream and will never come back
+                for s in [s for s in self._pending_frames if s < seq]:
+                    del self._pending_frames[s]
+            if pending is None:
+                continue
+            frame, captured_at = pending
+
+            start = time.perf_counter()
+            try:
+                detector.last_frame = frame
+                # Timed at capture, not when this thread got to it, so queueing delay never skews velocities
+                person_results, fall_detected = detector.analyze_people(frame, people, seq, timestamp=captured_at)
+            except Exception as e:
+                self.stats["fall_logic"].errors += 1
+                print(f"Error processing frame for fall detection: {e}")
+                person_results, fall_detected = {}, False
+            self._fall_in_progress.value = 1 if detector.fall_in_progress() else 0
+            self.stats["fall_logic"].record(time.perf_counter() - start)
+
+            if fall_detected and self.on_fall is not None:
+                self.on_fall(seq)
+            self.render_queue.put((seq, frame, person_results))
+
+    def _render_loop(self):
+        detector = self.fall_detector
+        while self._running:
+            try:
+                seq, frame, person_results = self.render_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            try:
+                image_out = detector.render_overlay(frame, person_results, show_display=True)
+            except Exception as e:
+                self.stats["render"].errors += 1
+                print(f"Error rendering overlay: {e}")
+                image_out = frame
+            self.frame_hub.publish(image_out)
+            if detector.is_recording:
+                self.record_queue.put(image_out)
+            self.stats["render"].record(time.perf_counter() - start)
+
+    def _record_loop(self):
+        detector = self.fall_detector
+        while self._running:
+            try:
+                image_out = self.record_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            start = time.perf_counter()
+            detector.add_frame_to_recording(image_out)
+            self.stats["record"].record(time.perf_counter() - start)
+
+    def stage_stats(self):
+        input_queues = {
+            "capture": None,
+            "pose": self.pose_queue,
+            "fall_logic": self.result_queue,
+            "render": self.render_queue,
+            "record": self.record_queue,
+        }
+        stages = {name: stat.to_dict(input_queues[name]) for name, stat in self.stats.items()}
+        # The stage with the longest service time is what caps end-to-end FPS
+        bottleneck = max(stages, key=lambda name: stages[name]["service_time_ms"])
+        return {
+            "stages": stages,
+            "bottleneck": bottleneck,
+            "max_fps": round(1000 / stages[bottleneck]["service_time_ms"], 1) if stages[bottleneck]["service_time_ms"] else None,
+            "pose_process_alive": self._pose_process is not None and self._pose_process.is_alive(),
+            "ring_lag": self.ring.lag() if self.ring is not None else 0,
+        }
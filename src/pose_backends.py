@@ -0,0 +1,205 @@
+# pose_backends.py - Interchangeable pose models behind one batched "RGB images in, keypoint arrays out" interface
+import cv2
+import numpy as np
+
+from keypoints import NUM_COCO_KEYPOINTS, NUM_KEYPOINTS, Keypoints, coco_to_keypoint_arrays
+
+try:
+    import onnxruntime as ort
+except ImportError:
+    # Only needed for the onnx backend; MediaPipe stays the default
+    ort = None
+
+
+class PoseBackend:
+    """Single-person pose model. infer() takes a list of RGB images and returns three arrays:
+    xy (B, NUM_KEYPOINTS, 2) normalised to each image, confidence (B, NUM_KEYPOINTS) and found (B,) bool.
+    """
+
+    name = None
+
+    def infer(self, images):
+        raise NotImplementedError
+
+    def reset(self):
+        """Forget any tracking state carried between calls"""
+
+    def close(self):
+        pass
+
+
+def _empty_batch(batch):
+    return (
+        np.zeros((batch, NUM_KEYPOINTS, 2), dtype=np.float32),
+        np.zeros((batch, NUM_KEYPOINTS), dtype=np.float32),
+        np.zeros(batch, dtype=bool),
+    )
+
+
+class MediaPipeBackend(PoseBackend):
+    """mp.solutions.pose; it has no batch entry point, so a batch is processed one image at a time"""
+
+    name = "mediapipe"
+
+    def __init__(self, static_image_mode=False, model_complexity=1, min_detection_confidence=0.6,
+                 min_tracking_confidence=0.6, smooth_landmarks=True):
+        import mediapipe as mp
+
+        self.pose = mp.solutions.pose.Pose(
+            static_image_mode=static_image_mode,
+            model_complexity=model_complexity,
+            min_detection_confidence=min_detection_confidence,
+            min_tracking_confidence=min_tracking_confidence,
+            smooth_landmarks=smooth_landmarks,
+        )
+
+    def infer(self, images):
+        xy, confidence, found = _empty_batch(len(images))
+        for i, image in enumerate(images):
+            result = self.pose.process(image)
+            if result.pose_landmarks:
+                keypoints = Keypoints.from_mediapipe(result.pose_landmarks.landmark)
+                xy[i] = keypoints.xy
+                confidence[i] = keypoints.confidence
+                found[i] = True
+        return xy, confidence, found
+
+    def reset(self):
+        self.pose.reset()
+
+    def close(self):
+        self.pose.close()
+
+
+class OnnxPoseBackend(PoseBackend):
+    """Single-person COCO-17 model run with ONNX Runtime on the CPU (MoveNet-style output by default).
+
+    The model output must reshape to (B, 17, 3) as (y, x, score) normalised to the model input
+    (coordinate_order="yx", MoveNet) or (x, y, score) (coordinate_order="xy"). Inputs are letterboxed
+    to the model's square input, so coordinates are mapped back to each original image. Models with a
+    dynamic batch axis get one session run per chunk of up to max_batch images; fixed-batch models are
+    run in chunks of their own batch size. Int8 models from quantize_model() load the same way.
+    """
+
+    name = "onnx"
+
+    _DTYPES = {"tensor(float)": np.float32, "tensor(int32)": np.int32, "tensor(uint8)": np.uint8}
+
+    def __init__(self, model_path, coordinate_order="yx", min_score=0.25, max_batch=8, intra_op_threads=None,
+                 input_size=None):
+        if ort is None:
+            raise ImportError("The onnx pose backend needs onnxruntime (pip install onnxruntime)")
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        self.coordinate_order = coordinate_order
+        self.min_score = min_score
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.input_dtype = self._DTYPES.get(model_input.type, np.float32)
+        shape = list(model_input.shape)
+        # NHWC (MoveNet) or NCHW (most PyTorch exports), told apart by where the 3 channels sit
+        self.channels_first = shape[1] == 3
+        height, width = (shape[2], shape[3]) if self.channels_first else (shape[1], shape[2])
+        if input_size is not None:
+            height = width = input_size
+        if not isinstance(height, int) or not isinstance(width, int):
+            raise ValueError("Model input has dynamic height/width; pass input_size")
+        self.input_size = (width, height)
+        self.fixed_batch = isinstance(shape[0], int) and shape[0] > 0
+        self.batch_size = shape[0] if self.fixed_batch else max_batch
+
+    def _letterbox(self, image):
+        h, w = image.shape[:2]
+        in_w, in_h = self.input_size
+        scale = min(in_w / w, in_h / h)
+        new_w, new_h = max(1, round(w * scale)), max(1, round(h * scale))
+        canvas = np.zeros((in_h, in_w, 3), dtype=np.uint8)
+        pad_x, pad_y = (in_w - new_w) // 2, (in_h - new_h) // 2
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(image, (new_w, new_h))
+        # Maps model-normalised coordinates back to image-normalised ones: image = model * gain - shift
+        gain = np.array([in_w / new_w, in_h / new_h], dtype=np.float32)
+        shift = np.array([pad_x / new_w, pad_y / new_h], dtype=np.float32)
+        return canvas, gain, shift
+
+    def _run(self, canvases):
+        batch = np.stack(canvases)
+        if self.channels_first:
+            batch = batch.transpose(0, 3, 1, 2)
+        batch = np.ascontiguousarray(batch, dtype=self.input_dtype)
+        output = self.session.run(None, {self.input_name: batch})[0]
+        return np.asarray(output, dtype=np.float32).reshape(len(canvases), NUM_COCO_KEYPOINTS, 3)
+
+    def infer(self, images):
+        if not images:
+            return _empty_batch(0)
+        letterboxed = [self._letterbox(image) for image in images]
+        raw = []
+        for start in range(0, len(letterboxed), self.batch_size):
+            chunk = [canvas for canvas, _, _ in letterboxed[start:start + self.batch_size]]
+            # Fixed-batch models need a full batch; the padding rows are discarded
+            padding = self.batch_size - len(chunk) if self.fixed_batch else 0
+            raw.append(self._run(chunk + [chunk[-1]] * padding)[:len(chunk)])
+        raw = np.concatenate(raw)
+
+        coords = raw[:, :, :2] if self.coordinate_order == "xy" else raw[:, :, 1::-1]
+        gains = np.stack([gain for _, gain, _ in letterboxed])[:, None, :]
+        shifts = np.stack([shift for _, _, shift in letterboxed])[:, None, :]
+        xy, confidence = coco_to_keypoint_arrays(coords * gains - shifts, raw[:, :, 2])
+        found = confidence.mean(axis=1) >= self.min_score
+        return xy, confidence, found
+
+
+def quantize_model(model_path, output_path, calibration_images=None):
+    """Write an int8 copy of an ONNX pose model.
+
+    With calibration_images (RGB frames like the ones it will see) the model is statically quantized to QDQ
+    form, which is what makes convolutions fast on CPU. Without them only the weights are quantized
+    (dynamic quantization); that shrinks the file but ONNX Runtime's ConvInteger kernels are usually slower
+    than float convolutions, so it mainly suits MatMul-heavy models.
+    """
+    from onnxruntime import quantization
+
+    if calibration_images is None:
+        quantization.quantize_dynamic(model_path, output_path, weight_type=quantization.QuantType.QInt8)
+        return output_path
+
+    backend = OnnxPoseBackend(model_path)
+
+    class _Calibration(quantization.CalibrationDataReader):
+        def __init__(self):
+            self.batches = iter(calibration_images)
+
+        def get_next(self):
+            image = next(self.batches, None)
+            if image is None:
+                return None
+            canvas = backend._letterbox(image)[0][None]
+            if backend.channels_first:
+                canvas = canvas.transpose(0, 3, 1, 2)
+            return {backend.input_name: np.ascontiguousarray(canvas, dtype=backend.input_dtype)}
+
+    quantization.quantize_static(
+        model_path, output_path, _Calibration(),
+        quant_format=quantization.QuantFormat.QDQ,
+        activation_type=quantization.QuantType.QUInt8,
+        weight_type=quantization.QuantType.QInt8,
+    )
+    return output_path
+
+
+BACKENDS = {
+    MediaPipeBackend.name: MediaPipeBackend,
+    OnnxPoseBackend.name: OnnxPoseBackend,
+}
+
+
+def create_backend(name, **options):
+    try:
+        backend_class = BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown pose backend {name!r}; expected one of {sorted(BACKENDS)}") from None
+    return backend_class(**options)
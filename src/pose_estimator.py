@@ -0,0 +1,419 @@
+# pose_estimator.py - MediaPipe pose inference stage, usable in-process or from a pose worker process
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import mediapipe as mp
+import numpy as np
+
+from complexity_controller import ComplexityController
+from keypoints import Keypoints
+from motion_gate import MotionGate
+from person_detector import PersonDetector, non_max_suppression
+from pose_backends import create_backend
+from profiler import StageProfiler
+from tracking import BoxKalmanFilter
+
+# Input resolution of the MediaPipe pose landmark model; ROI crops are resized to this before inference
+ROI_INPUT_SIZE = 256
+
+
+class PoseEstimator:
+    """Frame in, list of per-person Keypoints out - owns resizing, the motion gate and the model(s).
+
+    With multi_person=True a person detector proposes boxes and each padded crop gets its own single-person
+    pose pass. The crops of one frame are submitted together to a small pool of workers, each with its own
+    Pose graph, so the fixed per-frame cost (resize, colour conversion, detection) is paid once per frame.
+
+    With roi_tracking=True (single-person mode only) a confident person is followed with a Kalman-predicted
+    crop at the model's input size instead of the whole frame; a full-frame pass re-detects every
+    redetect_interval inferences and whenever the crop loses the person or its confidence drops.
+
+    With adaptive_complexity=True a ComplexityController picks model_complexity per inference to hold
+    target_fps; one graph per tier is kept warm so a switch costs nothing but the graph's tracking reset.
+
+    backend="mediapipe" (the default) runs the MediaPipe graphs above. Any other name from
+    pose_backends.BACKENDS, built with backend_options, replaces them for full-frame, ROI and per-person
+    crop inference; the crops of a frame then go to the backend as one batch. Adaptive complexity is
+    MediaPipe-only.
+
+    profile=True times resize, the motion gate, colour conversion and inference into self.profiler
+    (a profiler.StageProfiler). A FallDetector records its own stages into the same profiler.
+    """
+
+    def __init__(self, max_width=960, min_detection_confidence=0.6, min_tracking_confidence=0.6,
+                 model_complexity=1, smooth_landmarks=True, motion_gate=None, multi_person=False,
+                 max_persons=3, pose_workers=2, person_detector=None, detect_interval=5, crop_padding=0.25,
+                 roi_tracking=False, redetect_interval=30, roi_min_confidence=0.5, adaptive_complexity=False,
+                 target_fps=10.0, backend="mediapipe", backend_options=None, profile=False):
+        self.mp_pose = mp.solutions.pose
+        self.max_width = max_width
+        self.pose_options = {
+            "min_detection_confidence": min_detection_confidence,
+            "min_tracking_confidence": min_tracking_confidence,
+            "model_complexity": model_complexity,
+            "smooth_landmarks": smooth_landmarks,
+        }
+        # Graphs are built on first use so a detector fed by a pose worker never loads a model it won't run.
+        # Keyed by (kind, model_complexity) so each tier the controller may pick has its own warm graph
+        self._poses = {}
+        self.backend_name = backend
+        self.backend_options = backend_options or {}
+        self.backend = None
+        adaptive_complexity = adaptive_complexity and backend == "mediapipe"
+        self.complexity = ComplexityController(target_fps, initial_tier=model_complexity) if adaptive_complexity else None
+        self._active_complexity = model_complexity
+        self.motion_gate = motion_gate if motion_gate is not None else MotionGate()
+        self.last_people = []
+        self.profiler = StageProfiler(enabled=profile)
+
+        self.multi_person = multi_person
+        self.max_persons = max_persons
+        self.pose_workers = pose_workers
+        self.person_detector = person_detector
+        # The detector runs on every Nth inference; in between, crops follow the people already found
+        self.detect_interval = detect_interval
+        self.crop_padding = crop_padding
+        self.inferences = 0
+        self.last_crop_count = 0
+        self._crop_pool = None
+        self._crop_local = threading.local()
+        self._crop_poses = []
+        self._crop_lock = threading.Lock()
+
+        self.roi_tracking = roi_tracking and not multi_person
+        self.redetect_interval = redetect_interval
+        self.roi_min_confidence = roi_min_confidence
+        self.roi_counts = {"roi": 0, "full_frame": 0}
+        self._roi_filter = None
+        self._roi_age = 0
+
+    def _model_complexity(self):
+        return self.complexity.tier if self.complexity is not None else self.pose_options["model_complexity"]
+
+    def _graph(self, kind):
+        complexity = self._model_complexity()
+        pose = self._poses.get((kind, complexity))
+        if pose is None:
+            options = dict(self.pose_options, model_complexity=complexity)
+            if kind == "roi":
+                # Landmark smoothing would blend coordinates from crops at different offsets, so it stays off
+                options["smooth_landmarks"] = False
+            pose = self.mp_pose.Pose(**options)
+            self._poses[(kind, complexity)] = pose
+        return pose
+
+    def _ensure_pose(self):
+        return self._graph("full_frame")
+
+    def _ensure_roi_pose(self):
+        return self._graph("roi")
+
+    def _warm_tiers(self):
+        # Load every tier's model and run its graph once up front, so the first switch doesn't stall a frame
+        kind = "roi" if self.roi_tracking else "full_frame"
+        blank = np.zeros((64, 64, 3), dtype=np.uint8)
+        current = self.complexity.tier
+        for tier in self.complexity.tiers:
+            self.complexity.tier = tier
+            try:
+                self._graph(kind).process(blank)
+                self._graph(kind).reset()
+            except Exception as e:
+                # MediaPipe downloads the lite and heavy models on first use; offline boxes may not have them
+                print(f"⚠️ Pose model_complexity={tier} unavailable, adaptive complexity will skip it: {e}")
+                self.complexity.tier = current
+                self.complexity.drop_tier(tier)
+                current = self.complexity.tier
+        self.complexity.tier = current
+
+    def _sync_complexity(self):
+        complexity = self._model_complexity()
+        if complexity != self._active_complexity:
+            # A warm graph's tracking state is from the last time its tier ran, not from this frame
+            for (kind, tier), pose in self._poses.items():
+                if tier == complexity:
+                    pose.reset()
+            self._active_complexity = complexity
+
+    def _resize(self, image):
+        h, w = image.shape[:2]
+        if w > self.max_width:
+            scale = self.max_width / w
+            return cv2.resize(image, (int(w * scale), int(h * scale)))
+        return image
+
+    def get_body_keypoints(self, landmarks):
+        return Keypoints.from_mediapipe(landmarks)
+
+    def estimate(self, image, force=False, escalate=False, now=None):
+        """escalate=True (a fall score is rising) pins the highest model tier when adaptive complexity is on.
+        now is the frame time the motion gate's minimum inference rate is measured against (default wall clock).
+        """
+        profiler = self.profiler
+        with profiler.stage("resize"):
+            process_image = self._resize(image)
+        if self.complexity is not None:
+            if not self._poses:
+                self._warm_tiers()
+            self.complexity.escalate(escalate)
+        with profiler.stage("motion_gate"):
+            infer = self.motion_gate.should_infer(process_image, force=force, now=now)
+        if not infer:
+            # Static scene: reuse the last keypoints so the tracker and timers keep running
+            return self.last_people
+
+        if self.complexity is not None:
+            self._sync_complexity()
+        inference_start = time.perf_counter()
+        if self.roi_tracking:
+            self.last_people = self._estimate_roi(image, process_image)
+        else:
+            with profiler.stage("cvtColor"):
+                rgb_image = cv2.cvtColor(process_image, cv2.COLOR_BGR2RGB)
+            if self.multi_person:
+                self.last_people = self._estimate_people(rgb_image)
+            else:
+                self.last_people = self._estimate_full_frame(rgb_image)
+        elapsed = time.perf_counter() - inference_start
+        self.motion_gate.record_inference_time(elapsed)
+        if self.complexity is not None:
+            self.complexity.record(elapsed)
+        return self.last_people
+
+    def _ensure_backend(self):
+        if self.backend is None:
+            self.backend = create_backend(self.backend_name, **self.backend_options)
+        return self.backend
+
+    def _backend_keypoints(self, rgb_images, boxes=None, frame_size=None):
+        """One batched backend call; returns Keypoints (mapped out of each crop box if given) or None per image"""
+        with self.profiler.stage("backend.infer"):
+            xy, confidence, found = self._ensure_backend().infer(rgb_images)
+        people = []
+        for i in range(len(rgb_images)):
+            if not found[i]:
+                people.append(None)
+                continue
+            keypoints = Keypoints(xy[i], confidence[i])
+            people.append(keypoints if boxes is None else keypoints.to_frame(boxes[i], *frame_size))
+        return people
+
+    def _estimate_full_frame(self, rgb_image):
+        if self.backend_name != "mediapipe":
+            return [p for p in self._backend_keypoints([rgb_image]) if p is not None]
+        with self.profiler.stage("pose.process"):
+            result = self._ensure_pose().process(rgb_image)
+        if result.pose_landmarks:
+            return [self.get_body_keypoints(result.pose_landmarks.landmark)]
+        return []
+
+    def _ensure_person_detector(self):
+        if self.person_detector is None:
+            self.person_detector = PersonDetector(max_persons=self.max_persons)
+        return self.person_detector
+
+    def _ensure_crop_pool(self):
+        if self._crop_pool is None:
+            self._crop_pool = ThreadPoolExecutor(max_workers=self.pose_workers, thread_name_prefix="pose-crop")
+        return self._crop_pool
+
+    def _crop_pose(self):
+        # One graph per pool thread and tier; crops come from different people so tracking mode is off
+        complexity = self._model_complexity()
+        poses = getattr(self._crop_local, "poses", None)
+        if poses is None:
+            poses = self._crop_local.poses = {}
+        pose = poses.get(complexity)
+        if pose is None:
+            pose = self.mp_pose.Pose(
+                static_image_mode=True,
+                model_complexity=complexity,
+                min_detection_confidence=self.pose_options["min_detection_confidence"],
+            )
+            poses[complexity] = pose
+            with self._crop_lock:
+                self._crop_poses.append(pose)
+        return pose
+
+    def _crop_boxes(self, rgb_image):
+        h, w = rgb_image.shape[:2]
+        # People already found stay cropped even when the detector misses them: HOG only sees upright
+        # people, and someone who has just fallen is exactly who must not drop out of view
+        boxes = [[x0 * w, y0 * h, x1 * w, y1 * h] for x0, y0, x1, y1 in (p.bbox() for p in self.last_people)]
+        if self.inferences % self.detect_interval == 0 or not boxes:
+            boxes += self._ensure_person_detector().detect(rgb_image)
+        self.inferences += 1
+
+        padded = []
+        for x0, y0, x1, y1 in boxes:
+            pad_x = (x1 - x0) * self.crop_padding
+            pad_y = (y1 - y0) * self.crop_padding
+            padded.append([
+                max(0, int(x0 - pad_x)), max(0, int(y0 - pad_y)),
+                min(w, int(x1 + pad_x)), min(h, int(y1 + pad_y)),
+            ])
+        padded = [box for box in padded if box[2] - box[0] >= 16 and box[3] - box[1] >= 16]
+        # Earlier boxes win overlaps, so tracked people keep their crop over a fresh detection of themselves
+        keep = non_max_suppression(padded, list(range(len(padded), 0, -1)))
+        return [padded[i] for i in keep[:self.max_persons]]
+
+    def _estimate_crop(self, rgb_image, box):
+        x0, y0, x1, y1 = box
+        crop = np.ascontiguousarray(rgb_image[y0:y1, x0:x1])
+        result = self._crop_pose().process(crop)
+        if not result.pose_landmarks:
+            return None
+        h, w = rgb_image.shape[:2]
+        return self.get_body_keypoints(result.pose_landmarks.landmark).to_frame(box, w, h)
+
+    def _estimate_people(self, rgb_image):
+        with self.profiler.stage("person_detect"):
+            boxes = self._crop_boxes(rgb_image)
+        self.last_crop_count = len(boxes)
+        if not boxes:
+            return self._estimate_full_frame(rgb_image)
+
+        if self.backend_name != "mediapipe":
+            h, w = rgb_image.shape[:2]
+            crops = [rgb_image[y0:y1, x0:x1] for x0, y0, x1, y1 in boxes]
+            people = [p for p in self._backend_keypoints(crops, boxes, (w, h)) if p is not None]
+        else:
+            pool = self._ensure_crop_pool()
+            # Crops run on the pool's threads; this is the wall time of the whole batch
+            with self.profiler.stage("pose.process_crops"):
+                people = [p for p in pool.map(lambda box: self._estimate_crop(rgb_image, box), boxes) if p is not None]
+        if not people:
+            # Nobody in any crop: one full-frame pass keeps the single-person behaviour as the floor
+            return self._estimate_full_frame(rgb_image)
+
+        # Overlapping crops can return the same person twice; keep the most confident copy
+        scores = [float(p.confidence.mean()) if p.confidence is not None else 0.0 for p in people]
+        keep = non_max_suppression([p.bbox() for p in people], scores)
+        return [people[i] for i in keep]
+
+    def _roi_box(self, image):
+        """Square pixel box around the predicted person position, clipped to the frame"""
+        h, w = image.shape[:2]
+        x0, y0, x1, y1 = self._roi_filter.predict()
+        side = max(x1 - x0, y1 - y0) * (1 + 2 * self.crop_padding)
+        cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+        box = [max(0, int(cx - side / 2)), max(0, int(cy - side / 2)),
+               min(w, int(cx + side / 2)), min(h, int(cy + side / 2))]
+        if box[2] - box[0] < 16 or box[3] - box[1] < 16:
+            return None
+        return box
+
+    def _confident(self, keypoints):
+        return keypoints.confidence is None or float(keypoints.confidence.mean()) >= self.roi_min_confidence
+
+    def _track_roi(self, people, image):
+        h, w = image.shape[:2]
+        if people and self._confident(people[0]):
+            x0, y0, x1, y1 = people[0].bbox()
+            pixel_box = [x0 * w, y0 * h, x1 * w, y1 * h]
+            if self._roi_filter is None:
+                self._roi_filter = BoxKalmanFilter(pixel_box)
+            else:
+                self._roi_filter.update(pixel_box)
+        else:
+            self._roi_filter = None
+
+    def _estimate_roi(self, image, process_image):
+        if self._roi_filter is not None and self._roi_age < self.redetect_interval:
+            box = self._roi_box(image)
+            if box is not None:
+                x0, y0, x1, y1 = box
+                scale = ROI_INPUT_SIZE / max(x1 - x0, y1 - y0)
+                size = (max(1, round((x1 - x0) * scale)), max(1, round((y1 - y0) * scale)))
+                with self.profiler.stage("roi_crop"):
+                    crop = cv2.cvtColor(cv2.resize(image[y0:y1, x0:x1], size), cv2.COLOR_BGR2RGB)
+                h, w = image.shape[:2]
+                if self.backend_name != "mediapipe":
+                    keypoints = self._backend_keypoints([crop], [box], (w, h))[0]
+                else:
+                    with self.profiler.stage("pose.process_roi"):
+                        result = self._ensure_roi_pose().process(crop)
+                    keypoints = None
+                    if result.pose_landmarks:
+                        keypoints = self.get_body_keypoints(result.pose_landmarks.landmark).to_frame(box, w, h)
+                if keypoints is not None and self._confident(keypoints):
+                    self._roi_age += 1
+                    self.roi_counts["roi"] += 1
+                    self._track_roi([keypoints], image)
+                    return [keypoints]
+
+        # No confident track, re-detection due, or the crop lost the person: look at the whole frame
+        people = self._estimate_full_frame(cv2.cvtColor(process_image, cv2.COLOR_BGR2RGB))
+        self.roi_counts["full_frame"] += 1
+        self._roi_age = 0
+        self._roi_filter = None
+        roi_pose = self._poses.get(("roi", self._model_complexity()))
+        if roi_pose is not None:
+            # The crop graph's own tracking state belongs to the old crop position
+            roi_pose.reset()
+        self._track_roi(people, image)
+        return people
+
+    def reset(self):
+        self.motion_gate.reset()
+        self.last_people = []
+        self.inferences = 0
+        self._roi_filter = None
+        self._roi_age = 0
+
+    def stats(self):
+        return {
+            "motion_gate": self.motion_gate.stats(),
+            "complexity": self.complexity.stats() if self.complexity is not None else None,
+            "profile": self.profiler.summary() if self.profiler.enabled else None,
+        }
+
+    def close(self):
+        for pose in self._poses.values():
+            pose.close()
+        self._poses = {}
+        if self.backend is not None:
+            self.backend.close()
+            self.backend = None
+        if self._crop_pool is not None:
+            self._crop_pool.shutdown(wait=True)
+            self._crop_pool = None
+        with self._crop_lock:
+            for pose in self._crop_poses:
+                pose.close()
+            self._crop_poses = []
+
+
+class NullPoseEstimator:
+    """Stands in for a PoseEstimator in a process whose pose inference runs elsewhere (pipeline's pose worker).
+
+    Builds no model, graph or motion gate and never finds anyone; only the profiler is real, so a FallDetector
+    given one can still time its own stages.
+    """
+
+    mp_pose = None
+    motion_gate = None
+
+    def __init__(self, profile=False):
+        self.profiler = StageProfiler(enabled=profile)
+
+    def get_body_keypoints(self, landmarks):
+        return Keypoints.from_mediapipe(landmarks)
+
+    def estimate(self, image, force=False, escalate=False, now=None):
+        return []
+
+    def reset(self):
+        pass
+
+    def stats(self):
+        return {
+            "motion_gate": None,
+            "complexity": None,
+            "profile": self.profiler.summary() if self.profiler.enabled else None,
+        }
+
+    def close(self):
+        pass
@@ -0,0 +1,131 @@
+# profiler.py - Opt-in per-stage latency profiler for the frame hot path
+import json
+import os
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from ring_buffer import RingBuffer
+
+
+class _NullStage:
+    """What stage() returns while profiling is off: entering and leaving it does nothing"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.profiler.record(self.name, self.start, time.perf_counter_ns())
+        return False
+
+
+class StageProfiler:
+    """Rolling per-stage durations (perf_counter_ns) with percentile summaries and a Chrome trace export.
+
+    Wrap a stage in `with profiler.stage("name"):`. Disabled (the default) that costs one method call
+    returning a shared no-op context manager. Enabled, each stage keeps its last `window` durations in a
+    RingBuffer for p50/p95/p99, and the last `trace_events` spans are kept for chrome://tracing / Perfetto.
+    """
+
+    def __init__(self, enabled=False, window=1000, trace_events=20000):
+        self.enabled = enabled
+        self.window = window
+        self._lock = threading.Lock()
+        self._durations = {}
+        self._counts = {}
+        self._totals = {}
+        self._trace = deque(maxlen=trace_events)
+
+    def stage(self, name):
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name)
+
+    def record(self, name, start_ns, end_ns):
+        duration = end_ns - start_ns
+        with self._lock:
+            buffer = self._durations.get(name)
+            if buffer is None:
+                buffer = self._durations[name] = RingBuffer(self.window)
+                self._counts[name] = 0
+                self._totals[name] = 0
+            buffer.append(duration)
+            self._counts[name] += 1
+            self._totals[name] += duration
+            self._trace.append((name, start_ns, duration, threading.get_ident()))
+
+    def reset(self):
+        with self._lock:
+            self._durations = {}
+            self._counts = {}
+            self._totals = {}
+            self._trace.clear()
+
+    def summary(self):
+        """{stage: count, total and mean over all calls; p50/p95/p99/max over the rolling window} in ms"""
+        with self._lock:
+            windows = {name: buffer.last() for name, buffer in self._durations.items()}
+            counts = dict(self._counts)
+            totals = dict(self._totals)
+        stages = {}
+        # Heaviest stages first
+        for name in sorted(windows, key=lambda n: totals[n], reverse=True):
+            p50, p95, p99 = np.percentile(windows[name], (50, 95, 99)) / 1e6
+            stages[name] = {
+                "count": counts[name],
+                "total_ms": round(totals[name] / 1e6, 3),
+                "mean_ms": round(totals[name] / counts[name] / 1e6, 4),
+                "p50_ms": round(float(p50), 4),
+                "p95_ms": round(float(p95), 4),
+                "p99_ms": round(float(p99), 4),
+                "max_ms": round(float(windows[name].max()) / 1e6, 4),
+            }
+        return stages
+
+    def dump(self, file=None):
+        stages = self.summary()
+        print(f"{'stage':<32} {'count':>8} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}", file=file)
+        for name, s in stages.items():
+            print(f"{name:<32} {s['count']:>8} {s['mean_ms']:>9.3f} {s['p50_ms']:>9.3f} {s['p95_ms']:>9.3f} "
+                  f"{s['p99_ms']:>9.3f}", file=file)
+        return stages
+
+    def chrome_trace(self):
+        """The recorded spans as Chrome trace-event JSON (complete "X" events, microseconds)"""
+        with self._lock:
+            spans = list(self._trace)
+        pid = os.getpid()
+        return {
+            "traceEvents": [
+                {"name": name, "ph": "X", "ts": start / 1000, "dur": duration / 1000, "pid": pid, "tid": tid}
+                for name, start, duration, tid in spans
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def export_chrome_trace(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
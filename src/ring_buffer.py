@@ -0,0 +1,66 @@
+# ring_buffer.py - Preallocated fixed-size history buffers for the per-person fall state
+import numpy as np
+
+
+class RingBuffer:
+    """Circular buffer over a preallocated numpy array; append is O(1) and so are sum()/mean() on 1-D buffers"""
+
+    __slots__ = ("capacity", "data", "_scalar", "_start", "_size", "_sum")
+
+    def __init__(self, capacity, width=None, dtype=np.float64):
+        self.capacity = capacity
+        shape = (capacity,) if width is None else (capacity, width)
+        self.data = np.zeros(shape, dtype=dtype)
+        self._scalar = width is None
+        self._start = 0
+        self._size = 0
+        self._sum = 0.0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, value):
+        if self._size < self.capacity:
+            index = (self._start + self._size) % self.capacity
+            self._size += 1
+            if self._scalar:
+                self._sum += value
+        else:
+            index = self._start
+            self._start = (self._start + 1) % self.capacity
+            if self._scalar:
+                self._sum += value - self.data.item(index)
+        self.data[index] = value
+        if self._scalar and self._start == 0 and self._size == self.capacity:
+            # Resync once per lap so float rounding in the running sum can't build up
+            self._sum = self.data.sum().item()
+
+    def __getitem__(self, i):
+        # Element access by position, oldest first; negative indices count back from the newest
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("RingBuffer index out of range")
+        index = (self._start + i) % self.capacity
+        return self.data.item(index) if self._scalar else self.data[index].tolist()
+
+    def last(self, n=None):
+        """Copy of the newest n items (all by default), oldest first"""
+        n = self._size if n is None else min(n, self._size)
+        first = (self._start + self._size - n) % self.capacity
+        if first + n <= self.capacity:
+            return self.data[first:first + n].copy()
+        return np.concatenate((self.data[first:], self.data[:first + n - self.capacity]))
+
+    def sum(self):
+        if self._scalar:
+            return self._sum
+        return self.last().sum(axis=0)
+
+    def mean(self):
+        return self.sum() / self._size if self._size else 0.0
+
+    def clear(self):
+        self._start = 0
+        self._size = 0
+        self._sum = 0.0
@@ -5,6 +5,10 @@ import cv2
 import threading
 import time
 from fall_detector import FallDetector  # Import our FallDetector class
+from frame_hub import EncodedFrameCache, FrameHub, MULTIPART_HEADER
+from metrics import CONTENT_TYPE, REGISTRY, Counter, counter_from, gauge
+from pipeline import FramePipeline
+from pose_estimator import NullPoseEstimator
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for all routes
@@ -19,159 +23,200 @@ fall_detector = None  # Initialize later
 frame_count = 0
 last_fall_time = 0
 fall_cooldown = 10  # seconds between fall alerts
-
-
-# IMPORTANT: Global stream generator - ensures the camera stream is persistent
-# and doesn't restart when clients reconnect
-def get_global_stream_generator():
-    global camera, fall_detector, frame_count
-
-    # Initialize camera only once at startup
+multi_person_detection = False  # Detect people first and run pose per person instead of one full-frame pass
+roi_pose_tracking = False  # Single-person mode only: run pose on a crop around the tracked person
+adaptive_pose_complexity = False  # Pick MediaPipe model_complexity 0/1/2 per frame to hold pose_target_fps
+pose_target_fps = 10.0
+pose_backend = "mediapipe"  # or "onnx" with pose_backend_options = {"model_path": "models/movenet.onnx"}
+pose_backend_options = {}
+stage_profiling = False  # Time every hot-path stage; read it back from /profile and /profile/trace
+frame_hub = FrameHub()  # Broadcasts processed frames to every /video_feed client
+frame_cache = EncodedFrameCache()  # JPEG bytes shared by all stream/snapshot consumers
+frame_pipeline = None
+capture_thread_lock = threading.Lock()
+camera_error_count = 0
+
+# Prometheus metrics for /metrics. Counters are bumped lock-free per thread; everything else is read from
+# the objects that already track it, only when scraped
+video_feed_bytes = Counter("fall_video_feed_bytes_total", "Bytes written to /video_feed clients")
+camera_reconnects = Counter("fall_camera_reconnects_total", "Times the camera was reopened after a disconnect")
+falls_detected = Counter("fall_falls_detected_total", "Falls confirmed by the detector")
+gauge("fall_capture_fps", "Smoothed camera capture rate",
+      lambda: round(frame_pipeline.capture_fps, 2) if frame_pipeline else None)
+gauge("fall_detector_fps", "Smoothed rate of processed frames published to viewers", lambda: round(frame_hub.fps, 2))
+counter_from("fall_frames_published_total", "Processed frames published to viewers",
+             lambda: frame_hub.frames_published)
+counter_from("fall_frames_dropped_total", "Frames evicted from a full pipeline queue", lambda: [
+    ({"queue": name}, stage_queue.dropped)
+    for name, stage_queue in (("pose", frame_pipeline.pose_queue), ("render", frame_pipeline.render_queue),
+                              ("record", frame_pipeline.record_queue))
+] if frame_pipeline else None)
+gauge("fall_video_feed_clients", "Connected /video_feed clients", lambda: frame_hub.subscriber_count)
+gauge("fall_active_recordings", "Fall recordings being written",
+      lambda: int(fall_detector.is_recording) if fall_detector else 0)
+gauge("fall_alert_queue_depth", "Alerts waiting in the dispatcher",
+      lambda: fall_detector.alert_dispatcher.stats()["queue_depth"] if fall_detector else None)
+
+
+# IMPORTANT: A single frame pipeline owns the camera and the detector.
+# Capture, pose inference (in its own process), fall logic, overlay and
+# recording run as separate stages with bounded drop-oldest queues between
+# them. Rendered frames are published into the hub and each /video_feed
+# client only subscribes, so viewers never add inference work. JPEG encoding
+# happens lazily in frame_cache, once per frame and only if someone wants
+# the pixels.
+def read_camera_frame():
+    global camera, frame_count, camera_error_count
+
+    # Access camera with lock to prevent concurrent access
     with camera_lock:
-        if camera is None:
-            print("Initializing camera...")
-            camera = cv2.VideoCapture(1)  # Use 0 for default camera
-            camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-            camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-
-            # Check if camera is opened successfully
-            if not camera.isOpened():
-                print("Error: Could not open camera.")
-
-    # Initialize fall detector if not already done
-    if fall_detector is None:
-        fall_detector = FallDetector()
-
-    # Create a single generator that will be shared across all clients
-    def generate_frames():
-        global camera, is_armed, fall_detector, frame_count, last_fall_time
-
-        print("Stream generator started")
-        last_frame_time = time.time()
-        error_count = 0
-
-        while True:
-            # Check if we need to limit frame rate when armed
-            # This saves CPU and bandwidth
-            current_time = time.time()
-            if (
-                is_armed and (current_time - last_frame_time) < 0.1
-            ):  # Limit to 10 fps when armed
-                time.sleep(0.01)
-                continue
-
-            last_frame_time = current_time
-
-            # Access camera with lock to prevent concurrent access
-            with camera_lock:
-                if camera is None or not camera.isOpened():
-                    print("Camera disconnected, attempting to reinitialize...")
-                    try:
-                        if camera is not None:
-                            camera.release()
-                        camera = cv2.VideoCapture(0)
-                        if not camera.isOpened():
-                            error_count += 1
-                            if error_count > 5:
-                                print(
-                                    "Failed to reconnect camera after multiple attempts"
-                                )
-                                time.sleep(1)
-                                continue
-                    except Exception as e:
-                        print(f"Error reinitializing camera: {e}")
-                        time.sleep(1)
-                        continue
-
-                # Try to read a frame
-                success, frame = camera.read()
-
-                if not success:
-                    error_count += 1
-                    print(f"Failed to read frame (attempt {error_count})")
-                    if error_count > 5:
+        if camera is None or not camera.isOpened():
+            print("Camera disconnected, attempting to reinitialize...")
+            camera_reconnects.inc()
+            try:
+                if camera is not None:
+                    camera.release()
+                camera = cv2.VideoCapture(0)
+                if not camera.isOpened():
+                    camera_error_count += 1
+                    if camera_error_count > 5:
+                        print("Failed to reconnect camera after multiple attempts")
                         time.sleep(1)
-                    continue
-
-                error_count = 0  # Reset error count on successful frame
-                frame_count += 1  # Increment frame counter
-
-                # Process frame for fall detection
-                try:
-                    # Always process frames for fall detection regardless of armed/disarmed state
-                    processed_frame, fall_detected = fall_detector.process_frame(
-                        frame,
-                        frame_count,
-                        None,  # No video path for live camera
-                        show_display=True,  # Always show visual feedback
-                    )
-
-                    # Check for fall with cooldown to prevent multiple alerts
-                    if fall_detected and (
-                        current_time - last_fall_time > fall_cooldown
-                    ):
-                        last_fall_time = current_time
-                        print(f"⚠️ Fall detected at {time.strftime('%H:%M:%S')}")
-                        # Here you could add code to send alerts via email, SMS, etc.
-
-                except Exception as e:
-                    print(f"Error processing frame for fall detection: {e}")
-                    processed_frame = frame
-
-                    # Add error message to frame
-                    cv2.putText(
-                        processed_frame,
-                        f"Error: {str(e)[:30]}",
-                        (10, 30),
-                        cv2.FONT_HERSHEY_SIMPLEX,
-                        0.7,
-                        (0, 0, 255),
-                        2,
-                    )
-
-            # Convert to jpg for streaming
-            ret, buffer = cv2.imencode(".jpg", processed_frame)
-            if not ret:
-                continue
-
-            frame_bytes = buffer.tobytes()
-
-            # If armed, send blank frames (just headers) to maintain connection
-            # If disarmed, send actual video frames
-            if is_armed:
-                # Send minimal data to keep connection alive but save bandwidth
-                yield (
-                    b"--frame\r\n" b"Content-Type: image/jpeg\r\n\r\n" + b"" + b"\r\n"
-                )
-                time.sleep(0.1)  # Slow down when armed
-            else:
-                # Send full frames when disarmed
-                yield (
-                    b"--frame\r\n"
-                    b"Content-Type: image/jpeg\r\n\r\n" + frame_bytes + b"\r\n"
-                )
-
-    # Return the generator function
-    return generate_frames
-
-
-# Create a single instance of the generator
-stream_generator = get_global_stream_generator()
+                    return None
+            except Exception as e:
+                print(f"Error reinitializing camera: {e}")
+                time.sleep(1)
+                return None
+
+        # Try to read a frame
+        success, frame = camera.read()
+
+    if not success:
+        camera_error_count += 1
+        print(f"Failed to read frame (attempt {camera_error_count})")
+        if camera_error_count > 5:
+            time.sleep(1)
+        return None
+
+    camera_error_count = 0  # Reset error count on successful frame
+    frame_count += 1  # Increment frame counter
+    return frame
+
+
+def capture_frame_interval():
+    # Limit to 10 fps when armed - this saves CPU and bandwidth
+    return 0.1 if is_armed else 0.0
+
+
+def handle_fall(frame_number):
+    global last_fall_time
+
+    falls_detected.inc()
+
+    # Check for fall with cooldown to prevent multiple alerts
+    current_time = time.time()
+    if current_time - last_fall_time > fall_cooldown:
+        last_fall_time = current_time
+        print(f"⚠️ Fall detected at {time.strftime('%H:%M:%S')}")
+        # Here you could add code to send alerts via email, SMS, etc.
+
+
+def start_capture_worker():
+    global camera, fall_detector, frame_pipeline
+
+    with capture_thread_lock:
+        if frame_pipeline is not None:
+            return frame_pipeline
+
+        # Initialize camera only once at startup
+        with camera_lock:
+            if camera is None:
+                print("Initializing camera...")
+                camera = cv2.VideoCapture(1)  # Use 0 for default camera
+                camera.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+                camera.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+
+                # Check if camera is opened successfully
+                if not camera.isOpened():
+                    print("Error: Could not open camera.")
+
+        # Initialize fall detector if not already done
+        if fall_detector is None:
+            # Pose runs in the pipeline's worker process; this detector only does the fall logic, so it gets
+            # a stand-in estimator instead of loading a second model and motion gate here
+            fall_detector = FallDetector(pose_estimator=NullPoseEstimator(profile=stage_profiling),
+                                         profile=stage_profiling)
+
+        # Always process frames for fall detection regardless of armed/disarmed state
+        frame_pipeline = FramePipeline(
+            fall_detector,
+            frame_hub,
+            read_camera_frame,
+            frame_interval=capture_frame_interval,
+            on_fall=handle_fall,
+            estimator_options={
+                "multi_person": multi_person_detection,
+                "max_persons": fall_detector.max_persons,
+                "roi_tracking": roi_pose_tracking,
+                "adaptive_complexity": adaptive_pose_complexity,
+                "target_fps": pose_target_fps,
+                "backend": pose_backend,
+                "backend_options": pose_backend_options,
+                "profile": stage_profiling,
+            },
+        )
+        frame_pipeline.start()
+        return frame_pipeline
+
+
+def stream_generator():
+    """Per-client generator - only forwards frames published by the frame pipeline"""
+    for seq, processed_frame in frame_hub.subscribe():
+        # If armed, send blank frames (just headers) to maintain connection
+        # If disarmed, send actual video frames
+        if is_armed:
+            # Send minimal data to keep connection alive but save bandwidth;
+            # nothing is encoded for this frame
+            yield MULTIPART_HEADER + b"\r\n"
+            video_feed_bytes.inc(len(MULTIPART_HEADER) + 2)
+            time.sleep(0.1)  # Slow down when armed
+        else:
+            # Send full frames when disarmed, encoded once for all clients
+            encoded = frame_cache.get(seq, processed_frame)
+            if encoded is not None:
+                yield encoded.part
+                video_feed_bytes.inc(len(encoded.part))
 
 
 # Routes
 @app.route("/video_feed")
 def video_feed():
-    """Route for streaming video feed - uses the single global generator"""
+    """Route for streaming video feed - subscribes to the shared frame pipeline"""
+    start_capture_worker()
     return Response(
         stream_generator(), mimetype="multipart/x-mixed-replace; boundary=frame"
     )
 
 
+@app.route("/snapshot")
+def snapshot():
+    """Latest processed frame as a single JPEG, shared with the stream encoder"""
+    start_capture_worker()
+    seq, processed_frame = frame_hub.latest()
+    if processed_frame is None:
+        return jsonify({"status": "error", "message": "No frame available yet"}), 503
+
+    encoded = frame_cache.get(seq, processed_frame)
+    if encoded is None:
+        return jsonify({"status": "error", "message": "Failed to encode frame"}), 500
+    return Response(encoded.jpeg, mimetype="image/jpeg")
+
+
 @app.route("/status", methods=["GET"])
 def status():
     """Get current system status without affecting camera"""
     global is_armed, camera, fall_detection_active
+    pose_worker_stats = (frame_pipeline.pose_worker_stats if frame_pipeline else None) or {}
     return jsonify(
         {
             "armed": is_armed,
@@ -179,10 +224,45 @@ def status():
                 camera is not None and camera.isOpened() if camera else False
             ),
             "fall_detection_active": fall_detection_active,
+            "stream": frame_hub.stats(),
+            "frame_cache": frame_cache.stats(),
+            "alerts": fall_detector.alert_dispatcher.stats() if fall_detector else None,
+            "motion_gate": pose_worker_stats.get("motion_gate"),
+            "pose_complexity": pose_worker_stats.get("complexity"),
+            "pipeline": frame_pipeline.stage_stats() if frame_pipeline else None,
+            "process_cpu_seconds": round(time.process_time(), 3),
         }
     )
 
 
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(REGISTRY.render(), content_type=CONTENT_TYPE)
+
+
+@app.route("/profile", methods=["GET"])
+def profile():
+    """Per-stage p50/p95/p99 latency: fall logic, overlay and recording here, pose from the pose worker"""
+    if fall_detector is None or not fall_detector.profiler.enabled:
+        return jsonify({"status": "error", "message": "Stage profiling is off (set stage_profiling = True)"}), 404
+    pose_worker_stats = (frame_pipeline.pose_worker_stats if frame_pipeline else None) or {}
+    stages = fall_detector.profiler.summary()
+    if request.args.get("reset"):
+        fall_detector.profiler.reset()
+    return jsonify({"status": "success", "stages": stages, "pose_worker": pose_worker_stats.get("profile")})
+
+
+@app.route("/profile/trace", methods=["GET"])
+def profile_trace():
+    """Recent stage spans of this process as Chrome trace JSON (open in chrome://tracing or Perfetto)"""
+    if fall_detector is None or not fall_detector.profiler.enabled:
+        return jsonify({"status": "error", "message": "Stage profiling is off (set stage_profiling = True)"}), 404
+    response = jsonify(fall_detector.profiler.chrome_trace())
+    response.headers["Content-Disposition"] = "attachment; filename=fall_detector_trace.json"
+    return response
+
+
 @app.route("/mode", methods=["POST"])
 def set_mode():
     """Set armed/disarmed mode without affecting camera operation"""
@@ -238,11 +318,15 @@ if __name__ == "__main__":
         print("Starting fall detection system...")
         print("Camera will automatically reconnect if disconnected")
         print("Fall detection is active in both armed and disarmed states")
+        start_capture_worker()
         app.run(debug=False, threaded=True, host="0.0.0.0")
     except KeyboardInterrupt:
         print("Server shutting down...")
     finally:
         # Clean up resources
+        if frame_pipeline is not None:
+            frame_pipeline.stop()
+        frame_hub.close()
         if camera is not None:
             camera.release()
         print("Camera released")
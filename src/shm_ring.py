@@ -0,0 +1,104 @@
+# shm_ring.py - Fixed-slot shared-memory frame ring so frames cross process boundaries without pickling
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Header layout (int64): [write_seq, read_seq, slot_seq_0 .. slot_seq_{n-1}]
+WRITE_INDEX = 0
+READ_INDEX = 1
+HEADER_FIELDS = 2
+
+
+class SharedFrameRing:
+    """Numpy views over one SharedMemory block: a sequence header followed by `slots` frame buffers"""
+
+    def __init__(self, slots, shape, dtype=np.uint8, name=None, create=True):
+        self.slots = slots
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.frame_bytes = int(np.prod(self.shape)) * self.dtype.itemsize
+        self.header_bytes = (HEADER_FIELDS + slots) * 8
+        size = self.header_bytes + slots * self.frame_bytes
+
+        if create:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        else:
+            self.shm = _attach(name)
+        self.owner = create
+
+        self.header = np.ndarray((HEADER_FIELDS + slots,), dtype=np.int64, buffer=self.shm.buf)
+        self.slot_seq = self.header[HEADER_FIELDS:]
+        self.frames = np.ndarray(
+            (slots,) + self.shape, dtype=self.dtype, buffer=self.shm.buf, offset=self.header_bytes
+        )
+        if create:
+            self.header[:] = 0
+            self.slot_seq[:] = -1
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    @classmethod
+    def attach(cls, name, slots, shape, dtype=np.uint8):
+        return cls(slots, shape, dtype, name=name, create=False)
+
+    def spec(self):
+        return self.name, self.slots, self.shape, self.dtype.str
+
+    @property
+    def write_seq(self):
+        return int(self.header[WRITE_INDEX])
+
+    @property
+    def read_seq(self):
+        return int(self.header[READ_INDEX])
+
+    def write(self, frame):
+        if frame.shape != self.shape:
+            raise ValueError(f"Frame shape {frame.shape} does not match ring shape {self.shape}")
+        seq = self.write_seq + 1
+        slot = seq % self.slots
+        # Seqlock: mark the slot as being written so a concurrent reader can detect a torn frame
+        self.slot_seq[slot] = -1
+        np.copyto(self.frames[slot], frame, casting="no")
+        self.slot_seq[slot] = seq
+        self.header[WRITE_INDEX] = seq
+        return seq
+
+    def read(self, seq):
+        # Zero-copy view into shared memory; only valid while is_current(seq) holds
+        slot = seq % self.slots
+        if self.slot_seq[slot] != seq:
+            return None
+        return self.frames[slot]
+
+    def is_current(self, seq):
+        return self.slot_seq[seq % self.slots] == seq
+
+    def mark_read(self, seq):
+        self.header[READ_INDEX] = seq
+
+    def lag(self):
+        return self.write_seq - self.read_seq
+
+    def close(self):
+        # Drop numpy views before closing, otherwise the mmap is still exported
+        self.header = None
+        self.slot_seq = None
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13 always tracks; readers are spawned by the writer and share its
+        # resource tracker, so the extra registration is harmless
+        return shared_memory.SharedMemory(name=name)
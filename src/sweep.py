@@ -0,0 +1,197 @@
+# sweep.py - Grid/random search over FallDetector parameters, replayed from cached keypoints on a process pool
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import time
+
+# FallDetector attributes a sweep may set
+SWEEPABLE = (
+    "height_ratio_threshold", "velocity_threshold", "stable_frames_threshold", "required_fall_frames",
+    "abnormal_posture_weight", "lying_position_weight", "sudden_movement_weight", "unstable_weight",
+    "fall_sequence_weight", "fall_score_threshold",
+)
+# Integer-valued parameters; random search rounds these
+_INTEGER_PARAMETERS = {
+    "stable_frames_threshold", "required_fall_frames", "abnormal_posture_weight", "lying_position_weight",
+    "sudden_movement_weight", "unstable_weight", "fall_sequence_weight", "fall_score_threshold",
+}
+
+
+def _check_names(names):
+    unknown = sorted(set(names) - set(SWEEPABLE))
+    if unknown:
+        raise ValueError(f"Not sweepable: {', '.join(unknown)}; choose from {', '.join(SWEEPABLE)}")
+
+
+def grid_configs(space):
+    """Every combination of {name: [values]}"""
+    _check_names(space)
+    names = sorted(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[name] for name in names))]
+
+
+def random_configs(ranges, count, seed=0):
+    """count configurations drawn uniformly from {name: (low, high)}; integer parameters stay integers"""
+    _check_names(ranges)
+    rng = random.Random(seed)
+    configs = []
+    for _ in range(count):
+        config = {}
+        for name in sorted(ranges):
+            low, high = ranges[name]
+            config[name] = rng.randint(int(low), int(high)) if name in _INTEGER_PARAMETERS else rng.uniform(low, high)
+        configs.append(config)
+    return configs
+
+
+def config_key(config):
+    return json.dumps(config, sort_keys=True)
+
+
+# Per-worker state from the pool initializer: one headless detector, the memory-mapped sequences and the
+# matching tolerance
+_worker_detector = None
+_worker_clips = None
+_worker_tolerance = 2.0
+
+
+def _init_worker(manifest_entries, tolerance):
+    global _worker_detector, _worker_clips, _worker_tolerance
+    from clock import FrameClock
+    from fall_detector import FallDetector
+    from keypoint_cache import KeypointSequence
+
+    _worker_detector = FallDetector(headless=True, clock=FrameClock())
+    _worker_clips = [(KeypointSequence.load(entry["cache"]), entry["falls"]) for entry in manifest_entries]
+    _worker_tolerance = tolerance
+
+
+def evaluate_config(config):
+    """Replay every clip under one configuration and score it against the labels"""
+    from evaluation import score_clips
+    from keypoint_cache import replay
+
+    detector = _worker_detector
+    defaults = {name: getattr(detector, name) for name in config}
+    for name, value in config.items():
+        setattr(detector, name, value)
+    start = time.perf_counter()
+    try:
+        clip_results = []
+        for sequence, falls in _worker_clips:
+            detector.clear_tracking_state()
+            events = replay(sequence, detector)
+            clip_results.append(([event["time_s"] for event in events], falls))
+    finally:
+        for name, value in defaults.items():
+            setattr(detector, name, value)
+    result = score_clips(clip_results, _worker_tolerance)
+    result["config"] = config
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def read_results(path):
+    """Results already written to a (possibly partial) sweep output file"""
+    if not os.path.exists(path):
+        return []
+    results = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    results.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A sweep killed mid-write leaves at most one torn last line
+                    continue
+    return results
+
+
+def rank_results(results):
+    """Best first: F1, then sensitivity, then specificity, then the faster mean detection latency"""
+    def key(result):
+        latency = result.get("latency_mean_s")
+        return (-result["f1_score"], -result["sensitivity"], -result["specificity"],
+                latency if latency is not None else float("inf"))
+    return sorted(results, key=key)
+
+
+def run_sweep(manifest_path, configs, output_path, workers=None, tolerance=2.0):
+    """Evaluate configs on a process pool, appending each result to output_path (JSON lines) as it finishes.
+
+    Configurations already present in output_path are skipped, so an interrupted sweep resumes where it
+    stopped and a partial file is always a valid set of results.
+    """
+    from evaluation import load_manifest
+
+    entries = [entry for entry in load_manifest(manifest_path) if entry.get("cache")]
+    done = {config_key(result["config"]) for result in read_results(output_path)}
+    pending = [config for config in configs if config_key(config) not in done]
+    workers = workers or os.cpu_count() or 1
+    start = time.perf_counter()
+    if pending:
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Pool(workers, initializer=_init_worker, initargs=(entries, tolerance)) as pool, \
+                open(output_path, "a", encoding="utf-8") as out:
+            for finished, result in enumerate(pool.imap_unordered(evaluate_config, pending), 1):
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                print(f"[{finished}/{len(pending)}] F1 {result['f1_score']:.1f}  {config_key(result['config'])}")
+    elapsed = time.perf_counter() - start
+    return rank_results(read_results(output_path)), len(pending), elapsed
+
+
+def print_ranking(results, top=10):
+    print(f"{'rank':>4} {'F1':>6} {'sens':>6} {'spec':>6} {'prec':>6} {'lat p50':>8}  config")
+    for rank, result in enumerate(results[:top], 1):
+        latency = result.get("latency_p50_s")
+        latency_text = f"{latency:.2f} s" if latency is not None else "-"
+        print(f"{rank:>4} {result['f1_score']:>6.1f} {result['sensitivity']:>6.1f} {result['specificity']:>6.1f} "
+              f"{result['precision']:>6.1f} {latency_text:>8}  {config_key(result['config'])}")
+
+
+def _parse_values(spec):
+    name, _, values = spec.partition("=")
+    parsed = [float(v) if "." in v or "e" in v.lower() else int(v) for v in values.split(",") if v]
+    return name, parsed
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Sweep FallDetector parameters over cached keypoint sequences")
+    parser.add_argument("manifest", help='JSON list of {"cache": dir, "falls": [[start_s, end_s], ...]}')
+    parser.add_argument("--output", default="sweep_results.jsonl", help="Results, one JSON line per config")
+    parser.add_argument("--grid", nargs="*", default=[], metavar="NAME=V1,V2",
+                        help="Grid axis, e.g. velocity_threshold=0.03,0.05,0.08")
+    parser.add_argument("--random", type=int, default=0, metavar="N", help="Random search with N configurations")
+    parser.add_argument("--range", nargs="*", default=[], metavar="NAME=LOW,HIGH",
+                        help="Random search range, e.g. height_ratio_threshold=0.3,0.6")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--tolerance", type=float, default=2.0, help="Seconds around a labelled fall that count")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--rank-only", action="store_true", help="Just rank what is already in --output")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.rank_only:
+        print_ranking(rank_results(read_results(args.output)), args.top)
+        return
+
+    configs = grid_configs(dict(_parse_values(spec) for spec in args.grid)) if args.grid else []
+    if args.random:
+        configs += random_configs(dict(_parse_values(spec) for spec in args.range), args.random, args.seed)
+    if not configs:
+        configs = [{}]
+    ranked, evaluated, elapsed = run_sweep(args.manifest, configs, args.output, args.workers, args.tolerance)
+    print(f"{evaluated} configurations evaluated in {elapsed:.1f} s; {len(ranked)} results in {args.output}")
+    print_ranking(ranked, args.top)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+# synthetic_keypoints.py - Model-free keypoint streams (walk, floor sitting, lying down, falls) as NumPy arrays
+import argparse
+import math
+
+import numpy as np
+
+from keypoints import (
+    LEFT_ANKLE, LEFT_HIP, LEFT_KNEE, LEFT_SHOULDER, LEFT_WRIST, MID_HIP, MID_SHOULDER, NUM_KEYPOINTS,
+    RIGHT_ANKLE, RIGHT_HIP, RIGHT_KNEE, RIGHT_SHOULDER, RIGHT_WRIST, Keypoints,
+)
+
+
+def _template(points):
+    """Joint table in body units: origin between the ankles, y down, 1.0 = ankle-to-nose height"""
+    pose = np.array(points, dtype=np.float32)
+    pose = np.vstack([pose, [(pose[LEFT_SHOULDER] + pose[RIGHT_SHOULDER]) / 2, (pose[LEFT_HIP] + pose[RIGHT_HIP]) / 2]])
+    return pose.astype(np.float32)
+
+
+# Joint order as in keypoints.KEYPOINT_NAMES, without the two derived mid points
+STANDING = _template([
+    (0.00, -1.00), (-0.03, -1.03), (0.03, -1.03), (-0.08, -0.80), (0.08, -0.80), (-0.05, -0.49), (0.05, -0.49),
+    (-0.05, -0.24), (0.05, -0.24), (-0.05, 0.00), (0.05, 0.00), (-0.12, -0.51), (0.12, -0.51),
+])
+# Knees bent, hips dropped and the trunk leaning forward: the first half of a slow collapse
+CROUCH = _template([
+    (0.10, -0.66), (0.07, -0.69), (0.13, -0.69), (0.00, -0.50), (0.14, -0.50), (-0.06, -0.24), (0.06, -0.24),
+    (0.06, -0.20), (0.16, -0.20), (-0.05, 0.00), (0.05, 0.00), (0.08, -0.22), (0.20, -0.22),
+])
+# Cross-legged on the floor: hips on the ground, spine upright, knees wide, ankles tucked under the thighs.
+# Satisfies every test in body_features.BodyFeatures' floor-sitting verdict
+CROSS_LEGGED = _template([
+    (0.00, -0.56), (-0.03, -0.59), (0.03, -0.59), (-0.09, -0.36), (0.09, -0.36), (-0.06, -0.07), (0.06, -0.07),
+    (-0.21, -0.03), (0.21, -0.03), (0.04, 0.00), (-0.04, 0.00), (-0.16, -0.11), (0.16, -0.11),
+])
+
+
+def _rotated(template, degrees):
+    """Template tipped about the ankles; +90 lays the body flat with the head toward +x"""
+    angle = math.radians(degrees)
+    rotation = np.array([[math.cos(angle), -math.sin(angle)], [math.sin(angle), math.cos(angle)]], dtype=np.float32)
+    return (template @ rotation.T).astype(np.float32)
+
+
+LYING = _rotated(STANDING, 90)
+# Noise repeats after this many frames (~2 min at 30 FPS), far longer than any fall heuristic's window
+NOISE_BANK_FRAMES = 4096
+# Per joint x amplitude of the walking cycle (legs and arms swing in opposite phase)
+_STEP_SWING = np.zeros(NUM_KEYPOINTS, dtype=np.float32)
+_STEP_SWING[[LEFT_KNEE, LEFT_ANKLE, RIGHT_WRIST]] = (0.06, 0.12, 0.05)
+_STEP_SWING[[RIGHT_KNEE, RIGHT_ANKLE, LEFT_WRIST]] = (-0.06, -0.12, -0.05)
+
+
+class SyntheticClip:
+    """Generated keypoints for persons x frames, plus ground truth.
+
+    xy is (frames, persons, NUM_KEYPOINTS, 2) float32 in normalised image coordinates, confidence is
+    (frames, persons, NUM_KEYPOINTS) and timestamps (frames,) in seconds. falls lists (start_s, end_s, person)
+    for every fall that was generated; controlled movements (sitting, lying down) are not falls.
+    """
+
+    __slots__ = ("scenario", "xy", "confidence", "timestamps", "falls")
+
+    def __init__(self, scenario, xy, confidence, timestamps, falls):
+        self.scenario = scenario
+        self.xy = xy
+        self.confidence = confidence
+        self.timestamps = timestamps
+        self.falls = falls
+
+    def __len__(self):
+        return len(self.timestamps)
+
+    def people(self, frame):
+        return [Keypoints(self.xy[frame, p], self.confidence[frame, p]) for p in range(self.xy.shape[1])]
+
+    def fall_intervals(self, person=None):
+        return [(start, end) for start, end, p in self.falls if person is None or p == person]
+
+    def to_sequence(self):
+        """As a keypoint_cache.KeypointSequence, for replay(), the sweep and the evaluation harness"""
+        from keypoint_cache import CACHE_VERSION, KeypointSequence
+        from keypoints import KEYPOINT_NAMES
+
+        packed = np.concatenate((self.xy, self.confidence[..., None]), axis=-1)
+        header = {
+            "version": CACHE_VERSION,
+            "frames": len(self),
+            "max_persons": self.xy.shape[1],
+            "joints": list(KEYPOINT_NAMES),
+            "channels": ["x", "y", "confidence"],
+            "source": f"synthetic:{self.scenario}",
+            "falls": [list(fall) for fall in self.falls],
+        }
+        return KeypointSequence(packed, self.timestamps, header)
+
+
+def _keyframes(times, poses, t):
+    """Piecewise smoothstep interpolation between placed poses: (K,) times, (K, J, 2) poses -> (T, J, 2).
+
+    t is sorted, so every segment is one contiguous slice of frames and is filled with a single broadcast
+    instead of gathering a start and end pose per frame.
+    """
+    out = np.empty((len(t), NUM_KEYPOINTS, 2), dtype=np.float32)
+    bounds = np.searchsorted(t, times).tolist()
+    out[:bounds[0]] = poses[0]
+    for k in range(len(times) - 1):
+        first, last = bounds[k], bounds[k + 1]
+        if last > first:
+            s = (t[first:last] - np.float32(times[k])) / np.float32(max(times[k + 1] - times[k], 1e-6))
+            s = (s * s * (3 - 2 * s))[:, None, None]
+            np.multiply(poses[k + 1] - poses[k], s, out=out[first:last])
+            out[first:last] += poses[k]
+    out[bounds[-1]:] = poses[-1]
+    return out
+
+
+def _place(template, x, floor_y, height):
+    return template * np.float32(height) + np.array([x, floor_y], dtype=np.float32)
+
+
+def _fall_keyframes(start, duration, slow, direction):
+    """(times, templates) for a fall starting at `start` seconds and flat after `duration`"""
+    sign = 1 if direction >= 0 else -1
+    if slow:
+        # Knees give way first, then the trunk tips over from the crouch
+        return (
+            [0.0, start, start + 0.55 * duration, start + 0.8 * duration, start + duration],
+            [STANDING, STANDING, CROUCH, _rotated(CROUCH, 50 * sign), _rotated(STANDING, 90 * sign)],
+        )
+    # Toppling like a rigid body: the tip angle accelerates, so the keyframes bunch up towards the end
+    fractions = [0.0, 0.45, 0.7, 0.87, 1.0]
+    angles = [0, 15, 40, 70, 90]
+    return [0.0] + [start + f * duration for f in fractions], [STANDING] + [_rotated(STANDING, a * sign) for a in angles]
+
+
+def _walk(t, x_start, x_end, speed, height, floor_y, step_hz, phase=0.0):
+    """Walking back and forth between x_start and x_end at `speed` frame widths per second"""
+    span = abs(x_end - x_start) or 1e-6
+    travelled = (t * speed) % (2 * span)
+    offset = np.where(travelled < span, travelled, 2 * span - travelled)
+    x = x_start + np.sign(x_end - x_start) * offset
+    swing = np.sin(np.float32(2 * np.pi * step_hz) * t + np.float32(phase))
+    template = STANDING * np.float32(height)
+    pose = np.empty((len(t), NUM_KEYPOINTS, 2), dtype=np.float32)
+    pose[..., 0] = swing[:, None] * (_STEP_SWING * np.float32(height)) + template[:, 0]
+    pose[..., 0] += x.astype(np.float32)[:, None]
+    # The body rises slightly over each stance leg
+    pose[..., 1] = template[:, 1] + np.float32(floor_y) - (np.abs(swing) * np.float32(0.015 * height))[:, None]
+    return pose
+
+
+def walking(t, rng, height=0.6, floor_y=0.9, speed=0.12, step_hz=1.8):
+    x0 = rng.uniform(0.2, 0.35)
+    return [_walk(t, x0, x0 + rng.uniform(0.35, 0.5), speed, height, floor_y, step_hz)], []
+
+
+def floor_sitting(t, rng, height=0.6, floor_y=0.9, sit_at=2.0, sit_seconds=2.0):
+    x = rng.uniform(0.35, 0.65)
+    times = [0.0, sit_at, sit_at + 0.5 * sit_seconds, sit_at + sit_seconds]
+    poses = np.stack([_place(p, x, floor_y, height) for p in (STANDING, STANDING, CROUCH, CROSS_LEGGED)])
+    return [_keyframes(times, poses, t)], []
+
+
+def lying_down(t, rng, height=0.6, floor_y=0.9, start=2.0, seconds=5.0):
+    """Deliberately getting down to lie on the floor: crouch, sit, then lie back - slow and not a fall"""
+    x = rng.uniform(0.3, 0.45)
+    times = [0.0, start, start + 0.3 * seconds, start + 0.6 * seconds, start + seconds]
+    templates = (STANDING, STANDING, CROUCH, CROSS_LEGGED, LYING)
+    poses = np.stack([_place(p, x, floor_y, height) for p in templates])
+    return [_keyframes(times, poses, t)], []
+
+
+def _fall(t, rng, slow, height, floor_y, fall_at, duration):
+    direction = rng.choice((-1, 1))
+    # Start on the side the body will not fall towards, so it lands inside the frame
+    x = rng.uniform(0.6, 0.75) if direction < 0 else rng.uniform(0.25, 0.4)
+    times, templates = _fall_keyframes(fall_at, duration, slow, direction)
+    poses = np.stack([_place(p, x, floor_y, height) for p in templates])
+    return [_keyframes(times, poses, t)], [(fall_at, fall_at + duration, 0)]
+
+
+def fast_fall(t, rng, height=0.6, floor_y=0.9, fall_at=2.0, duration=0.6):
+    return _fall(t, rng, False, height, floor_y, fall_at, duration)
+
+
+def slow_fall(t, rng, height=0.6, floor_y=0.9, fall_at=2.0, duration=2.5):
+    """Elderly-style collapse: a slow sag onto bent knees before tipping over"""
+    return _fall(t, rng, True, height, floor_y, fall_at, duration)
+
+
+def crossing(t, rng, people=2, height=0.55, floor_y=0.9, speed=0.1, step_hz=1.8):
+    """People walking in opposite directions so their boxes overlap as they pass"""
+    tracks = []
+    for p in range(people):
+        left_to_right = p % 2 == 0
+        x0, x1 = (0.15, 0.85) if left_to_right else (0.85, 0.15)
+        depth = 0.03 * p  # Farther people stand a little higher and smaller
+        tracks.append(_walk(t, x0, x1, speed * rng.uniform(0.8, 1.2), height * (1 - 0.1 * p), floor_y - depth,
+                            step_hz, phase=rng.uniform(0, 2 * np.pi)))
+    return tracks, []
+
+
+SCENARIOS = {
+    "walking": walking,
+    "floor_sitting": floor_sitting,
+    "lying_down": lying_down,
+    "fast_fall": fast_fall,
+    "slow_fall": slow_fall,
+    "crossing": crossing,
+}
+
+
+def generate(scenario, frames, fps=30.0, seed=0, jitter=0.003, confidence=0.95, **params):
+    """A SyntheticClip of `frames` frames; params go to the scenario function (fall_at, duration, people, ...)"""
+    if scenario not in SCENARIOS:
+        raise ValueError(f"Unknown scenario {scenario!r}; choose from {', '.join(SCENARIOS)}")
+    rng = np.random.default_rng(seed)
+    t = np.arange(frames, dtype=np.float32) / np.float32(fps)
+    tracks, falls = SCENARIOS[scenario](t, rng, **params)
+    xy = np.stack(tracks, axis=1)
+    if jitter:
+        # Detector noise on each observed joint; the mid points are re-derived below, as from a real pose model.
+        # Drawing one normal per joint per frame would cost more than generating the motion, so a bank of
+        # NOISE_BANK_FRAMES frames of noise is drawn once and tiled
+        bank = rng.standard_normal((min(frames, NOISE_BANK_FRAMES),) + xy.shape[1:], dtype=np.float32)
+        bank *= np.float32(jitter)
+        for start in range(0, frames, len(bank)):
+            chunk = xy[start:start + len(bank)]
+            chunk += bank[:len(chunk)]
+    xy[:, :, MID_SHOULDER] = (xy[:, :, LEFT_SHOULDER] + xy[:, :, RIGHT_SHOULDER]) * np.float32(0.5)
+    xy[:, :, MID_HIP] = (xy[:, :, LEFT_HIP] + xy[:, :, RIGHT_HIP]) * np.float32(0.5)
+    scores = np.full(xy.shape[:3], confidence, dtype=np.float32)
+    return SyntheticClip(scenario, xy, scores, t.astype(np.float64), falls)
+
+
+def random_clip(frames, seed=0, fps=30.0):
+    """A randomly chosen scenario with randomised timing, for fuzzing the fall logic"""
+    rng = np.random.default_rng(seed)
+    scenario = str(rng.choice(list(SCENARIOS)))
+    seconds = frames / fps
+    params = {}
+    if scenario in ("fast_fall", "slow_fall"):
+        params["duration"] = float(rng.uniform(0.4, 0.9) if scenario == "fast_fall" else rng.uniform(1.5, 4.0))
+        params["fall_at"] = float(rng.uniform(0.1, 0.6) * seconds)
+    elif scenario == "crossing":
+        params["people"] = int(rng.integers(2, 4))
+    return generate(scenario, frames, fps, seed=int(rng.integers(1 << 31)), **params)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Write a synthetic keypoint clip as a keypoint cache")
+    parser.add_argument("scenario", choices=sorted(SCENARIOS))
+    parser.add_argument("output", help="Cache directory to write (keypoints.npy, timestamps.npy, header.json)")
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--fps", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jitter", type=float, default=0.003)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    clip = generate(args.scenario, args.frames, args.fps, args.seed, args.jitter)
+    clip.to_sequence().save(args.output)
+    print(f"{args.scenario}: {len(clip)} frames, {clip.xy.shape[1]} person(s), falls {clip.falls} -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+# tracking.py - Vectorized IoU and detection-to-track assignment used by PersonTracker
+import numpy as np
+
+try:
+    from scipy.optimize import linear_sum_assignment as _scipy_linear_sum_assignment
+except ImportError:
+    # SciPy is optional; the numpy solver below gives the same optimal assignment
+    _scipy_linear_sum_assignment = None
+
+
+# Below this many box pairs numpy's per-call overhead costs more than the arithmetic it vectorizes
+SMALL_PROBLEM_PAIRS = 16
+
+# 0.95 quantile of the chi-square distribution with 4 degrees of freedom (cx, cy, w, h), as in DeepSORT
+GATING_THRESHOLD = 9.4877
+
+
+def _pair_iou(box1, box2):
+    x_left = max(box1[0], box2[0])
+    y_top = max(box1[1], box2[1])
+    x_right = min(box1[2], box2[2])
+    y_bottom = min(box1[3], box2[3])
+    if x_right < x_left or y_bottom < y_top:
+        return 0.0
+    intersection = (x_right - x_left) * (y_bottom - y_top)
+    union = (box1[2] - box1[0]) * (box1[3] - box1[1]) + (box2[2] - box2[0]) * (box2[3] - box2[1]) - intersection
+    return intersection / union if union > 0 else 0.0
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """IoU of every box in boxes_a (N, 4) against every box in boxes_b (M, 4), as an (N, M) array"""
+    if len(boxes_a) * len(boxes_b) <= SMALL_PROBLEM_PAIRS:
+        iou = [[_pair_iou(box_a, box_b) for box_b in boxes_b] for box_a in boxes_a]
+        return np.array(iou, dtype=np.float64).reshape(len(boxes_a), len(boxes_b))
+    a = np.asarray(boxes_a, dtype=np.float64).reshape(-1, 4)
+    b = np.asarray(boxes_b, dtype=np.float64).reshape(-1, 4)
+    left = np.maximum(a[:, None, 0], b[None, :, 0])
+    top = np.maximum(a[:, None, 1], b[None, :, 1])
+    right = np.minimum(a[:, None, 2], b[None, :, 2])
+    bottom = np.minimum(a[:, None, 3], b[None, :, 3])
+    intersection = np.clip(right - left, 0, None) * np.clip(bottom - top, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    union = area_a[:, None] + area_b[None, :] - intersection
+    with np.errstate(invalid="ignore", divide="ignore"):
+        iou = np.where(union > 0, intersection / union, 0.0)
+    return iou
+
+
+def greedy_match(iou, threshold):
+    """Highest-IoU-first matching above threshold; ties keep row-major order like the original sort did"""
+    rows, cols = np.nonzero(iou > threshold)
+    if rows.size == 0:
+        return []
+    order = np.argsort(-iou[rows, cols], kind="stable")
+    matches = []
+    used_rows = set()
+    used_cols = set()
+    for r, c in zip(rows[order].tolist(), cols[order].tolist()):
+        if r not in used_rows and c not in used_cols:
+            matches.append((r, c))
+            used_rows.add(r)
+            used_cols.add(c)
+    return matches
+
+
+def hungarian_match(iou, threshold):
+    """Assignment maximising total IoU; pairs at or below threshold are never matched"""
+    if iou.size == 0:
+        return []
+    valid = iou > threshold
+    # Invalid pairs cost more than any valid one, so they are only chosen when nothing else is left
+    cost = np.where(valid, -iou, 1.0)
+    rows, cols = linear_sum_assignment(cost)
+    return [(r, c) for r, c in zip(rows.tolist(), cols.tolist()) if valid[r, c]]
+
+
+def linear_sum_assignment(cost):
+    """Minimum-cost assignment of a rectangular cost matrix; returns (row_indices, col_indices)"""
+    cost = np.asarray(cost, dtype=np.float64)
+    if _scipy_linear_sum_assignment is not None:
+        return _scipy_linear_sum_assignment(cost)
+    return _shortest_augmenting_path(cost)
+
+
+def _shortest_augmenting_path(cost):
+    # Hungarian method with potentials, O(n^2 m); the inner column scan is vectorized
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    owner = np.zeros(m + 1, dtype=np.int64)  # owner[j] = 1-based row assigned to column j, 0 if free
+    way = np.zeros(m + 1, dtype=np.int64)
+
+    for i in range(1, n + 1):
+        owner[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = owner[j0]
+            reduced = cost[i0 - 1] - u[i0] - v[1:]
+            free = ~used[1:]
+            improve = free & (reduced < minv[1:])
+            minv[1:][improve] = reduced[improve]
+            way[1:][improve] = j0
+            candidates = np.where(free, minv[1:], np.inf)
+            j1 = int(np.argmin(candidates)) + 1
+            delta = candidates[j1 - 1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            minv[1:][free] -= delta
+            j0 = j1
+            if owner[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            owner[j0] = owner[j1]
+            j0 = j1
+
+    assigned = np.nonzero(owner[1:])[0]
+    rows = owner[1:][assigned] - 1
+    cols = assigned
+    if transposed:
+        rows, cols = cols, rows
+    order = np.argsort(rows)
+    return rows[order], cols[order]
+
+
+class BoxKalmanFilter:
+    """Constant-velocity Kalman filter over a bbox's centre and size (cx, cy, w, h) and their velocities.
+
+    Each of the four axes is an independent position/velocity pair, so the covariance is four 2x2 blocks.
+    They are kept as plain float lists: at four elements Python math is several times cheaper than numpy.
+    """
+
+    # Noise standard deviations as a fraction of the box height, per frame (DeepSORT-style scaling)
+    position_noise = 1 / 20
+    velocity_noise = 1 / 160
+    measurement_noise = 1 / 20
+
+    __slots__ = ("x", "v", "p_xx", "p_xv", "p_vv")
+
+    def __init__(self, bbox):
+        self.x = _box_to_state(bbox)
+        self.v = [0.0, 0.0, 0.0, 0.0]
+        scale = max(self.x[3], 1e-3)
+        self.p_xx = [(2 * self.position_noise * scale) ** 2] * 4
+        self.p_xv = [0.0, 0.0, 0.0, 0.0]
+        self.p_vv = [(10 * self.velocity_noise * scale) ** 2] * 4
+
+    def predict(self, dt=1):
+        scale = max(self.x[3], 1e-3)
+        q_x = (self.position_noise * scale) ** 2 * dt
+        q_v = (self.velocity_noise * scale) ** 2 * dt
+        self.x = [x + v * dt for x, v in zip(self.x, self.v)]
+        self.p_xx = [p_xx + dt * (2 * p_xv + dt * p_vv) + q_x for p_xx, p_xv, p_vv in zip(self.p_xx, self.p_xv, self.p_vv)]
+        self.p_xv = [p_xv + dt * p_vv for p_xv, p_vv in zip(self.p_xv, self.p_vv)]
+        self.p_vv = [p_vv + q_v for p_vv in self.p_vv]
+        return self.bbox()
+
+    def update(self, bbox):
+        z = _box_to_state(bbox)
+        r = (self.measurement_noise * max(self.x[3], 1e-3)) ** 2
+        for i in range(4):
+            p_xx, p_xv = self.p_xx[i], self.p_xv[i]
+            s = p_xx + r
+            k_x = p_xx / s
+            k_v = p_xv / s
+            residual = z[i] - self.x[i]
+            self.x[i] += k_x * residual
+            self.v[i] += k_v * residual
+            self.p_vv[i] -= k_v * p_xv
+            self.p_xv[i] = (1 - k_x) * p_xv
+            self.p_xx[i] = (1 - k_x) * p_xx
+        return self.bbox()
+
+    def gating_distance(self, bbox, origin=None):
+        """Squared Mahalanobis distance of a measured box from the predicted state, or from origin (another box)
+        under the same uncertainty; compare it to GATING_THRESHOLD"""
+        z = _box_to_state(bbox)
+        x = self.x if origin is None else _box_to_state(origin)
+        r = (self.measurement_noise * max(self.x[3], 1e-3)) ** 2
+        return sum((z_i - x_i) ** 2 / (p_xx + r) for z_i, x_i, p_xx in zip(z, x, self.p_xx))
+
+    def bbox(self):
+        cx, cy, w, h = self.x
+        w, h = max(w, 0.0), max(h, 0.0)
+        return [cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2]
+
+
+def _box_to_state(bbox):
+    x_min, y_min, x_max, y_max = bbox
+    return [(x_min + x_max) / 2, (y_min + y_max) / 2, x_max - x_min, y_max - y_min]